@@ -0,0 +1,295 @@
+"""Benchmarks des chemins de scan et de l'affichage, résultats en JSON.
+
+    python -m benchmarks.run                                # arbre par défaut, JSON sur la sortie
+    python -m benchmarks.run --depth 5 --fanout 8 --output apres.json
+    python -m benchmarks.run --cases scan_tree,show_folder --repeat 5
+    python -m benchmarks.run --compare avant.json apres.json
+
+L'arbre synthétique (voir ``benchmarks.synthetic``) est généré une fois dans
+un dossier temporaire. Chaque mesure tourne dans un sous-processus neuf :
+le pic de mémoire (RSS) est donc propre à ce chemin de scan. Le cache
+disque n'est pas vidé, les scans mesurés sont « à chaud ».
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_tree, DISTRIBUTIONS
+
+CASES = {}
+
+
+def case(name):
+    """Enregistre une mesure : ``préparation(args) -> exécution(horloge)``.
+
+    La préparation (non chronométrée) rend la fonction mesurée ; celle-ci
+    appelle ``horloge()`` au premier résultat disponible et peut rendre un
+    dictionnaire de champs supplémentaires (``entries`` notamment).
+    """
+    def register(func):
+        CASES[name] = func
+        return func
+    return register
+
+
+@case("get_size")
+def bench_get_size(args):
+    from core.scanner import get_size
+
+    def run(clock):
+        get_size(args.root)  # pas de résultat intermédiaire
+    return run
+
+
+@case("scan_directory")
+def bench_scan_directory(args):
+    from core.scanner import scan_directory
+
+    def run(clock):
+        scan_directory(args.root)  # un get_size par entrée de la racine
+    return run
+
+
+@case("scan_tree")
+def bench_scan_tree(args):
+    from core.walker import scan_tree
+
+    def run(clock):
+        return {"entries": len(scan_tree(args.root, on_complete=clock)) - 1}
+    return run
+
+
+@case("scan_tree_parallel")
+def bench_scan_tree_parallel(args):
+    from core.walker import scan_tree_parallel
+
+    def run(clock):
+        store = scan_tree_parallel(args.root, args.workers, on_complete=clock)
+        return {"entries": len(store) - 1, "workers": args.workers}
+    return run
+
+
+@case("scan_tree_processes")
+def bench_scan_tree_processes(args):
+    from core.sharding import scan_tree_processes
+
+    def run(clock):
+        store = scan_tree_processes(args.root, args.processes, on_complete=clock)
+        return {"entries": len(store) - 1, "processes": args.processes}
+    return run
+
+
+@case("refresh")
+def bench_refresh(args):
+    from core.walker import TreeWalker, scan_tree
+    previous = scan_tree(args.root)
+
+    def run(clock):
+        walker = TreeWalker(args.root, previous=previous, on_complete=clock)
+        store = walker.run()
+        return {"entries": len(store) - 1, "relisted": walker.relisted}
+    return run
+
+
+@case("process_next")
+def bench_process_next(args):
+    from PyQt6.QtCore import QCoreApplication
+    from core.qt_scanner import DirectoryScanner
+    app = QCoreApplication.instance() or QCoreApplication([])
+    scanner = DirectoryScanner(args.root)
+    finished = []
+    scanner.finished.connect(finished.append)
+
+    def run(clock):
+        # Ticks enchaînés sans le délai du QTimer : coût propre de process_next
+        while not finished:
+            scanner.process_next()
+            clock()
+        app.processEvents()
+        return {"entries": len(scanner.result) - 1}
+    return run
+
+
+@case("show_folder")
+def bench_show_folder(args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from core.walker import scan_tree
+    from ui.main_window import MainWindow
+    app = QApplication.instance() or QApplication([])
+    window = MainWindow()
+    window.resize(1200, 700)
+    window.show()
+    store = scan_tree(args.root)
+    window.scanned_data = store
+    window.base_disk_path = store.root_path
+    window.scan_type = "folder"
+    folder = args.big or args.root
+
+    def run(clock):
+        window.show_folder(folder)
+        clock()  # modèle et treemap prêts
+        window.file_list.viewport().repaint()
+        window.treemap.repaint()
+        app.processEvents()
+        return {"entries": window.folder_model.rowCount()}
+    return run
+
+
+def peak_rss():
+    """Pic de mémoire résidente du processus, en octets (None si indisponible)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(args):
+    """Sous-processus : prépare et chronomètre un cas, écrit une ligne JSON."""
+    run = CASES[args.case](args)
+    rss_before = peak_rss()
+    first = []
+    start = time.perf_counter()
+
+    def clock(*_):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    extra = run(clock) or {}
+    seconds = time.perf_counter() - start
+    result = {"case": args.case, "seconds": seconds,
+              "first_result_s": first[0] if first else seconds,
+              "peak_rss": peak_rss(), "peak_rss_before_run": rss_before}
+    result.update(extra)
+    print(json.dumps(result))
+
+
+def spawn(name, args, root, big):
+    command = [sys.executable, "-m", "benchmarks.run", "--case", name, "--root", root,
+               "--workers", str(args.workers), "--processes", str(args.processes)]
+    if big:
+        command += ["--big", big]
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(command, cwd=repo, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(name, runs, manifest):
+    """Meilleur temps d'une série, débits dérivés et temps bruts."""
+    best = min(runs, key=lambda r: r["seconds"])
+    entries = best.get("entries", manifest["entries"])
+    summary = dict(best)
+    summary["entries"] = entries
+    summary["entries_per_s"] = entries / best["seconds"] if best["seconds"] else None
+    summary["runs"] = [r["seconds"] for r in runs]
+    summary["peak_rss"] = max((r["peak_rss"] or 0) for r in runs) or None
+    return summary
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {r["case"]: r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {r["case"]: r for r in json.load(f)["results"]}
+    for name in after:
+        if name not in before:
+            continue
+        old, new = before[name], after[name]
+        speedup = old["seconds"] / new["seconds"] if new["seconds"] else float("inf")
+        rss = ""
+        if old.get("peak_rss") and new.get("peak_rss"):
+            rss = f"  RSS {new['peak_rss'] / old['peak_rss']:.2f}x"
+        print(f"{name:>20}  {old['seconds']:.3f} s -> {new['seconds']:.3f} s  ({speedup:.2f}x){rss}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run",
+                                     description="Mesure les chemins de scan sur un arbre synthétique.")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--files", type=int, default=20, help="fichiers par dossier, en moyenne")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="pareto")
+    parser.add_argument("--mean-size", type=int, default=64 * 1024, help="taille moyenne des fichiers (octets)")
+    parser.add_argument("--symlinks", type=float, default=0.02, help="fraction des dossiers avec liens symboliques")
+    parser.add_argument("--big-folder", type=int, default=100000, help="fichiers du grand dossier (0 : aucun)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=8, help="threads de scan_tree_parallel")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="processus de scan_tree_processes (défaut : un par cœur)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", default=",".join(CASES), help="liste séparée par des virgules")
+    parser.add_argument("--output", metavar="FICHIER", help="écrit le JSON dans ce fichier")
+    parser.add_argument("--keep", action="store_true", help="conserve l'arbre généré")
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRES"), help="compare deux résultats")
+    # Usage interne (sous-processus)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    parser.add_argument("--big", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    if args.case:
+        run_case(args)
+        return 0
+
+    names = [name for name in args.cases.split(",") if name]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        print(f"Cas inconnus : {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    root = tempfile.mkdtemp(prefix="fvv-bench-")
+    try:
+        spec = {"depth": args.depth, "fanout": args.fanout, "files": args.files,
+                "distribution": args.distribution, "mean_size": args.mean_size,
+                "symlinks": args.symlinks, "big_folder": args.big_folder, "seed": args.seed}
+        start = time.perf_counter()
+        manifest = generate_tree(root, **spec)
+        print(f"Arbre généré : {manifest['entries']} entrées en {time.perf_counter() - start:.1f} s",
+              file=sys.stderr)
+        results = []
+        for name in names:
+            runs = [spawn(name, args, root, manifest.get("big_folder")) for _ in range(args.repeat)]
+            summary = summarize(name, runs, manifest)
+            results.append(summary)
+            print(f"{name:>20}  {summary['seconds']:.3f} s  {summary['entries_per_s'] or 0:,.0f} entrées/s",
+                  file=sys.stderr)
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "tree": {"spec": spec,
+                     "manifest": {k: v for k, v in manifest.items() if k != "big_folder"}},
+            "results": results,
+        }
+    finally:
+        if args.keep:
+            print(f"Arbre conservé : {root}", file=sys.stderr)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Générateur d'arborescences synthétiques reproductibles pour les benchmarks.
+
+Les fichiers sont créés creux (``os.truncate``) : leur taille apparente est
+celle demandée sans occuper le disque. Une même graine donne toujours le
+même arbre (noms, tailles, liens).
+"""
+import os
+import random
+
+DISTRIBUTIONS = ("fixed", "uniform", "pareto")
+EXTENSIONS = ("txt", "jpg", "mp4", "log", "py", "so", "gz", "pdf")
+
+
+def files_in_directory(rng, mean, distribution):
+    """Nombre de fichiers d'un dossier, de moyenne ``mean``."""
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean)
+    # Pareto (alpha = 1.5) : la plupart des dossiers petits, quelques très gros
+    alpha = 1.5
+    count = int(rng.paretovariate(alpha) * mean * (alpha - 1) / alpha)
+    return min(count, 100 * mean)
+
+
+def generate_tree(root, depth=4, fanout=6, files=20, distribution="pareto",
+                  mean_size=64 * 1024, symlinks=0.02, big_folder=0, seed=0):
+    """Crée l'arbre sous ``root`` (qui doit exister) et retourne son inventaire.
+
+    ``depth`` niveaux de ``fanout`` sous-dossiers ; chaque dossier reçoit
+    ``files`` fichiers en moyenne selon ``distribution``, de tailles
+    exponentielles de moyenne ``mean_size``. Une fraction ``symlinks`` des
+    dossiers reçoit deux liens symboliques (vers un fichier voisin et vers
+    un ancêtre, pour vérifier qu'aucun scan ne suit les boucles).
+    ``big_folder`` > 0 ajoute un dossier ``big`` contenant autant de fichiers
+    (mesure de l'affichage des grands dossiers).
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Distribution inconnue : {distribution}")
+    rng = random.Random(seed)
+    manifest = {"dirs": 0, "files": 0, "symlinks": 0, "bytes": 0}
+
+    def add_files(path, count):
+        """Crée ``count`` fichiers ; retourne le nom du premier (ou None)."""
+        first = None
+        for i in range(count):
+            size = int(rng.expovariate(1 / mean_size)) if mean_size else 0
+            name = f"f{i:05d}.{rng.choice(EXTENSIONS)}"
+            with open(os.path.join(path, name), "wb") as f:
+                f.truncate(size)
+            first = first or name
+            manifest["files"] += 1
+            manifest["bytes"] += size
+        return first
+
+    stack = [(root, 0)]
+    while stack:
+        path, level = stack.pop()
+        first = add_files(path, files_in_directory(rng, files, distribution))
+        if level and rng.random() < symlinks:
+            if first:
+                os.symlink(first, os.path.join(path, "lien_fichier"))
+                manifest["symlinks"] += 1
+            os.symlink("..", os.path.join(path, "lien_parent"))
+            manifest["symlinks"] += 1
+        if level < depth:
+            for i in range(fanout):
+                child = os.path.join(path, f"d{level}_{i}")
+                os.mkdir(child)
+                manifest["dirs"] += 1
+                stack.append((child, level + 1))
+
+    if big_folder:
+        big = os.path.join(root, "big")
+        os.mkdir(big)
+        manifest["dirs"] += 1
+        add_files(big, big_folder)
+        manifest["big_folder"] = big
+
+    manifest["entries"] = manifest["dirs"] + manifest["files"] + manifest["symlinks"]
+    return manifest
+
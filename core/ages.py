@@ -0,0 +1,162 @@
+import time
+from array import array
+from bisect import bisect_right
+
+try:  # facultatif : classement des dates en C
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.store import FLAG_DIR, FLAG_REMOVED
+
+DAY = 86400
+
+# Tranches d'âge : (libellé, âge maximal en jours) ; la dernière est ouverte
+AGE_BUCKETS = (
+    ("< 7 j", 7),
+    ("< 30 j", 30),
+    ("< 1 an", 365),
+    ("> 1 an", None),
+)
+UNKNOWN = "Date inconnue"  # atime absent (snapshot ancien)
+
+CLOCKS = ("mtime", "atime")
+
+
+class AgeHistogram:
+    """Octets par tranche d'âge (``AGE_BUCKETS``) pour chaque dossier d'un ``NodeStore``.
+
+    ``clock`` choisit la date : ``mtime`` (dernière modification) ou
+    ``atime`` (dernier accès ; approximative avec ``relatime``, figée avec
+    ``noatime``). La tranche de chaque nœud est rangée dans un ``array('B')``
+    (un octet par nœud), puis un seul passage dans l'ordre inverse des
+    indices (un enfant a toujours un indice supérieur à celui de son parent)
+    ajoute les fichiers à leur dossier et chaque dossier terminé à son
+    parent. Seuls les dossiers ont une ligne dans ``columns`` (une colonne
+    de 8 octets par tranche, plus une pour les dates inconnues). Un nœud
+    ``(N petits éléments)`` compte avec la date de son élément le plus
+    récent ; la part d'un dossier replié sans détail, avec la date du
+    dossier. ``update`` suit ensuite les lots de la surveillance sans tout
+    recalculer.
+    """
+
+    def __init__(self, store, clock="mtime", now=None):
+        if clock not in CLOCKS:
+            raise ValueError(f"date inconnue : {clock}")
+        self.store = store
+        self.clock = clock
+        self.now = time.time() if now is None else now
+        self.keys = self._keys()
+        self.rows = {}  # dossier -> ligne dans les colonnes
+        for index in range(len(store)):
+            if store.flags[index] & FLAG_DIR:
+                self.rows[index] = len(self.rows)
+        self.columns = [array('Q', bytes(8 * len(self.rows))) for _ in range(len(AGE_BUCKETS) + 1)]
+        self._build()
+
+    def _keys(self, start=0, stop=None):
+        """Tranche des nœuds ``start:stop`` : 0 (récent) .. 3 (ancien), 4 si la date est inconnue."""
+        store = self.store
+        # Bornes croissantes : une date au-delà de la dernière est la plus récente
+        days = [bucket[1] for bucket in AGE_BUCKETS[-2::-1]]
+        if self.clock == "mtime":
+            dates = store.mtime[start:stop]
+            cutoffs = [int((self.now - d * DAY) * 1_000_000_000) for d in days]
+        else:
+            dates = store.atime[start:stop]
+            cutoffs = [max(0, int(self.now - d * DAY)) for d in days]
+        last = len(AGE_BUCKETS) - 1
+        if np is not None and len(dates):
+            values = np.frombuffer(dates, dtype=np.int64 if self.clock == "mtime" else np.uint32)
+            keys = last - np.searchsorted(np.array(cutoffs, dtype=values.dtype), values, side="right")
+            keys[values == 0] = last + 1
+            return array('B', keys.astype(np.uint8).tobytes())
+        return array('B', [last - bisect_right(cutoffs, date) if date else last + 1 for date in dates])
+
+    def _build(self):
+        store = self.store
+        flags = store.flags
+        parent = store.parent
+        size = store.size
+        keys = self.keys
+        rows = self.rows
+        columns = self.columns
+        for index in range(len(store) - 1, -1, -1):
+            node_flags = flags[index]
+            if node_flags & FLAG_REMOVED:
+                continue
+            if node_flags & FLAG_DIR:
+                row = rows[index]
+                counted = sum(column[row] for column in columns)
+                if size[index] > counted:  # contenu replié : date du dossier
+                    columns[keys[index]][row] += size[index] - counted
+                if index:
+                    target = rows[parent[index]]
+                    for column in columns:
+                        column[target] += column[row]
+            else:
+                columns[keys[index]][rows[parent[index]]] += size[index]
+
+    def update(self, touched):
+        """Suit un lot de ``TreeWatcher.apply`` : ``touched`` (nœuds modifiés) et nœuds ajoutés.
+
+        Seuls ces nœuds et leurs ancêtres sont recalculés, chacun à partir
+        de ses enfants : O(profondeur + enfants) par nœud au lieu du store entier.
+        """
+        store = self.store
+        flags = store.flags
+        parent = store.parent
+        start = len(self.keys)
+        changed = set(touched)
+        if len(store) > start:
+            self.keys += self._keys(start)
+            for index in range(start, len(store)):
+                if flags[index] & FLAG_DIR:
+                    self.rows[index] = len(self.rows)
+                    for column in self.columns:
+                        column.append(0)
+            changed.update(range(start, len(store)))
+        dirty = set()
+        for index in changed:
+            if index < start:
+                self.keys[index] = self._keys(index, index + 1)[0]  # fichier modifié
+            if not flags[index] & FLAG_DIR:
+                index = parent[index]
+            # Une date changée sans écart de taille : les ancêtres ne sont pas dans touched
+            while index >= 0 and index not in dirty:
+                dirty.add(index)
+                index = parent[index]
+        for index in sorted(dirty, reverse=True):  # enfants avant parents
+            self._refill(index)
+
+    def _refill(self, index):
+        store = self.store
+        flags = store.flags
+        size = store.size
+        columns = self.columns
+        counts = [0] * len(columns)
+        for child in store.children(index):
+            child_flags = flags[child]
+            if child_flags & FLAG_REMOVED:
+                continue
+            if child_flags & FLAG_DIR:
+                row = self.rows[child]
+                for bucket, column in enumerate(columns):
+                    counts[bucket] += column[row]
+            else:
+                counts[self.keys[child]] += size[child]
+        counted = sum(counts)
+        if size[index] > counted:  # contenu replié : date du dossier
+            counts[self.keys[index]] += size[index] - counted
+        row = self.rows[index]
+        for column, count in zip(columns, counts):
+            column[row] = count
+
+    def histogram(self, index):
+        """Octets par tranche (``AGE_BUCKETS`` puis dates inconnues) sous ``index``."""
+        row = self.rows.get(index)
+        if row is not None:
+            return [column[row] for column in self.columns]
+        counts = [0] * len(self.columns)
+        counts[self.keys[index]] = self.store.size[index]
+        return counts
@@ -0,0 +1,199 @@
+import logging
+
+from core.store import NodeStore, FLAG_AGGREGATE, FLAG_COLLAPSED, FLAG_DIR
+from core.telemetry import log_event
+
+
+def aggregate_name(count):
+    return f"({count} petits éléments)"
+
+
+class CollapsePolicy:
+    """Règles du mode mémoire bornée, appliquées pendant le scan.
+
+    Dans chaque dossier listé, les fichiers de moins de ``min_size`` octets,
+    et au-delà des ``max_entries`` plus gros (0 : sans limite), sont
+    regroupés en un nœud ``(N petits éléments)`` dont la taille est leur
+    somme (N est aussi rangé dans sa colonne ``ino``). Avec le parcours séquentiel (``TreeWalker``), un sous-dossier
+    terminé dont le total reste sous ``min_size`` perd en plus ses
+    descendants. Les totaux restent exacts ; ``expand_node`` rescanne un
+    nœud replié à la demande.
+
+    ``memory_budget`` (octets, 0 : sans limite) borne la taille du store :
+    quand il est dépassé, ``min_size`` double pour la suite du scan, puis à
+    nouveau à chaque huitième de budget supplémentaire, et tout dossier qui
+    se termine avec un gros sous-arbre est replié à nouveau avec le seuil
+    courant (la racine en dernier). Le pic pendant le scan peut donc
+    dépasser un peu le budget ; le résultat final le respecte au mieux.
+    """
+
+    def __init__(self, min_size=0, max_entries=0, memory_budget=0):
+        self.min_size = min_size
+        self.max_entries = max_entries
+        self.memory_budget = memory_budget
+        self._next_check = memory_budget  # taille du store qui relève le seuil
+        self.folded = 0  # fichiers regroupés
+        self.collapsed = 0  # sous-dossiers repliés
+
+    @property
+    def active(self):
+        return bool(self.min_size or self.max_entries or self.memory_budget)
+
+    def fold(self, entries, prev_indices=None):
+        """Sépare les entrées gardées des petits fichiers à regrouper.
+
+        Retourne ``(entrées, indices précédents, entrée agrégée ou None)`` ;
+        les dossiers sont toujours gardés (leur taille n'est pas encore connue).
+        """
+        small = [offset for offset, entry in enumerate(entries)
+                 if not entry[2] and entry[1] < self.min_size]
+        if self.max_entries:
+            files = [offset for offset, entry in enumerate(entries)
+                     if not entry[2] and entry[1] >= self.min_size]
+            if len(files) > self.max_entries:
+                files.sort(key=lambda offset: entries[offset][1], reverse=True)
+                small += files[self.max_entries:]
+        if len(small) < 2:
+            return entries, prev_indices, None  # rien à gagner
+        folded = set(small)
+        # Dates du regroupement : celles de son élément le plus récent
+        aggregate = (aggregate_name(len(small)), sum(entries[offset][1] for offset in small), False,
+                     max(entries[offset][3] for offset in small), len(small),
+                     max(entries[offset][5] for offset in small))
+        self.folded += len(small)
+        kept = [entry for offset, entry in enumerate(entries) if offset not in folded]
+        if prev_indices is not None:
+            prev_indices = [prev for offset, prev in enumerate(prev_indices) if offset not in folded]
+        return kept, prev_indices, aggregate
+
+    def check_budget(self, store):
+        """Relève le seuil si le store dépasse le budget mémoire."""
+        if not self.memory_budget:
+            return
+        nbytes = store.nbytes()
+        if nbytes <= self._next_check:
+            return
+        # Le store ne rétrécit qu'au fil des dossiers terminés : on laisse au
+        # nouveau seuil le temps d'agir avant de le relever encore
+        self._next_check = nbytes + self.memory_budget // 8
+        self.min_size = max(2 * self.min_size, 4096)
+        log_event(logging.INFO, "collapse_threshold_raised", min_size=self.min_size,
+                  store_bytes=nbytes, budget=self.memory_budget)
+
+    def collapse_finished(self, store, index):
+        """Dossier terminé (parcours séquentiel) : replie son contenu s'il est petit.
+
+        Ses descendants sont alors les derniers nœuds du store ; au-delà du
+        budget, un gros sous-arbre est reconstruit avec le seuil courant.
+        """
+        self.check_budget(store)
+        if not store.child_count[index]:
+            return
+        if index and store.size[index] < self.min_size:
+            store.truncate(index)
+            self.collapsed += 1
+        elif (self.memory_budget and store.nbytes() > self.memory_budget
+              and len(store) - store.first_child[index] >= len(store) // 8):
+            self.recollapse(store, index)
+
+    def recollapse(self, store, index):
+        """Réapplique les seuils au sous-arbre terminé ``index`` (en fin de tableaux)."""
+        subtree = NodeStore(store.path(index))
+        subtree.size[0] = store.size[index]
+        stack = [(index, 0)]
+        while stack:
+            old, new = stack.pop()
+            entries = []
+            nodes = []
+            merged = [0, 0, 0, 0]  # regroupement existant : éléments, octets, mtime, atime
+            for child in store.children(old):
+                if store.flags[child] & FLAG_AGGREGATE:
+                    merged = [merged[0] + store.ino[child], merged[1] + store.size[child],
+                              max(merged[2], store.mtime[child]), max(merged[3], store.atime[child])]
+                    continue
+                entries.append((store.name(child), store.size[child], store.is_dir(child),
+                                store.mtime[child], store.ino[child], store.atime[child]))
+                nodes.append(child)
+            entries, nodes, aggregate = self.fold(entries, nodes)
+            if merged[0]:
+                count, size, mtime, atime = merged
+                if aggregate is not None:
+                    count += aggregate[4]
+                    size += aggregate[1]
+                    mtime = max(mtime, aggregate[3])
+                    atime = max(atime, aggregate[5])
+                aggregate = (aggregate_name(count), size, False, mtime, count, atime)
+            if aggregate is not None:
+                entries.append(aggregate)
+            first = subtree.add_children(new, entries)
+            for offset, node in enumerate(nodes):
+                flags = store.flags[node]
+                if flags & FLAG_DIR and store.child_count[node]:
+                    if store.size[node] < self.min_size:
+                        flags |= FLAG_COLLAPSED
+                        self.collapsed += 1
+                    else:
+                        stack.append((node, first + offset))
+                subtree.flags[first + offset] = flags
+            if aggregate is not None:
+                subtree.flags[first + len(entries) - 1] = FLAG_AGGREGATE
+                subtree.flags[new] |= FLAG_COLLAPSED
+            subtree.sort_children(new)
+        store.truncate(index)
+        store.expand(index, subtree)
+
+    def summary(self):
+        return f"{self.folded} fichiers regroupés, {self.collapsed} dossiers repliés"
+
+
+def is_collapsed(store, index):
+    """Vrai si ``index`` est un nœud dont le détail peut être rescanné."""
+    return bool(store.flags[index] & (FLAG_COLLAPSED | FLAG_AGGREGATE))
+
+
+def rescan_subtree(store, index, policy=None, skip_hidden=True, exclusions=None):
+    """Nouveau scan du dossier replié ``index`` (ne modifie pas ``store``).
+
+    Le résultat est à passer à ``expand_node`` ; seule la lecture du chemin
+    touche au store, le scan peut donc tourner dans un autre thread.
+    """
+    from core.walker import TreeWalker
+    return TreeWalker(store.path(index), skip_hidden=skip_hidden, collapse=policy,
+                      exclusions=exclusions).run()
+
+
+def expand_node(store, index, policy=None, skip_hidden=True, subtree=None, exclusions=None):
+    """Rescanne un nœud replié et en greffe le détail ; retourne les nœuds modifiés.
+
+    Un dossier replié est rescanné en entier (``subtree``, s'il a déjà été
+    obtenu par ``rescan_subtree``) ; un nœud ``(N petits éléments)`` est
+    remplacé par les fichiers qu'il regroupait, relus dans son dossier (de
+    même pour un dossier qui garde ses sous-dossiers mais contient un tel
+    nœud). Le store doit pouvoir grandir (``can_grow``). ``exclusions`` :
+    règles du scan d'origine (par défaut ``default_exclusions()``).
+    """
+    from core.exclusions import default_exclusions
+    from core.walker import list_directory
+
+    if store.flags[index] & FLAG_DIR and store.child_count[index]:
+        aggregates = [child for child in store.children(index) if store.flags[child] & FLAG_AGGREGATE]
+        if not aggregates:
+            return []
+        index = aggregates[0]
+    if store.flags[index] & FLAG_AGGREGATE:
+        folder = store.parent[index]
+        known = {store.name(child) for child in store.children(folder)}
+        touched = store.remove(index)
+        if exclusions is None:
+            exclusions = default_exclusions()
+        for entry in list_directory(store.path(folder), exclusions, skip_hidden):
+            if not entry[2] and entry[0] not in known:
+                touched += store.add_child(folder, entry)[1]
+        store.flags[folder] &= ~FLAG_COLLAPSED & 0xFF
+        store.unsorted.add(folder)
+        return touched
+    if not store.flags[index] & FLAG_DIR:
+        return []
+    if subtree is None:
+        subtree = rescan_subtree(store, index, policy, skip_hidden, exclusions)
+    return store.expand(index, subtree)
@@ -0,0 +1,43 @@
+import threading
+
+
+class ScanCancelled(Exception):
+    """Levée par ``StopToken.check`` quand le scan a été annulé."""
+
+
+class StopToken:
+    """Jeton d'arrêt coopératif partagé entre l'interface et les moteurs de scan.
+
+    Les moteurs appellent ``check()`` entre deux lots (un dossier en général) :
+    l'appel bloque tant que le scan est en pause et lève ``ScanCancelled``
+    après ``cancel()``. Les résultats déjà rassemblés restent utilisables.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()  # réveille les threads en pause pour qu'ils s'arrêtent
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def check(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise ScanCancelled()
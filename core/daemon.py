@@ -0,0 +1,452 @@
+import hashlib
+import http.client
+import json
+import logging
+import os
+import shutil
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlencode, urlsplit
+
+from core.snapshot import load_snapshot, save_snapshot
+from core.telemetry import ScanTelemetry, log_event
+
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 1000  # enfants renvoyés par requête, au plus
+
+
+class NotReady(Exception):
+    """Pas encore d'index pour la racine : premier scan en cours, ou en échec (``error``)."""
+
+    def __init__(self, root, error=None):
+        super().__init__(root)
+        self.root = root
+        self.error = error
+
+
+class ScanIndex:
+    """Index d'une racine tenu à jour en arrière-plan pour le service.
+
+    Au démarrage, le snapshot d'état (``state_dir``) est rouvert tel quel
+    (mmap) : les requêtes sont servies aussitôt, pendant qu'un
+    rafraîchissement incrémental (``scan_tree(previous=...)``) remet l'index
+    à jour. Ensuite ``TreeWatcher`` applique les changements au fil de l'eau
+    et un nouveau rafraîchissement a lieu toutes les ``refresh_interval``
+    secondes, ou dès que la surveillance a perdu des événements. Le snapshot
+    est réécrit après chaque rafraîchissement et, s'il a changé, toutes les
+    ``save_interval`` secondes.
+
+    Les requêtes et la surveillance se partagent ``lock`` ; un nouveau scan
+    ne le prend que pour remplacer le store, l'écriture du snapshot que pour
+    en copier les colonnes. Un scan en échec est journalisé
+    et laisse l'index à l'état ``error`` (store précédent conservé) jusqu'à
+    la tentative suivante.
+    """
+
+    def __init__(self, root, state_dir=None, workers=1, exclusions=None, refresh_interval=3600,
+                 save_interval=300, watch=True):
+        self.root = os.path.abspath(root)
+        self.snapshot_path = None
+        if state_dir:
+            digest = hashlib.sha1(os.fsencode(self.root)).hexdigest()[:12]
+            name = os.path.basename(self.root.rstrip(os.sep)) or "racine"
+            self.snapshot_path = os.path.join(state_dir, f"{name}-{digest}.fvv")
+        self.workers = workers
+        self.exclusions = exclusions
+        self.refresh_interval = refresh_interval
+        self.save_interval = save_interval
+        self.watch = watch
+        self.lock = threading.RLock()
+        self._save_lock = threading.Lock()  # une seule écriture du snapshot à la fois
+        self.store = None
+        self.generation = 0  # incrémenté à chaque changement du store
+        self.state = "starting"
+        self.scanned_at = None
+        self.scan_seconds = None
+        self.error = None  # message du dernier scan en échec
+        self.watcher = None
+        self._dirty = False
+        self._stop = threading.Event()
+        self._refresh = threading.Event()
+        self._thread = None
+
+    # --- Cycle de vie ---
+
+    def start(self):
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                store = load_snapshot(self.snapshot_path)
+            except (OSError, ValueError) as e:
+                log_event(logging.WARNING, "daemon_state_unreadable", path=self.snapshot_path, error=str(e))
+            else:
+                if store.root_path == self.root:
+                    self._install(store, "stale")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._refresh.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._stop_watcher()
+        self._save()
+
+    def request_refresh(self):
+        self._refresh.set()
+
+    def _stop_watcher(self):
+        # Hors verrou : le thread de surveillance peut attendre ce verrou dans _on_batch
+        with self.lock:
+            watcher, self.watcher = self.watcher, None
+        if watcher is not None:
+            watcher.stop()
+
+    def _install(self, store, state):
+        with self.lock:
+            self.store = store
+            self.generation += 1
+            self.state = state
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._scan()
+            except Exception as e:
+                log_event(logging.ERROR, "daemon_scan_failed", root=self.root,
+                          error=f"{type(e).__name__}: {e}")
+                with self.lock:
+                    self.state = "error"
+                    self.error = f"{type(e).__name__}: {e}"
+            deadline = time.monotonic() + self.refresh_interval
+            last_save = time.monotonic()
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                if self._refresh.wait(min(5.0, self.save_interval)):
+                    break
+                if self.watcher is not None and self.watcher.overflowed:
+                    break  # événements perdus : l'index n'est plus fiable
+                if time.monotonic() - last_save >= self.save_interval:
+                    self._save()
+                    last_save = time.monotonic()
+            self._refresh.clear()
+
+    def _scan(self):
+        from core.watcher import TreeWatcher
+        from core.walker import scan_tree, scan_tree_parallel
+
+        # Le scan relit le store précédent : plus de modifications pendant ce temps
+        self._stop_watcher()
+        previous = self.store
+        with self.lock:
+            self.state = "scanning" if previous is None else "refreshing"
+        telemetry = ScanTelemetry()
+        start = time.monotonic()
+        if self.workers > 1:
+            store = scan_tree_parallel(self.root, self.workers, previous=previous, telemetry=telemetry,
+                                       exclusions=self.exclusions)
+        else:
+            store = scan_tree(self.root, previous=previous, telemetry=telemetry, exclusions=self.exclusions)
+        telemetry.finish()
+        telemetry.log_summary(self.root)
+        self._install(store, "ready")
+        with self.lock:
+            self.scanned_at = time.time()
+            self.scan_seconds = time.monotonic() - start
+            self.error = None
+            self._dirty = True
+        self._save()
+        with self.lock:
+            if self.watch and not self._stop.is_set():
+                watcher = TreeWatcher(store, lambda batch: self._on_batch(watcher, batch),
+                                      exclusions=self.exclusions)
+                self.watcher = watcher
+                watcher.start()
+
+    def _on_batch(self, watcher, batch):
+        with self.lock:
+            if watcher is not self.watcher:
+                return  # lot d'une surveillance arrêtée
+            watcher.apply(batch)
+            self.generation += 1
+            self._dirty = True
+
+    def _save(self):
+        # Sous le verrou, une simple copie des colonnes ; compactage et écriture
+        # (plusieurs secondes sur un gros store) se font hors verrou
+        with self.lock:
+            if not self.snapshot_path or not self._dirty or self.store is None:
+                return
+            store = self.store.copy()
+            self._dirty = False
+        with self._save_lock:
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+                save_snapshot(store, self.snapshot_path)
+            except OSError as e:
+                log_event(logging.WARNING, "daemon_save_failed", path=self.snapshot_path, error=str(e))
+                with self.lock:
+                    self._dirty = True
+
+    # --- Requêtes ---
+
+    def contains(self, path):
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        return path == self.root or path.startswith(prefix)
+
+    def _node(self, path):
+        if self.store is None:
+            raise NotReady(self.root, self.error)
+        index = self.store.find(path)
+        if index < 0:
+            raise KeyError(path)
+        return index
+
+    def _row(self, index):
+        store = self.store
+        return {"name": store.name(index), "size": store.size[index], "is_dir": store.is_dir(index),
+                "mtime": store.mtime[index] // 1_000_000_000}
+
+    def status(self):
+        with self.lock:
+            return {"root": self.root, "state": self.state, "generation": self.generation,
+                    "entries": len(self.store) - 1 if self.store is not None else 0,
+                    "size": self.store.size[0] if self.store is not None else 0,
+                    "scanned_at": self.scanned_at, "scan_seconds": self.scan_seconds, "error": self.error,
+                    "watch": self.watcher.backend if self.watcher is not None else None}
+
+    def children(self, path, sort="size", min_size=0, limit=DEFAULT_LIMIT, offset=0):
+        """Enfants de ``path`` d'au moins ``min_size`` octets, par taille ou par nom."""
+        with self.lock:
+            store = self.store
+            index = self._node(path)
+            nodes = store.children_by_size(index)[:store.count_at_least(index, min_size)]
+            if sort == "name":
+                nodes = sorted(nodes, key=store.name)
+            elif sort != "size":
+                raise ValueError(f"tri inconnu : {sort}")
+            return {"path": path, "size": store.size[index], "generation": self.generation,
+                    "count": len(nodes), "offset": offset,
+                    "children": [self._row(node) for node in nodes[offset:offset + limit]]}
+
+    def total(self, path):
+        """Taille et nombre de fichiers du sous-arbre ``path``."""
+        with self.lock:
+            store = self.store
+            index = self._node(path)
+            return {"path": path, "size": store.size[index], "is_dir": store.is_dir(index),
+                    "files": store.count_files(index) if store.is_dir(index) else 1,
+                    "pending": store.is_pending(index), "generation": self.generation}
+
+    def top(self, path, count=10, dirs=False):
+        """Les ``count`` plus gros fichiers (ou dossiers) sous ``path``."""
+        with self.lock:
+            store = self.store
+            index = self._node(path)
+            return {"path": path, "generation": self.generation,
+                    "entries": [{"path": store.path(node), "size": store.size[node]}
+                                for node in store.largest_descendants(index, count, dirs)]}
+
+
+class ScanService:
+    """Ensemble d'index servis ensemble ; une requête va à la racine qui contient son chemin."""
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+
+    def start(self):
+        for index in self.indexes:
+            index.start()
+
+    def stop(self):
+        for index in self.indexes:
+            index.stop()
+
+    def index_for(self, path):
+        path = os.path.abspath(path)
+        matches = [index for index in self.indexes if index.contains(path)]
+        if not matches:
+            raise KeyError(path)
+        return max(matches, key=lambda index: len(index.root)), path
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """API JSON en lecture (``GET``) ; ``POST /refresh`` relance un scan.
+
+    ``/status`` ; ``/children?path=&sort=size|name&min_size=&limit=&offset=`` ;
+    ``/total?path=`` ; ``/top?path=&n=&dirs=1`` ; ``/snapshot?root=`` (fichier
+    ``.fvv`` de l'index, à ouvrir avec ``load_snapshot``).
+    """
+
+    server_version = "FileVolumeVisualizer"
+
+    def log_message(self, format, *args):
+        log_event(logging.DEBUG, "daemon_request", request=format % args)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        service = self.server.service
+        if url.path not in ("/status", "/children", "/total", "/top", "/snapshot"):
+            self._send_json(404, {"error": f"point d'accès inconnu : {url.path}"})
+            return
+        try:
+            if url.path == "/status":
+                self._send_json(200, {"roots": [index.status() for index in service.indexes]})
+                return
+            index, path = service.index_for(params.get("path") or params.get("root") or "")
+            if url.path == "/children":
+                data = index.children(path, params.get("sort", "size"), int(params.get("min_size", 0)),
+                                      int(params.get("limit", DEFAULT_LIMIT)), int(params.get("offset", 0)))
+            elif url.path == "/total":
+                data = index.total(path)
+            elif url.path == "/top":
+                data = index.top(path, int(params.get("n", 10)), params.get("dirs") in ("1", "true"))
+            else:
+                self._send_snapshot(index)
+                return
+        except KeyError as e:
+            self._send_json(404, {"error": f"chemin inconnu : {e.args[0]}"})
+        except NotReady as e:
+            if e.error:
+                message = f"premier scan en échec ({e.error}), nouvel essai au prochain rafraîchissement : {e.root}"
+            else:
+                message = f"premier scan en cours : {e.root}"
+            self._send_json(503, {"error": message})
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+        else:
+            self._send_json(200, data)
+
+    def _send_snapshot(self, index):
+        index._save()
+        with index._save_lock:
+            if not index.snapshot_path or not os.path.exists(index.snapshot_path):
+                raise NotReady(index.root)
+            # Ouvert après l'écriture en cours ; un remplacement ultérieur ne le touche pas
+            f = open(index.snapshot_path, "rb")
+        with f:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+            self.end_headers()
+            try:
+                shutil.copyfileobj(f, self.wfile)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client parti en cours de transfert
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/refresh":
+            self._send_json(404, {"error": f"point d'accès inconnu : {url.path}"})
+            return
+        for index in self.server.service.indexes:
+            index.request_refresh()
+        self._send_json(202, {"refresh": [index.root for index in self.server.service.indexes]})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, port=DEFAULT_PORT, socket_path=None, socket_mode=0o600):
+    """Serveur HTTP du service : socket Unix (``socket_path``) ou ``127.0.0.1:port``.
+
+    Le port local est ouvert à tous les utilisateurs de la machine ; le
+    socket Unix est restreint par ``socket_mode`` (propriétaire seul par
+    défaut, 0o666 pour tous).
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # socket d'une exécution précédente
+        server = UnixHTTPServer(socket_path, RequestHandler)
+        os.chmod(socket_path, socket_mode)
+    else:
+        server = ThreadingHTTPServer(("127.0.0.1", port), RequestHandler)
+    server.service = service
+    return server
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class DaemonClient:
+    """Client du service : ``address`` vaut ``unix:/chemin/du/socket`` ou ``http://hôte:port``."""
+
+    def __init__(self, address=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=10.0):
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self):
+        if self.address.startswith("unix:"):
+            return _UnixConnection(self.address[len("unix:"):], self.timeout)
+        url = urlsplit(self.address if "//" in self.address else "http://" + self.address)
+        return http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=self.timeout)
+
+    def _request(self, method, endpoint, params=None):
+        connection = self._connection()
+        query = "?" + urlencode(params) if params else ""
+        try:
+            connection.request(method, quote(endpoint) + query)
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+        if response.status >= 400:
+            try:
+                message = json.loads(body)["error"]
+            except (ValueError, KeyError):
+                message = response.reason
+            raise DaemonError(response.status, message)
+        return body
+
+    def _get(self, endpoint, **params):
+        return json.loads(self._request("GET", endpoint, params))
+
+    def status(self):
+        return self._get("/status")["roots"]
+
+    def children(self, path, sort="size", min_size=0, limit=DEFAULT_LIMIT, offset=0):
+        return self._get("/children", path=path, sort=sort, min_size=min_size, limit=limit, offset=offset)
+
+    def total(self, path):
+        return self._get("/total", path=path)
+
+    def top(self, path, count=10, dirs=False):
+        return self._get("/top", path=path, n=count, dirs=int(dirs))["entries"]
+
+    def refresh(self):
+        return json.loads(self._request("POST", "/refresh"))
+
+    def fetch_snapshot(self, root, path):
+        """Copie le snapshot de l'index de ``root`` dans ``path`` (à ouvrir avec ``load_snapshot``)."""
+        with open(path, "wb") as f:
+            f.write(self._request("GET", "/snapshot", {"root": root}))
+        return path
@@ -0,0 +1,168 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.telemetry import ScanTelemetry
+
+# Threads de scan par périphérique selon son type : un SSD encaisse beaucoup
+# de requêtes en parallèle, un disque à plateaux s'effondre en déplacements
+# de tête, un montage réseau sature le serveur.
+DEFAULT_CONCURRENCY = {"ssd": 16, "hdd": 2, "network": 4, "unknown": 4}
+
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "ceph", "glusterfs",
+              "fuse.sshfs", "fuse.rclone", "davfs", "fuse.s3fs"}
+# Systèmes de fichiers virtuels : pas de volume à analyser
+PSEUDO_FS = {"proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "cgroup", "cgroup2", "securityfs",
+             "pstore", "debugfs", "tracefs", "configfs", "fusectl", "mqueue", "hugetlbfs",
+             "bpf", "autofs", "binfmt_misc", "rpc_pipefs", "nsfs", "squashfs", "efivarfs",
+             "ramfs"}
+
+Mount = namedtuple("Mount", "path fstype device")
+VolumeResult = namedtuple("VolumeResult", "root device kind workers store seconds telemetry")
+
+
+def _unescape(field):
+    # Espaces et tabulations des points de montage : « \040 », « \011 »
+    return field.replace("\\040", " ").replace("\\011", "\t").replace("\\134", "\\")
+
+
+def list_mounts():
+    """Points de montage (``/proc/self/mountinfo``) ; liste vide hors Linux."""
+    mounts = []
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields = line.split()
+                separator = fields.index("-")
+                major, minor = fields[2].split(":")
+                mounts.append(Mount(_unescape(fields[4]), fields[separator + 1],
+                                    os.makedev(int(major), int(minor))))
+    except (OSError, ValueError):
+        return []
+    return mounts
+
+
+def volumes():
+    """Points de montage de vrais volumes (disques, partages réseau), sans doublons."""
+    seen = set()
+    result = []
+    for mount in list_mounts():
+        if mount.fstype in PSEUDO_FS or mount.device in seen:
+            continue
+        seen.add(mount.device)
+        result.append(mount.path)
+    return result
+
+
+def _mount_of(path, mounts):
+    best = None
+    for mount in mounts:
+        prefix = mount.path.rstrip(os.sep) + os.sep
+        if path != mount.path and not path.startswith(prefix):
+            continue
+        if best is None or len(mount.path) > len(best.path):
+            best = mount
+    return best
+
+
+def device_kind(path, mounts=None):
+    """``ssd``, ``hdd``, ``network`` ou ``unknown`` pour le volume contenant ``path``."""
+    mount = _mount_of(os.path.abspath(path), list_mounts() if mounts is None else mounts)
+    if mount is None:
+        return "unknown"
+    if mount.fstype in NETWORK_FS:
+        return "network"
+    block = f"/sys/dev/block/{os.major(mount.device)}:{os.minor(mount.device)}"
+    # Une partition n'a pas de « queue » : on prend celle du disque parent
+    for queue in (os.path.join(block, "queue"), os.path.join(block, "..", "queue")):
+        try:
+            with open(os.path.join(queue, "rotational")) as f:
+                return "hdd" if f.read().strip() == "1" else "ssd"
+        except OSError:
+            continue
+    return "unknown"
+
+
+class DeviceScheduler:
+    """Scanne plusieurs racines à la fois, regroupées par périphérique (``st_dev``).
+
+    Chaque périphérique a sa propre file de racines, parcourues l'une après
+    l'autre avec ``concurrency[type]`` threads ; les périphériques avancent
+    en parallèle. La durée totale est donc celle du volume le plus lent, et
+    un disque à plateaux n'est pas noyé sous les requêtes destinées au SSD.
+    Chaque parcours s'arrête aux frontières de système de fichiers (comme
+    ``du -x``) : un volume monté sous une autre racine n'est compté qu'une
+    fois.
+
+    ``on_root_done(VolumeResult)`` est appelé (depuis le thread du
+    périphérique) à la fin de chaque racine ; ``progress_callback(racine,
+    octets, entrées)`` pendant les scans (totaux provisoires de la racine).
+    ``exclusions`` : voir ``core.walker.TreeWalker``.
+    """
+
+    def __init__(self, roots, concurrency=None, stop_token=None, progress_callback=None,
+                 on_root_done=None, exclusions=None):
+        self.roots = list(roots)
+        self.exclusions = exclusions
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        self.stop_token = stop_token
+        self.progress_callback = progress_callback
+        self.on_root_done = on_root_done
+        mounts = list_mounts()
+        self.groups = {}  # st_dev -> racines
+        self.kinds = {}  # st_dev -> type de périphérique
+        self.errors = {}  # racine -> OSError
+        for root in self.roots:
+            try:
+                device = os.stat(root).st_dev
+            except OSError as e:
+                self.errors[root] = e
+                continue
+            self.groups.setdefault(device, []).append(root)
+            self.kinds.setdefault(device, device_kind(root, mounts))
+
+    def workers(self, device):
+        return max(1, self.concurrency.get(self.kinds[device], DEFAULT_CONCURRENCY["unknown"]))
+
+    def _scan_device(self, device):
+        from core.store import NodeStore
+        from core.walker import scan_tree, scan_tree_parallel
+
+        results = []
+        workers = self.workers(device)
+        for root in self.groups[device]:
+            if self.stop_token is not None and self.stop_token.cancelled:
+                break
+            telemetry = ScanTelemetry()
+            store = NodeStore(root)
+            progress = None
+            if self.progress_callback is not None:
+                progress = lambda scanned, root=root, store=store: self.progress_callback(
+                    root, store.size[0], scanned)
+            start = time.monotonic()
+            if workers > 1:
+                store = scan_tree_parallel(root, workers, progress, store=store, stop_token=self.stop_token,
+                                           telemetry=telemetry, one_filesystem=True,
+                                           exclusions=self.exclusions)
+            else:
+                store = scan_tree(root, progress, store=store, stop_token=self.stop_token,
+                                  telemetry=telemetry, one_filesystem=True, exclusions=self.exclusions)
+            telemetry.finish()
+            telemetry.log_summary(root)
+            result = VolumeResult(root, device, self.kinds[device], workers, store,
+                                  time.monotonic() - start, telemetry)
+            results.append(result)
+            if self.on_root_done is not None:
+                self.on_root_done(result)
+        return results
+
+    def run(self):
+        """Scanne tout ; retourne les ``VolumeResult`` dans l'ordre des racines."""
+        if not self.groups:
+            return []
+        with ThreadPoolExecutor(max_workers=len(self.groups)) as pool:
+            done = [result for results in pool.map(self._scan_device, self.groups)
+                    for result in results]
+        order = {root: position for position, root in enumerate(self.roots)}
+        return sorted(done, key=lambda result: order[result.root])
@@ -0,0 +1,129 @@
+import os
+from collections import namedtuple
+from itertools import takewhile
+from operator import attrgetter
+
+from core.store import FLAG_DIR
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+
+
+class DiffEntry(namedtuple("DiffEntry", "path kind is_dir old_size new_size")):
+    __slots__ = ()
+
+    @property
+    def delta(self):
+        return self.new_size - self.old_size
+
+
+class TreeDiff:
+    """Différences entre deux scans (``NodeStore``) d'une même racine.
+
+    ``entries`` : chemins ajoutés, supprimés ou dont la taille a changé, par
+    écart décroissant (les plus fortes croissances d'abord). Un dossier
+    ajouté ou supprimé apparaît seul, sans son contenu. ``deltas`` associe
+    aux nœuds du nouveau scan leur écart d'octets (taille entière pour un
+    ajout) ; les nœuds absents sont inchangés.
+    """
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.entries = []
+        self.deltas = {}
+        self.added = set()  # nœuds du nouveau scan absents de l'ancien
+
+    @property
+    def total_delta(self):
+        return self.new.size[0] - self.old.size[0]
+
+    def growth(self, count=None):
+        """Les plus fortes croissances d'abord."""
+        grown = list(takewhile(lambda entry: entry.delta > 0, self.entries))
+        return grown[:count] if count else grown
+
+    def shrinkage(self, count=None):
+        """Les plus fortes diminutions d'abord."""
+        shrunk = [entry for entry in reversed(self.entries) if entry.delta < 0]
+        return shrunk[:count] if count else shrunk
+
+
+def _name_key(store):
+    names = store.names
+    name_end = store.name_end
+
+    def key(index):
+        return bytes(names[name_end[index - 1] if index else 0:name_end[index]])
+    return key
+
+
+def diff_stores(old, new):
+    """Compare ``old`` et ``new`` dossier par dossier ; retourne un ``TreeDiff``.
+
+    Les enfants de chaque paire de dossiers sont triés par nom puis
+    fusionnés (jointure de deux listes triées). Un dossier dont le total n'a
+    pas changé n'est pas parcouru : le coût suit la taille de ce qui a
+    changé, pas celle des arbres.
+    """
+    if old.root_path != new.root_path:
+        raise ValueError(f"Racines différentes : {old.root_path} / {new.root_path}")
+    diff = TreeDiff(old, new)
+    entries = diff.entries
+    deltas = diff.deltas
+    added = diff.added
+    old_key = _name_key(old)
+    new_key = _name_key(new)
+    old_size, new_size = old.size, new.size
+    old_flags, new_flags = old.flags, new.flags
+    fsdecode = os.fsdecode
+
+    stack = []
+    if old_size[0] != new_size[0]:
+        entries.append(DiffEntry(new.root_path, CHANGED, True, old_size[0], new_size[0]))
+        deltas[0] = new_size[0] - old_size[0]
+        stack.append((0, 0, new.root_path))
+    while stack:
+        old_dir, new_dir, path = stack.pop()
+        olds = sorted((old_key(c), c) for c in old.children(old_dir))
+        news = sorted((new_key(c), c) for c in new.children(new_dir))
+        prefix = path if path.endswith(os.sep) else path + os.sep
+        old_count, new_count = len(olds), len(news)
+        i = j = 0
+        while i < old_count or j < new_count:
+            if j == new_count or (i < old_count and olds[i][0] < news[j][0]):
+                name, o = olds[i]
+                entries.append(DiffEntry(prefix + fsdecode(name), REMOVED,
+                                         bool(old_flags[o] & FLAG_DIR), old_size[o], 0))
+                i += 1
+                continue
+            if i == old_count or news[j][0] < olds[i][0]:
+                name, n = news[j]
+                entries.append(DiffEntry(prefix + fsdecode(name), ADDED,
+                                         bool(new_flags[n] & FLAG_DIR), 0, new_size[n]))
+                deltas[n] = new_size[n]
+                added.add(n)
+                j += 1
+                continue
+            (name, o), (_, n) = olds[i], news[j]
+            i += 1
+            j += 1
+            is_dir = bool(new_flags[n] & FLAG_DIR)
+            if bool(old_flags[o] & FLAG_DIR) != is_dir:
+                # Fichier remplacé par un dossier (ou l'inverse)
+                child_path = prefix + fsdecode(name)
+                entries.append(DiffEntry(child_path, REMOVED, not is_dir, old_size[o], 0))
+                entries.append(DiffEntry(child_path, ADDED, is_dir, 0, new_size[n]))
+                deltas[n] = new_size[n]
+                added.add(n)
+                continue
+            if old_size[o] == new_size[n]:
+                continue  # total identique : sous-arbre ignoré
+            child_path = prefix + fsdecode(name)
+            entries.append(DiffEntry(child_path, CHANGED, is_dir, old_size[o], new_size[n]))
+            deltas[n] = new_size[n] - old_size[o]
+            if is_dir:
+                stack.append((o, n, child_path))
+    entries.sort(key=attrgetter("delta"), reverse=True)
+    return diff
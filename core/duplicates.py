@@ -0,0 +1,196 @@
+import hashlib
+import os
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from core.control import ScanCancelled
+from core.store import FLAG_DIR, FLAG_REMOVED, FLAG_AGGREGATE
+
+PARTIAL_BYTES = 8 * 1024  # lus au début et à la fin de chaque candidat
+CHUNK_SIZE = 1024 * 1024  # lectures séquentielles du hachage complet
+DEFAULT_WORKERS = 4
+
+
+class DuplicateGroup(namedtuple("DuplicateGroup", "size digest paths")):
+    """Fichiers de même contenu ; ``wasted`` = octets récupérables en n'en gardant qu'un."""
+
+    __slots__ = ()
+
+    @property
+    def wasted(self):
+        return self.size * (len(self.paths) - 1)
+
+
+def _open_sequential(path):
+    f = open(path, "rb", buffering=0)
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+    return f
+
+
+def partial_hash(path, size):
+    """Empreinte du début et de la fin du fichier, plus son identité ``(st_dev, st_ino)``.
+
+    Retourne ``None`` si le fichier a disparu ou changé de taille depuis le scan.
+    """
+    with _open_sequential(path) as f:
+        st = os.fstat(f.fileno())
+        if st.st_size != size:
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f.read(PARTIAL_BYTES))
+        if size > 2 * PARTIAL_BYTES:
+            f.seek(size - PARTIAL_BYTES)
+            digest.update(f.read(PARTIAL_BYTES))
+        elif size > PARTIAL_BYTES:
+            digest.update(f.read())  # petit fichier : lu entièrement
+    return digest.digest(), (st.st_dev, st.st_ino)
+
+
+def full_hash(path, stop_token=None):
+    """Empreinte du contenu complet, par blocs de ``CHUNK_SIZE`` dans un tampon réutilisé."""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with _open_sequential(path) as f:
+        while True:
+            if stop_token is not None:
+                stop_token.check()
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.digest()
+
+
+class DuplicateFinder:
+    """Recherche les fichiers en double d'un ``NodeStore`` en trois filtres successifs.
+
+    1. taille exacte (déjà connue du scan, aucune lecture) ;
+    2. empreinte des ``PARTIAL_BYTES`` premiers et derniers octets ;
+    3. empreinte complète, seulement pour les groupes restants.
+
+    Les lectures passent par un pool de ``workers`` threads avec au plus
+    ``2 * workers`` fichiers en vol. Les liens physiques d'un même fichier
+    ne comptent qu'une fois. ``progress_callback(étape, faits, total)`` est
+    appelé après chaque fichier lu ; ``bytes_read`` mesure le volume lu.
+    """
+
+    def __init__(self, store, min_size=1, workers=DEFAULT_WORKERS, stop_token=None,
+                 progress_callback=None):
+        self.store = store
+        self.min_size = max(1, min_size)
+        self.workers = workers
+        self.stop_token = stop_token
+        self.progress_callback = progress_callback
+        self.bytes_read = 0
+        self.files_read = 0
+        self.errors = 0
+        self.cancelled = False
+
+    def size_groups(self):
+        """Tailles partagées par au moins deux fichiers -> indices des nœuds."""
+        store = self.store
+        by_size = defaultdict(list)
+        min_size = self.min_size
+        size = store.size
+        skip = FLAG_DIR | FLAG_REMOVED | FLAG_AGGREGATE  # regroupements : pas de fichier à lire
+        for index, flags in enumerate(store.flags):
+            if not flags & skip and size[index] >= min_size:
+                by_size[size[index]].append(index)
+        return {s: nodes for s, nodes in by_size.items() if len(nodes) > 1}
+
+    def _map(self, stage, func, items):
+        """Applique ``func(*item)`` dans le pool ; génère ``(item, résultat)``."""
+        total = len(items)
+        done = 0
+        pending = set()
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                while True:
+                    while len(pending) < 2 * self.workers:
+                        item = next(items, None)
+                        if item is None:
+                            break
+                        future = pool.submit(func, *item)
+                        future.item = item
+                        pending.add(future)
+                    if not pending:
+                        return
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        done += 1
+                        if self.progress_callback is not None:
+                            self.progress_callback(stage, done, total)
+                        try:
+                            result = future.result()
+                        except OSError:
+                            self.errors += 1
+                            continue
+                        self.files_read += 1
+                        yield future.item, result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _partial(self, size, path):
+        if self.stop_token is not None:
+            self.stop_token.check()
+        return partial_hash(path, size)
+
+    def _full(self, size, path):
+        return full_hash(path, self.stop_token)
+
+    def run(self):
+        """Retourne les groupes de doublons, les plus coûteux en premier.
+
+        En cas d'annulation, seuls les groupes déjà confirmés sont rendus.
+        """
+        store = self.store
+        groups = []
+        try:
+            candidates = [(size, store.path(index))
+                          for size, nodes in self.size_groups().items() for index in nodes]
+
+            by_partial = defaultdict(list)
+            seen = set()
+            for (size, path), result in self._map("partial", self._partial, candidates):
+                self.bytes_read += min(size, 2 * PARTIAL_BYTES)
+                if result is None:
+                    continue
+                digest, identity = result
+                if identity in seen:
+                    continue  # lien physique vers un fichier déjà compté
+                seen.add(identity)
+                by_partial[size, digest].append(path)
+
+            to_hash = []
+            for (size, digest), paths in by_partial.items():
+                if len(paths) < 2:
+                    continue
+                if size <= 2 * PARTIAL_BYTES:
+                    # L'empreinte partielle couvre déjà tout le fichier
+                    groups.append(DuplicateGroup(size, digest, sorted(paths)))
+                else:
+                    to_hash.extend((size, path) for path in paths)
+
+            by_full = defaultdict(list)
+            for (size, path), digest in self._map("full", self._full, to_hash):
+                self.bytes_read += size
+                by_full[size, digest].append(path)
+            for (size, digest), paths in by_full.items():
+                if len(paths) > 1:
+                    groups.append(DuplicateGroup(size, digest, sorted(paths)))
+        except ScanCancelled:
+            self.cancelled = True
+        groups.sort(key=lambda group: group.wasted, reverse=True)
+        return groups
+
+
+def find_duplicates(store, min_size=1, workers=DEFAULT_WORKERS, stop_token=None,
+                    progress_callback=None):
+    return DuplicateFinder(store, min_size, workers, stop_token, progress_callback).run()
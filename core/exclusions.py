@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+from collections import namedtuple
+from fnmatch import translate
+
+from core.devices import PSEUDO_FS, list_mounts
+
+RULE_KINDS = ("glob", "regex", "path", "fstype")
+
+# Systèmes de fichiers sans données à compter (tmpfs, ramfs et squashfs
+# contiennent de vrais fichiers : ils restent analysés ; un point autofs ne
+# fait que déclencher le montage de vraies données, /home ou /boot par exemple)
+VIRTUAL_FS = PSEUDO_FS - {"tmpfs", "ramfs", "squashfs", "autofs"}
+
+WINDOWS_FOLDERS = (
+    "C:\\Windows",
+    "C:\\Users\\Default",
+    "C:\\Users\\All Users",
+    "C:\\Users\\Public",
+    "C:\\$Recycle.Bin",
+    "C:\\System Volume Information",
+    "C:\\Recovery",
+    "C:\\PerfLogs",
+)
+
+
+class Rule(namedtuple("Rule", "kind pattern")):
+    """Règle d'exclusion : ``glob`` (nom, ou chemin si le motif contient un
+    séparateur), ``regex`` (recherchée dans le chemin complet), ``path``
+    (dossier et tout son contenu) ou ``fstype`` (points de montage de ce type)."""
+
+    __slots__ = ()
+
+    @property
+    def label(self):
+        return f"{self.kind}:{self.pattern}"
+
+
+def parse_rule(text):
+    """``"regex:\\.cache$"`` -> ``Rule("regex", "\\.cache$")``.
+
+    Sans préfixe, un chemin absolu est une règle ``path``, le reste un ``glob``.
+    """
+    kind, separator, pattern = text.partition(":")
+    if separator and kind in RULE_KINDS:
+        if not pattern:
+            raise ValueError(f"règle vide : {text!r}")
+        if kind == "regex":
+            re.compile(pattern)  # erreur de syntaxe dès la lecture de la règle
+        return Rule(kind, pattern)
+    return Rule("path" if os.path.isabs(text) else "glob", text)
+
+
+def default_rules(platform=sys.platform):
+    """Exclusions par défaut de la plateforme : systèmes de fichiers virtuels."""
+    if platform.startswith("linux"):
+        rules = [Rule("path", path) for path in ("/proc", "/sys", "/dev")]
+        return rules + [Rule("fstype", fstype) for fstype in sorted(VIRTUAL_FS)]
+    if platform == "darwin":
+        # /System/Volumes/Data réexpose tout le disque sous /
+        return [Rule("path", "/dev"), Rule("path", "/System/Volumes")]
+    if platform == "win32":
+        rules = [Rule("path", path) for path in WINDOWS_FOLDERS]
+        return rules + [Rule("path", os.path.join(os.path.expanduser("~"), "AppData"))]
+    return []
+
+
+def _regex(rule):
+    # Un glob couvre tout le chemin ; une regex peut n'en trouver qu'une partie
+    return r"\A" + translate(rule.pattern) if rule.kind == "glob" else rule.pattern
+
+
+def _any(patterns, flags):
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags).search
+
+
+class ExclusionRules:
+    """Jeu de règles compilé une fois, consulté pour chaque ``DirEntry``.
+
+    ``match(chemin, nom)`` ne demande aucun ``stat`` : les règles ``path``
+    et ``fstype`` (résolues en points de montage à la compilation) sont une
+    table de chemins exacts, chaque dossier exclu n'étant jamais parcouru ;
+    les globs de noms forment une seule expression régulière, de même que
+    les globs de chemins et les regex. Ce n'est qu'en cas de succès que la
+    règle responsable est cherchée, pour les compteurs de
+    ``ScanTelemetry.pruned``. Sous Windows, la casse est ignorée.
+    """
+
+    def __init__(self, rules=(), mounts=None):
+        self.rules = list(rules)
+        self.fold = os.name == "nt"
+        flags = re.IGNORECASE if self.fold else 0
+        self.paths = {}  # chemin exact -> règle
+        self._name_globs = []
+        self._path_patterns = []  # (règle, recherche compilée)
+        fstypes = {}
+        for rule in self.rules:
+            if rule.kind == "path":
+                path = os.path.abspath(rule.pattern)
+                self.paths.setdefault(path.lower() if self.fold else path, rule)
+            elif rule.kind == "fstype":
+                fstypes.setdefault(rule.pattern, rule)
+            elif rule.kind == "glob" and os.sep not in rule.pattern and "/" not in rule.pattern:
+                self._name_globs.append((rule, re.compile(translate(rule.pattern), flags).match))
+            else:
+                self._path_patterns.append((rule, re.compile(_regex(rule), flags).search))
+        if fstypes:
+            for mount in list_mounts() if mounts is None else mounts:
+                rule = fstypes.get(mount.fstype)
+                if rule is not None:
+                    self.paths.setdefault(mount.path.lower() if self.fold else mount.path, rule)
+        self._name_any = None
+        if self._name_globs:
+            self._name_any = _any([r"\A" + translate(rule.pattern) for rule, _ in self._name_globs], flags)
+        self._path_any = None
+        if self._path_patterns:
+            self._path_any = _any([_regex(rule) for rule, _ in self._path_patterns], flags)
+
+    def __bool__(self):
+        return bool(self.paths or self._name_any or self._path_any)
+
+    def match(self, path, name):
+        """Règle qui exclut l'entrée ``name`` de chemin ``path``, ou ``None``."""
+        if self.paths:
+            rule = self.paths.get(path.lower() if self.fold else path)
+            if rule is not None:
+                return rule
+        if self._name_any is not None and self._name_any(name):
+            for rule, match in self._name_globs:
+                if match(name):
+                    return rule
+        if self._path_any is not None and self._path_any(path):
+            for rule, search in self._path_patterns:
+                if search(path):
+                    return rule
+        return None
+
+
+_defaults = None
+
+
+def default_exclusions():
+    """Règles par défaut compilées (table des montages lue au premier appel)."""
+    global _defaults
+    if _defaults is None:
+        _defaults = ExclusionRules(default_rules())
+    return _defaults
+
+
+def build_exclusions(specs=(), defaults=True):
+    """Compile les règles ``specs`` (textes pour ``parse_rule``), avec ou sans celles par défaut."""
+    rules = default_rules() if defaults else []
+    rules += [parse_rule(spec) for spec in specs]
+    return ExclusionRules(rules)
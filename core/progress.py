@@ -0,0 +1,95 @@
+import os
+import shutil
+import time
+from collections import namedtuple
+
+# fraction : 0..1, ou None si le total est inconnu ; eta en secondes (ou None)
+Progress = namedtuple("Progress", "fraction bytes_done entries_done bytes_per_s entries_per_s eta")
+
+
+def estimate_work(path, previous=None):
+    """Estime (octets, entrées) à parcourir sous ``path``.
+
+    Un scan précédent de la même racine donne l'estimation la plus fiable.
+    Sinon, pour un point de montage, on prend l'espace et les inodes utilisés
+    du volume (``os.statvfs``). Retourne ``(None, None)`` pour un simple
+    dossier sans historique.
+    """
+    if previous is not None and previous.root_path == path:
+        return previous.size[0], len(previous)
+    if not os.path.ismount(path):
+        return None, None
+    if hasattr(os, "statvfs"):
+        try:
+            st = os.statvfs(path)
+        except OSError:
+            return None, None
+        used_bytes = (st.f_blocks - st.f_bfree) * st.f_frsize
+        used_inodes = st.f_files - st.f_ffree if st.f_files else None
+        return used_bytes, used_inodes
+    try:
+        return shutil.disk_usage(path).used, None
+    except OSError:
+        return None, None
+
+
+class ProgressTracker:
+    """Calcule avancement, débits et ETA d'un scan, à débit de publication borné.
+
+    ``update`` renvoie un ``Progress`` au plus une fois par ``interval``
+    secondes (sinon ``None``). Les débits sont lissés (moyenne exponentielle)
+    et l'avancement plafonne à 99 % tant que le scan n'est pas fini, les
+    estimations n'étant jamais exactes.
+    """
+
+    def __init__(self, path, previous=None, interval=0.2, smoothing=0.3):
+        self.total_bytes, self.total_entries = estimate_work(path, previous)
+        self.interval = interval
+        self.smoothing = smoothing
+        self.start = time.monotonic()
+        self._last_time = self.start
+        self._last_bytes = 0
+        self._last_entries = 0
+        self._bytes_rate = None
+        self._entries_rate = None
+
+    def fraction(self, bytes_done, entries_done):
+        fractions = []
+        if self.total_bytes:
+            fractions.append(bytes_done / self.total_bytes)
+        if self.total_entries:
+            fractions.append(entries_done / self.total_entries)
+        if not fractions:
+            return None
+        # Octets et entrées ne progressent pas au même rythme : on prend la moyenne
+        return min(0.99, sum(fractions) / len(fractions))
+
+    def _smooth(self, previous, value):
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def update(self, bytes_done, entries_done, force=False):
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        if not force and elapsed < self.interval:
+            return None
+        if elapsed > 0:
+            self._bytes_rate = self._smooth(self._bytes_rate, (bytes_done - self._last_bytes) / elapsed)
+            self._entries_rate = self._smooth(self._entries_rate, (entries_done - self._last_entries) / elapsed)
+        self._last_time = now
+        self._last_bytes = bytes_done
+        self._last_entries = entries_done
+
+        fraction = self.fraction(bytes_done, entries_done)
+        eta = None
+        total_elapsed = now - self.start
+        if fraction:
+            eta = total_elapsed * (1 - fraction) / fraction
+        return Progress(fraction, bytes_done, entries_done,
+                        self._bytes_rate or 0.0, self._entries_rate or 0.0, eta)
+
+    def finish(self, bytes_done, entries_done):
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        return Progress(1.0, bytes_done, entries_done,
+                        bytes_done / elapsed, entries_done / elapsed, 0.0)
@@ -0,0 +1,67 @@
+from PyQt6.QtCore import QObject, pyqtSignal, QTimer
+from core.control import StopToken
+from core.progress import ProgressTracker
+from core.telemetry import ScanTelemetry, logger
+from core.walker import TreeWalker
+
+
+class DirectoryScanner(QObject):
+    """Adaptateur Qt : scan pas à pas sur le thread de l'interface (un dossier par tick)."""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)  # ✅ NodeStore (arbre compact)
+
+    def __init__(self, base_path, stop_token=None, telemetry=None):
+        super().__init__()
+        self.base_path = base_path
+        self.telemetry = telemetry if telemetry is not None else ScanTelemetry()
+        self.walker = TreeWalker(base_path, telemetry=self.telemetry)
+        self.tracker = ProgressTracker(base_path)
+        self.stop_token = stop_token if stop_token is not None else StopToken()
+        self.result = self.walker.store
+        self.total_scanned = 0
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.process_next)
+
+    def start(self):
+        self.timer.start(10)
+
+    def cancel(self):
+        self.stop_token.cancel()
+
+    def pause(self):
+        self.stop_token.pause()
+
+    def resume(self):
+        self.stop_token.resume()
+
+    def process_next(self):
+        # Pas d'attente bloquante ici (thread Qt) : on saute le tick en pause
+        if self.stop_token.paused:
+            return
+        if self.stop_token.cancelled:
+            # Annulé : on rend les résultats partiels
+            self._finish()
+            return
+        # Un dossier listé par tick ; les tailles remontent en post-ordre
+        try:
+            more = self.walker.step()
+        except Exception:
+            logger.exception("scan_failed", extra={"fields": {"root": self.base_path}})
+            self._finish()
+            return
+        if not more:
+            self.progress.emit(100)
+            self._finish()
+            return
+
+        self.total_scanned = self.walker.total_scanned
+        info = self.tracker.update(self.result.size[0], self.total_scanned)
+        # Pourcentage estimé (octets et inodes) ; -1 si le total est inconnu
+        if info is not None:
+            self.progress.emit(int(info.fraction * 100) if info.fraction is not None else -1)
+
+    def _finish(self):
+        self.timer.stop()
+        self.telemetry.finish()
+        self.telemetry.log_summary(self.base_path)
+        self.finished.emit(self.result)
@@ -0,0 +1,132 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import compress, repeat
+
+try:  # facultatif : accélère les regroupements sur des dizaines de millions de fichiers
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.store import FLAG_DIR
+
+Rollup = namedtuple("Rollup", "name count size")
+
+# Bornes supérieures (exclues) des tranches de taille
+SIZE_BUCKETS = (
+    ("< 4 Ko", 4 * 1024),
+    ("4 Ko – 64 Ko", 64 * 1024),
+    ("64 Ko – 1 Mo", 1024 ** 2),
+    ("1 Mo – 16 Mo", 16 * 1024 ** 2),
+    ("16 Mo – 256 Mo", 256 * 1024 ** 2),
+    ("256 Mo – 4 Go", 4 * 1024 ** 3),
+    ("≥ 4 Go", None),
+)
+_BOUNDS = [bound for _, bound in SIZE_BUCKETS[:-1]]
+
+CATEGORIES = {
+    "Images": ".jpg .jpeg .png .gif .bmp .tif .tiff .webp .heic .raw .cr2 .nef .svg .ico .psd",
+    "Vidéos": ".mp4 .mkv .avi .mov .wmv .flv .webm .m4v .mpg .mpeg .ts .vob",
+    "Audio": ".mp3 .flac .wav .aac .ogg .m4a .wma .opus",
+    "Documents": ".pdf .doc .docx .xls .xlsx .ppt .pptx .odt .ods .odp .txt .rtf .md .epub .csv",
+    "Archives": ".zip .rar .7z .tar .gz .bz2 .xz .zst .tgz .iso .dmg .img .deb .rpm .cab",
+    "Code": ".py .pyc .c .h .cpp .hpp .js .ts .java .class .go .rs .rb .php .cs .html .css .json .xml .yml .yaml .sh",
+    "Exécutables": ".exe .dll .so .a .o .msi .bin .sys .jar .apk",
+    "Bases de données": ".db .sqlite .sqlite3 .mdb .ldb .sql",
+    "Disques virtuels": ".vdi .vmdk .vhd .vhdx .qcow2",
+}
+CATEGORY_OF = {ext: category for category, exts in CATEGORIES.items() for ext in exts.split()}
+OTHER = "Autres"
+NO_EXTENSION = "(sans extension)"
+
+
+_FILE_TABLE = bytes([1] + [0] * 255)  # drapeaux nuls -> 1 (fichier), sinon 0
+
+
+def _files_mask(flags):
+    """Masque 1/0 des fichiers (ni dossier ni supprimé), calculé en C."""
+    return bytes(flags).translate(_FILE_TABLE)
+
+
+def _columns(store, index):
+    """Colonnes ``ext`` et ``size`` des seuls fichiers du sous-arbre ``index``.
+
+    Les enfants d'un dossier occupant une plage contiguë, on recopie des
+    tranches de colonnes (en C) dossier par dossier ; pour la racine d'un
+    arbre sans ajouts, on prend les colonnes entières.
+    """
+    if index == 0 and not store.extra_children:
+        mask = _files_mask(store.flags)
+        return array('I', compress(store.ext, mask)), array('Q', compress(store.size, mask))
+    ext = array('I')
+    size = array('Q')
+    stack = [index]
+    while stack:
+        folder = stack.pop()
+        if folder in store.extra_children:
+            children = store.children(folder)
+            files = [c for c in children if not store.flags[c]]
+            ext.extend(store.ext[c] for c in files)
+            size.extend(store.size[c] for c in files)
+            stack.extend(c for c in children if store.flags[c] & FLAG_DIR)
+            continue
+        first = store.first_child[folder]
+        end = first + store.child_count[folder]
+        flags = store.flags[first:end]
+        mask = _files_mask(flags)
+        ext.extend(compress(store.ext[first:end], mask))
+        size.extend(compress(store.size[first:end], mask))
+        stack.extend(first + offset for offset, f in enumerate(flags) if f & FLAG_DIR)
+    return ext, size
+
+
+def _group_sum(keys, size, groups):
+    """Nombre et total d'octets par clé (``0 <= clé < groups``) : un ``bincount``."""
+    if np is not None and len(keys):
+        keys = np.frombuffer(keys, dtype=np.uint32)
+        counts = np.bincount(keys, minlength=groups)
+        # float64 : exact jusqu'à 2**53 octets (8 Po) par groupe
+        totals = np.bincount(keys, weights=np.frombuffer(size, dtype=np.uint64), minlength=groups)
+        return counts.tolist(), [int(total) for total in totals]
+    counts = [0] * groups
+    totals = [0] * groups
+    for key, value in zip(keys, size):
+        counts[key] += 1
+        totals[key] += value
+    return counts, totals
+
+
+def _sorted(rows):
+    return sorted((row for row in rows if row.count), key=lambda row: row.size, reverse=True)
+
+
+def by_extension(store, index=0):
+    """Nombre de fichiers et octets par extension sous ``index``, les plus gros en premier."""
+    ext, size = _columns(store, index)
+    counts, totals = _group_sum(ext, size, len(store.extensions))
+    return _sorted(Rollup(extension or NO_EXTENSION, count, total)
+                   for extension, count, total in zip(store.extensions, counts, totals))
+
+
+def by_category(store, index=0, extensions=None):
+    """Regroupe ``by_extension`` par grande famille (images, vidéos...)."""
+    totals = {}
+    for row in extensions if extensions is not None else by_extension(store, index):
+        category = CATEGORY_OF.get(row.name, OTHER)
+        count, size = totals.get(category, (0, 0))
+        totals[category] = (count + row.count, size + row.size)
+    return _sorted(Rollup(name, count, size) for name, (count, size) in totals.items())
+
+
+def by_size_bucket(store, index=0):
+    """Nombre de fichiers et octets par tranche de taille (``SIZE_BUCKETS``), dans l'ordre."""
+    _, size = _columns(store, index)
+    if np is not None and len(size):
+        keys = np.searchsorted(np.array(_BOUNDS, dtype=np.uint64),
+                               np.frombuffer(size, dtype=np.uint64), side="right")
+        keys = array('I', keys.astype(np.uint32).tobytes())
+    else:
+        keys = array('I', map(bisect_right, repeat(_BOUNDS), size))
+    counts, totals = _group_sum(keys, size, len(SIZE_BUCKETS))
+    return [Rollup(label, count, total)
+            for (label, _), count, total in zip(SIZE_BUCKETS, counts, totals)]
@@ -1,68 +1,64 @@
 import os
-from PyQt6.QtCore import QObject, pyqtSignal, QTimer
+import logging
 from concurrent.futures import ThreadPoolExecutor
 import threading
-import getpass
+from core.control import ScanCancelled
+from core.exclusions import default_exclusions
+from core.telemetry import log_event, error_kind
 
-executor = ThreadPoolExecutor(max_workers=4)
+DEFAULT_WORKERS = 4
+executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS)
 lock = threading.Lock()
 
-IGNORED_FOLDERS = {
-    "C:\\Windows",
-    "C:\\Users\\Default",
-    "C:\\Users\\All Users",
-    "C:\\Users\\Public",
-    "C:\\$Recycle.Bin",
-    "C:\\System Volume Information",
-    "C:\\Recovery",
-    "C:\\PerfLogs",
-    "C:\\Users\\%USERNAME%\\AppData",  # à adapter dynamiquement
-}
+def _log_error(path, exc, operation):
+    log_event(logging.DEBUG, "scan_error", path=path, operation=operation,
+              kind=error_kind(exc), error=str(exc))
 
-def get_size(path):
-    """Calcule la taille totale d’un fichier ou dossier (récursif)."""
+
+def get_size(path, stop_token=None):
+    """Calcule la taille totale d’un fichier ou dossier (récursif).
+
+    Avec ``stop_token``, s'arrête (en rendant le total partiel) si le scan est annulé.
+    """
     total_size = 0
     try:
         if os.path.isfile(path):
             total_size += os.path.getsize(path)
         else:  # <-- Ajout du log
-            for dirpath, dirnames, filenames in os.walk(path, onerror=lambda e: None):
+            for dirpath, dirnames, filenames in os.walk(
+                    path, onerror=lambda e: _log_error(e.filename, e, "scandir")):
+                if stop_token is not None:
+                    stop_token.check()
                 for f in filenames:
                     fp = os.path.join(dirpath, f)
                     try:
                         total_size += os.path.getsize(fp)
-                    except PermissionError:
-                        continue
-                    except Exception:
-                        continue
-    except PermissionError:
-        pass
-    except Exception:
+                    except OSError as e:
+                        _log_error(fp, e, "stat")
+    except ScanCancelled:
         pass
+    except OSError as e:
+        _log_error(path, e, "stat")
     return total_size
 
-def get_ignored_folders():
-    username = getpass.getuser()
-    ignored = set(IGNORED_FOLDERS)
-    ignored.add(f"C:\\Users\\{username}\\AppData")
-    return ignored
-
-def scan_directory(path, progress_callback=None):
-    ignored_folders = get_ignored_folders()
+def scan_directory(path, progress_callback=None, stop_token=None):
+    exclusions = default_exclusions()
     results = []
     try:
-        if os.path.abspath(path) in ignored_folders:
+        if exclusions.match(os.path.abspath(path), os.path.basename(path)):
             return []
         entries = os.scandir(path)
         for entry in entries:
             entry_path = os.path.join(path, entry.name)
-            # Ignore les dossiers de la liste noire
-            if entry.is_dir(follow_symlinks=False) and os.path.abspath(entry_path) in ignored_folders:
+            # Ignore les entrées exclues (systèmes de fichiers virtuels, dossiers système)
+            if exclusions.match(os.path.abspath(entry_path), entry.name):
                 continue
             if entry.name.startswith('.'):
                 continue
+            if stop_token is not None and stop_token.cancelled:
+                break
             try:
-                size = get_size(entry_path)
+                size = get_size(entry_path, stop_token)
                 results.append({
                     'name': entry.name,
                     'path': entry_path,
@@ -70,74 +66,9 @@ def scan_directory(path, progress_callback=None):
                     'is_dir': entry.is_dir(follow_symlinks=False)
                 })
 
-            except PermissionError:
-                continue
-            except Exception as e:
-                continue
-    except PermissionError:
-        pass
-    except Exception as e:
+            except OSError as e:
+                _log_error(entry_path, e, "stat")
+    except OSError as e:
+        _log_error(path, e, "scandir")
         return []
     return results
-
-class DirectoryScanner(QObject):
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(dict)  # ✅ résultat structuré
-
-    def __init__(self, base_path):
-        super().__init__()
-        self.base_path = base_path
-        self.queue = [base_path]
-        self.result = {}  # ✅ dict: dossier -> liste enfants
-        self.total_scanned = 0
-
-    def start(self):
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.process_next)
-        self.timer.start(10)
-
-    def process_next(self):
-        if not self.queue:
-            self.timer.stop()
-            self.finished.emit(self.result)
-            return
-
-        current_path = self.queue.pop(0)
-        children = []
-
-        try:
-            with os.scandir(current_path) as it:
-                for entry in it:
-                    path = entry.path
-                    if entry.is_file():
-                        size = entry.stat().st_size
-                    elif entry.is_dir(follow_symlinks=False):
-                        size = get_size(path)  # Calcule la taille totale du dossier ici !
-                    else:
-                        size = 0
-                    item = {
-                        'name': entry.name,
-                        'path': path,
-                        'size': size,
-                        'is_dir': entry.is_dir(follow_symlinks=False)
-                    }
-                    children.append(item)
-
-                    if item['is_dir']:
-                        self.queue.append(path)
-
-                    self.total_scanned += 1
-
-        except PermissionError:
-            print(f"Permission denied: {current_path}")  # Log pour les permissions
-        except Exception as e:
-            print(f"Error on {current_path}: {e}")
-
-        self.result[current_path] = children
-        progress = min(100, self.total_scanned // 10)
-        self.progress.emit(progress)
-
-        # Si on atteint 100% mais la queue n'est pas vide, forcer l'affichage
-        if progress >= 100 and self.queue:
-            self.timer.stop()
-            self.finished.emit(self.result)
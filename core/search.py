@@ -0,0 +1,112 @@
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from fnmatch import fnmatchcase
+
+from core.store import FLAG_REMOVED
+
+GLOB_CHARS = "*?["
+
+SearchPage = namedtuple("SearchPage", "query total page page_size nodes")
+
+
+def literal_part(pattern):
+    """Plus long fragment sans joker d'un motif glob (pré-filtre par sous-chaîne)."""
+    parts = re.split(r"\[[^\]]*\]|[*?\[]", pattern)
+    return max(parts, key=len)
+
+
+class NameIndex:
+    """Recherche par nom sur tous les nœuds d'un ``NodeStore``.
+
+    L'index est une copie de la table des noms du store, sans casse
+    (``str.casefold`` : « Été » se trouve avec « été ») : les noms y sont
+    contigus et ``ends`` donne leurs bornes, si bien qu'une recherche par
+    sous-chaîne est un ``bytes.find`` répété (en C) et chaque occurrence est
+    rattachée à son nœud par dichotomie. Une table tout ASCII est simplement
+    passée en minuscules et garde les bornes ``name_end`` du store. Un motif
+    glob (``*.iso``, ``photo_??.jpg``) est pré-filtré par son plus long
+    fragment littéral puis vérifié nom par nom. Les résultats sont classés
+    par taille décroissante ; la dernière requête reste en cache pour la
+    pagination. Si le store a changé (``generation``, surveillance),
+    l'index est reconstruit à la recherche suivante.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._build()
+
+    def _build(self):
+        store = self.store
+        names = bytes(store.names)
+        if names.isascii():
+            self.blob = names.lower()
+            self.ends = store.name_end
+        else:
+            # La casse peut changer la longueur d'un nom (« ß » -> « ss ») : bornes recalculées
+            parts = []
+            self.ends = array('Q')
+            start = end = 0
+            for stop in store.name_end:
+                part = os.fsencode(os.fsdecode(names[start:stop]).casefold())
+                parts.append(part)
+                end += len(part)
+                self.ends.append(end)
+                start = stop
+            self.blob = b"".join(parts)
+        self.names_len = len(names)
+        self.generation = store.generation
+        self._last = None  # (requête, nœuds classés)
+
+    def _nodes_containing(self, needle):
+        """Nœuds dont le nom contient ``needle`` (octets sans casse)."""
+        blob = self.blob
+        ends = self.ends
+        width = len(needle)
+        find = blob.find
+        nodes = []
+        node = 0
+        position = find(needle)
+        while position >= 0:
+            node = bisect_right(ends, position, node)  # occurrences croissantes
+            end = ends[node]
+            if position + width <= end:
+                nodes.append(node)
+                position = find(needle, end)  # un seul résultat par nom
+            else:
+                position = find(needle, position + 1)  # à cheval sur deux noms
+        return nodes
+
+    def matches(self, query):
+        """Tous les nœuds correspondant à ``query``, par taille décroissante."""
+        query = query.strip()
+        store = self.store
+        if self.names_len != len(store.names) or self.generation != store.generation:
+            self._build()
+        if self._last is not None and self._last[0] == query:
+            return self._last[1]
+        lowered = query.casefold()
+        if any(char in lowered for char in GLOB_CHARS):
+            literal = literal_part(lowered)
+            if literal:
+                candidates = self._nodes_containing(os.fsencode(literal))
+            else:
+                candidates = range(1, len(store))
+            nodes = [node for node in candidates if fnmatchcase(store.name(node).casefold(), lowered)]
+        elif lowered:
+            nodes = self._nodes_containing(os.fsencode(lowered))
+        else:
+            nodes = []
+        flags = store.flags
+        nodes = [node for node in nodes if node and not flags[node] & FLAG_REMOVED]
+        nodes.sort(key=store.size.__getitem__, reverse=True)
+        self._last = (query, nodes)
+        return nodes
+
+    def search(self, query, page=0, page_size=50):
+        """Une page de résultats : ``SearchPage(requête, total, page, taille de page, nœuds)``."""
+        nodes = self.matches(query)
+        start = page * page_size
+        return SearchPage(query, len(nodes), page, page_size, nodes[start:start + page_size])
@@ -0,0 +1,228 @@
+import heapq
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from core.scanner import lock
+from core.control import ScanCancelled
+from core.exclusions import ExclusionRules, default_exclusions
+from core.store import NodeStore, FLAG_PENDING
+from core.telemetry import ScanTelemetry
+from core.walker import TreeWalker, read_directory, root_device, _add_directory
+
+# Gros sous-arbres découpés un niveau plus bas : au plus autant de dossiers
+# listés par le processus principal
+MAX_SPLIT = 256
+BATCHES_PER_PROCESS = 8  # petits sous-arbres regroupés en lots, pour limiter les allers-retours
+PROGRESS_STEP = 4096  # entrées entre deux mises à jour du compteur partagé
+
+_shared = None  # (compteur d'entrées, annulation, reprise) dans chaque worker
+
+
+def _init_worker(counter, cancelled, running):
+    global _shared
+    _shared = (counter, cancelled, running)
+
+
+class _SharedStopToken:
+    """``StopToken`` vu d'un worker : pause et annulation relayées par des ``Event`` partagés."""
+
+    def __init__(self, cancelled, running):
+        self._cancelled = cancelled
+        self._running = running
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise ScanCancelled()
+
+
+def _scan_shards(shards, rules, one_filesystem, previous_path, top_k):
+    """Worker : scanne chaque ``(indice, chemin, indice précédent)`` de ``shards``.
+
+    Retourne ``([(indice, NodeStore)], télémétrie ou None)`` ; les stores
+    reviennent au processus principal sous forme de colonnes picklées.
+    """
+    counter, cancelled, running = _shared
+    exclusions = ExclusionRules(rules)
+    previous = None
+    if previous_path is not None:
+        from core.snapshot import load_snapshot
+        previous = load_snapshot(previous_path)  # mmap : seuls les dossiers consultés sont lus
+    telemetry = ScanTelemetry(top_k) if top_k else None
+    stop_token = _SharedStopToken(cancelled, running)
+    results = []
+    done = reported = 0
+    for index, path, prev_index in shards:
+        if cancelled.is_set():
+            break
+
+        def progress(scanned):
+            nonlocal reported
+            if done + scanned - reported >= PROGRESS_STEP:
+                with counter.get_lock():
+                    counter.value += done + scanned - reported
+                reported = done + scanned
+
+        walker = TreeWalker(path, previous=previous if prev_index >= 0 else None, stop_token=stop_token,
+                            telemetry=telemetry, one_filesystem=one_filesystem, exclusions=exclusions,
+                            previous_index=prev_index)
+        results.append((index, walker.run(progress)))
+        done += walker.total_scanned
+    with counter.get_lock():
+        counter.value += done - reported
+    return results, telemetry
+
+
+def scan_tree_processes(path, processes=None, progress_callback=None, previous=None, previous_path=None,
+                        store=None, on_complete=None, stop_token=None, telemetry=None,
+                        one_filesystem=False, exclusions=None):
+    """Scan de ``path`` réparti entre ``processes`` processus ; même résultat que ``scan_tree``.
+
+    Au-delà de quelques cœurs, les threads de ``scan_tree_parallel`` butent
+    sur le GIL (construction des entrées, agrégation). Ici, le processus
+    principal liste la racine et chaque sous-dossier devient un sous-arbre
+    scanné par un worker (``TreeWalker`` complet) ; le ``NodeStore`` obtenu
+    revient en colonnes picklées et ``NodeStore.merge`` le recopie d'un bloc,
+    sans repasser par des entrées une à une.
+
+    Avec ``previous``, les sous-arbres partent du plus gros (tailles du scan
+    précédent) et ceux qui dépassent la moitié de la part d'un processus sont
+    d'abord découpés un niveau plus bas, pour que la fin du scan ne dépende
+    pas d'un seul worker. Le rafraîchissement incrémental n'a lieu dans les
+    workers que si ``previous_path`` (le snapshot d'où vient ``previous``)
+    est donné : chacun le projette en mémoire. ``on_complete`` n'est appelé
+    que pour les sous-arbres et les dossiers listés par le processus
+    principal. Pas de mode mémoire bornée. Les autres paramètres : voir
+    ``TreeWalker``.
+    """
+    if exclusions is None:
+        exclusions = default_exclusions()
+    path = os.path.abspath(path)  # voir TreeWalker
+    processes = processes or os.cpu_count() or 1
+    device = root_device(path) if one_filesystem else None
+    if store is None:
+        store = NodeStore(path)
+    store.flags[0] |= FLAG_PENDING
+    pending = {}  # dossier listé ici -> sous-dossiers pas encore terminés
+    scanned = 0
+
+    def finish(index):
+        # Remonte les tailles tant que les parents deviennent complets
+        completed = []
+        with lock:
+            while True:
+                store.finish_directory(index)
+                completed.append(index)
+                del pending[index]
+                if index == 0:
+                    break
+                index = store.parent[index]
+                pending[index] -= 1
+                if pending[index]:
+                    break
+        if on_complete:
+            for index in completed:
+                on_complete(index)
+
+    def list_here(index, dir_path, prev_index):
+        nonlocal scanned
+        entries, st, prev_indices, _ = read_directory(
+            dir_path, exclusions, True, previous, prev_index, telemetry, device)
+        with lock:
+            subdirs = _add_directory(store, index, dir_path, entries, st, prev_indices)
+        scanned += len(entries)
+        pending[index] = len(subdirs)
+        if not subdirs:
+            finish(index)
+        return subdirs
+
+    def weight(task):
+        return previous.size[task[2]] if previous is not None and task[2] >= 0 else 0
+
+    try:
+        if stop_token is not None:
+            stop_token.check()
+        tasks = list_here(0, path, 0 if previous is not None else -1)
+        heap = [(-weight(task), order, task) for order, task in enumerate(tasks)]
+        heapq.heapify(heap)
+        target = sum(weight(task) for task in tasks) / (processes * 2)
+        order = len(heap)
+        for _ in range(MAX_SPLIT):
+            if not heap or -heap[0][0] <= target:
+                break
+            if stop_token is not None:
+                stop_token.check()
+            for task in list_here(*heapq.heappop(heap)[2]):
+                heapq.heappush(heap, (-weight(task), order, task))
+                order += 1
+        tasks = [heapq.heappop(heap)[2] for _ in range(len(heap))]  # du plus gros au plus petit
+    except ScanCancelled:
+        return store
+    if device is not None:
+        # Points de montage : vus vides, comme dans le parcours séquentiel
+        for task in [task for task in tasks if root_device(task[1]) != device]:
+            tasks.remove(task)
+            list_here(*task)
+    if not tasks:
+        return store
+
+    alone = sum(weight(task) for task in tasks) / (processes * BATCHES_PER_PROCESS)
+    batch_size = max(1, len(tasks) // (processes * BATCHES_PER_PROCESS))
+    batches = [[task] for task in tasks if alone and weight(task) >= alone]
+    rest = tasks[len(batches):]
+    batches += [rest[start:start + batch_size] for start in range(0, len(rest), batch_size)]
+    worker_previous = previous_path if previous is not None else None
+    if worker_previous is None:
+        batches = [[(index, task_path, -1) for index, task_path, _ in batch] for batch in batches]
+
+    methods = multiprocessing.get_all_start_methods()
+    # Pas de fork : le processus principal peut avoir des threads (interface, exécuteur)
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    counter = context.Value('q', 0)
+    cancelled = context.Event()
+    running = context.Event()
+    running.set()
+    top_k = telemetry.top_k if telemetry is not None else 0
+    with ProcessPoolExecutor(min(processes, len(batches)), mp_context=context, initializer=_init_worker,
+                             initargs=(counter, cancelled, running)) as pool:
+        futures = [pool.submit(_scan_shards, batch, exclusions.rules, one_filesystem, worker_previous,
+                               top_k) for batch in batches]
+        remaining = set(futures)
+        while remaining:
+            done, remaining = wait(remaining, timeout=0.25, return_when=FIRST_COMPLETED)
+            if stop_token is not None:
+                if stop_token.cancelled and not cancelled.is_set():
+                    cancelled.set()
+                    for future in remaining:
+                        future.cancel()
+                if stop_token.paused:
+                    running.clear()
+                else:
+                    running.set()
+            for future in done:
+                if future.cancelled():
+                    continue
+                results, worker_telemetry = future.result()
+                if worker_telemetry is not None:
+                    telemetry.merge(worker_telemetry)
+                for index, subtree in results:
+                    with lock:
+                        store.merge(index, subtree)
+                    if subtree.flags[0] & FLAG_PENDING:
+                        continue  # sous-arbre interrompu : ses ancêtres restent en cours
+                    if on_complete:
+                        on_complete(index)
+                    parent = store.parent[index]
+                    with lock:
+                        pending[parent] -= 1
+                        complete = not pending[parent]
+                    if complete:
+                        finish(parent)
+            if progress_callback:
+                progress_callback(scanned + counter.value)
+    return store
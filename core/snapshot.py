@@ -0,0 +1,113 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from core.store import NodeStore
+
+MAGIC = b"FVVSNAP3"
+# magic, ordre des octets, nombre de nœuds, taille du tampon de noms, longueur de la racine,
+# taille de la table des extensions
+HEADER = struct.Struct("<8sBxxxQQI4xQ")
+# Version 1 : sans colonne ``ext`` ni table des extensions (recalculées au chargement)
+MAGIC_V1 = b"FVVSNAP1"
+HEADER_V1 = struct.Struct("<8sBxxxQQI4x")
+# Version 2 : sans colonne ``atime`` (dates d'accès inconnues, à 0)
+MAGIC_V2 = b"FVVSNAP2"
+BYTEORDER = 1 if sys.byteorder == "little" else 2
+
+# (attribut du NodeStore, format array/memoryview), dans l'ordre du fichier
+COLUMNS = (
+    ('parent', 'i'),
+    ('first_child', 'I'),
+    ('child_count', 'I'),
+    ('size', 'Q'),
+    ('flags', 'B'),
+    ('mtime', 'q'),
+    ('atime', 'I'),
+    ('ino', 'Q'),
+    ('name_end', 'Q'),
+    ('order', 'I'),
+    ('ext', 'I'),
+)
+
+
+def _pad(offset):
+    return (-offset) % 8
+
+
+def save_snapshot(store, path):
+    """Écrit ``store`` dans un fichier binaire compact (colonnes brutes alignées sur 8 octets)."""
+    if store.extra_children:
+        store = store.compacted()
+    root = os.fsencode(store.root_path)
+    # Extensions séparées par des octets nuls (interdits dans les noms de fichiers)
+    extensions = b"\0".join(os.fsencode(extension) for extension in store.extensions[1:])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, BYTEORDER, len(store), len(store.names), len(root),
+                            len(extensions)))
+        f.write(root)
+        f.write(b"\0" * _pad(HEADER.size + len(root)))
+        for attr, _ in COLUMNS + (('names', 'B'),):
+            column = getattr(store, attr)
+            f.write(column)
+            f.write(b"\0" * _pad(f.tell()))
+        f.write(extensions)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Ouvre un snapshot en le projetant en mémoire (mmap).
+
+    Le chargement ne lit que l'en-tête : les colonnes du ``NodeStore`` sont des
+    ``memoryview`` sur le fichier, et les enfants d'un dossier ne sont lus
+    (paginés par le système) que lorsque ce dossier est parcouru.
+    """
+    with open(path, "rb") as f:
+        # ACCESS_COPY : les colonnes restent modifiables sans toucher au fichier
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    version1 = mm[:len(MAGIC_V1)] == MAGIC_V1
+    header = HEADER_V1 if version1 else HEADER
+    if len(mm) < header.size:
+        raise ValueError(f"Snapshot invalide : {path}")
+    if version1:
+        magic, byteorder, count, names_len, root_len = HEADER_V1.unpack_from(mm, 0)
+        extensions_len = 0
+    else:
+        magic, byteorder, count, names_len, root_len, extensions_len = HEADER.unpack_from(mm, 0)
+    if magic not in (MAGIC, MAGIC_V2, MAGIC_V1):
+        raise ValueError(f"Snapshot invalide : {path}")
+    if byteorder != BYTEORDER:
+        raise ValueError(f"Snapshot créé sur une machine d'ordre d'octets différent : {path}")
+
+    view = memoryview(mm)
+    offset = header.size
+    root_path = os.fsdecode(bytes(view[offset:offset + root_len]))
+    offset += root_len
+    offset += _pad(offset)
+
+    store = NodeStore.__new__(NodeStore)
+    store.root_path = root_path
+    store.extra_children = {}
+    store.unsorted = set()
+    store.generation = 0
+    for attr, fmt in COLUMNS:
+        if version1 and attr == 'ext':
+            continue
+        if magic != MAGIC and attr == 'atime':
+            store.atime = array('I', bytes(4 * count))
+            continue
+        length = count * struct.calcsize(fmt)
+        setattr(store, attr, view[offset:offset + length].cast(fmt))
+        offset += length + _pad(length)
+    store.names = view[offset:offset + names_len]
+    if version1:
+        store.rebuild_extensions()
+        return store
+    offset += names_len + _pad(names_len)
+    table = bytes(view[offset:offset + extensions_len])
+    store.extensions = [""] + ([os.fsdecode(e) for e in table.split(b"\0")] if table else [])
+    store.extension_ids = {extension: i for i, extension in enumerate(store.extensions)}
+    return store
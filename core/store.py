@@ -0,0 +1,532 @@
+import heapq
+import os
+from array import array
+
+from bisect import bisect_right
+from itertools import chain
+
+FLAG_DIR = 1
+FLAG_REMOVED = 2  # entrée supprimée depuis le scan (mode surveillance)
+FLAG_PENDING = 4  # dossier en cours de scan : taille provisoire
+FLAG_COLLAPSED = 8  # dossier au contenu replié (mode mémoire bornée) : total exact, détail absent
+FLAG_AGGREGATE = 16  # nœud « (N petits éléments) » regroupant des fichiers d'un dossier
+
+
+MAX_ATIME = 2 ** 32 - 1
+
+
+def atime_seconds(st):
+    """``st_atime`` ramené à la colonne ``atime`` (32 bits) : avant 1970, 0 (inconnu)."""
+    return min(max(int(st.st_atime), 0), MAX_ATIME)
+
+
+def _tail(column):
+    """Octets de ``column`` (array ou memoryview) sans son premier élément."""
+    return memoryview(column).cast('B')[column.itemsize:]
+
+
+class NodeStore:
+    """Arbre de scan stocké en colonnes (modules ``array``).
+
+    Un nœud est un simple indice ; la racine est le nœud 0. Les enfants d'un
+    dossier sont ajoutés en une fois et occupent donc une plage contiguë
+    ``first_child[i] .. first_child[i] + child_count[i]``. Les noms sont
+    concaténés dans un seul tampon d'octets (``name_end`` donne la fin de
+    chaque nom) et les chemins complets ne sont reconstruits qu'à la demande.
+    Les colonnes peuvent aussi être des ``memoryview`` sur un snapshot (voir
+    ``core.snapshot``) ; le nœud est alors en lecture seule pour la structure.
+
+    Les entrées apparues après le scan sont ajoutées en fin de tableau et
+    rattachées à leur dossier via ``extra_children`` ; les entrées supprimées
+    sont marquées ``FLAG_REMOVED``. ``compacted()`` reconstruit un arbre contigu.
+
+    En mode mémoire bornée (``core.collapse``), une partie du détail manque :
+    un dossier ``FLAG_COLLAPSED`` n'a pas (ou plus) tous ses enfants et un
+    nœud ``FLAG_AGGREGATE`` remplace des petits fichiers ; les tailles restent
+    exactes. ``expand`` y greffe ensuite le résultat d'un nouveau scan.
+
+    ``order`` est un index trié : sur la plage des enfants d'un dossier, il
+    contient ces mêmes enfants par taille décroissante. Il est rempli une fois
+    par dossier (``sort_children``) quand ses tailles sont définitives ; le
+    filtre de taille minimale devient alors une recherche dichotomique.
+
+    ``atime`` garde le dernier accès de chaque fichier en secondes (entier
+    32 bits, 0 si inconnu) : avec ``mtime``, il sert aux histogrammes d'âge
+    des données (``core.ages``).
+
+    ``ext`` donne pour chaque fichier l'indice de son extension (en minuscules)
+    dans ``extensions`` ; l'indice 0 (chaîne vide) sert aux fichiers sans
+    extension et aux dossiers. Les regroupements par type (``core.rollups``)
+    travaillent directement sur cette colonne.
+    """
+
+    __slots__ = ('root_path', 'parent', 'first_child', 'child_count',
+                 'size', 'flags', 'mtime', 'atime', 'ino', 'name_end', 'names',
+                 'order', 'ext', 'extensions', 'extension_ids',
+                 'extra_children', 'unsorted', 'generation')
+
+    def __init__(self, root_path):
+        self.root_path = root_path
+        self.parent = array('i')
+        self.first_child = array('I')
+        self.child_count = array('I')
+        self.size = array('Q')
+        self.flags = array('B')
+        self.mtime = array('q')  # st_mtime_ns
+        self.atime = array('I')  # st_atime, en secondes
+        self.ino = array('Q')
+        self.name_end = array('Q')
+        self.names = bytearray()
+        self.order = array('I')
+        self.ext = array('I')
+        self.extensions = [""]
+        self.extension_ids = {"": 0}
+        self.extra_children = {}
+        self.unsorted = set()  # dossiers dont l'index trié est périmé
+        self.generation = 0  # incrémenté à chaque lot appliqué par la surveillance
+        self._append(-1, root_path, 0, FLAG_DIR)
+
+    def __len__(self):
+        return len(self.size)
+
+    def _append(self, parent, name, size, flags, mtime=0, ino=0, atime=0):
+        self.names += os.fsencode(name)
+        self.name_end.append(len(self.names))
+        self.parent.append(parent)
+        self.first_child.append(0)
+        self.child_count.append(0)
+        self.size.append(size)
+        self.flags.append(flags)
+        self.mtime.append(mtime)
+        self.atime.append(atime)
+        self.ino.append(ino)
+        self.order.append(len(self.order))
+        self.ext.append(0 if flags & FLAG_DIR else self.extension_id(name))
+
+    def extension_id(self, name):
+        """Indice de l'extension de ``name`` (créée au besoin) ; 0 sans extension."""
+        dot = name.rfind('.')
+        if dot <= 0:  # pas de point, ou fichier caché du type « .bashrc »
+            return 0
+        extension = name[dot:].lower()
+        ext_id = self.extension_ids.get(extension)
+        if ext_id is None:
+            ext_id = self.extension_ids[extension] = len(self.extensions)
+            self.extensions.append(extension)
+        return ext_id
+
+    def rebuild_extensions(self):
+        """Recalcule la colonne ``ext`` à partir des noms (snapshots sans extensions)."""
+        self.extensions = [""]
+        self.extension_ids = {"": 0}
+        flags = self.flags
+        self.ext = array('I', (0 if flags[index] & FLAG_DIR else self.extension_id(self.name(index))
+                               for index in range(len(self))))
+
+    def add_children(self, parent, entries, pending=False):
+        """Ajoute les enfants ``(nom, taille, est_dossier, mtime_ns, inode, atime)`` de ``parent``.
+
+        Avec ``pending``, les dossiers ajoutés sont marqués « en cours de scan ».
+        Retourne l'indice du premier enfant ajouté.
+        """
+        first = len(self.size)
+        dir_flags = FLAG_DIR | FLAG_PENDING if pending else FLAG_DIR
+        for name, size, is_dir, mtime, ino, atime in entries:
+            self._append(parent, name, size, dir_flags if is_dir else 0, mtime, ino, atime)
+        self.first_child[parent] = first
+        self.child_count[parent] = len(self.size) - first
+        return first
+
+    # --- Lecture ---
+
+    def name(self, index):
+        start = self.name_end[index - 1] if index else 0
+        return os.fsdecode(bytes(self.names[start:self.name_end[index]]))
+
+    def path(self, index):
+        """Reconstruit le chemin complet d'un nœud en remontant les parents."""
+        parts = []
+        while index > 0:
+            parts.append(self.name(index))
+            index = self.parent[index]
+        parts.reverse()
+        return os.path.join(self.root_path, *parts)
+
+    def is_dir(self, index):
+        return bool(self.flags[index] & FLAG_DIR)
+
+    def is_pending(self, index):
+        return bool(self.flags[index] & FLAG_PENDING)
+
+    def children(self, index):
+        first = self.first_child[index]
+        children = range(first, first + self.child_count[index])
+        extra = self.extra_children.get(index)
+        if extra is None:
+            return children
+        flags = self.flags
+        return [c for c in chain(children, extra) if not flags[c] & FLAG_REMOVED]
+
+    def children_size(self, index):
+        if index in self.extra_children:
+            return sum(self.size[c] for c in self.children(index))
+        first = self.first_child[index]
+        return sum(self.size[first:first + self.child_count[index]])
+
+    def entries(self, index):
+        """Enfants de ``index`` au format accepté par ``add_children``."""
+        return [(self.name(c), self.size[c], self.is_dir(c), self.mtime[c], self.ino[c], self.atime[c])
+                for c in self.children(index)]
+
+    def sort_children(self, index):
+        """Remplit l'index trié (taille décroissante) pour les enfants de ``index``."""
+        first = self.first_child[index]
+        end = first + self.child_count[index]
+        if end - first > 1:
+            self.order[first:end] = array(
+                'I', sorted(range(first, end), key=self.size.__getitem__, reverse=True))
+        self.unsorted.discard(index)
+
+    def sort_all(self):
+        for index in range(len(self)):
+            if self.flags[index] & FLAG_DIR:
+                self.sort_children(index)
+
+    def children_by_size(self, index):
+        """Enfants de ``index`` par taille décroissante (sans re-tri hors surveillance et scan)."""
+        if index in self.extra_children or self.flags[index] & FLAG_PENDING:
+            return sorted(self.children(index), key=self.size.__getitem__, reverse=True)
+        if index in self.unsorted:
+            self.sort_children(index)
+        first = self.first_child[index]
+        return self.order[first:first + self.child_count[index]]
+
+    def count_at_least(self, index, min_size):
+        """Nombre d'enfants de ``index`` dont la taille est >= ``min_size`` (O(log n))."""
+        if min_size <= 0:
+            return len(self.children(index))
+        children = self.children_by_size(index)
+        size = self.size
+        return bisect_right(children, -min_size, key=lambda c: -size[c])
+
+    def largest_children(self, index, count, min_size=0):
+        """Les ``count`` plus gros enfants (au moins ``min_size``) : O(log n + count)."""
+        children = self.children_by_size(index)
+        return children[:min(count, self.count_at_least(index, min_size))]
+
+    def largest_descendants(self, index, count, dirs=False):
+        """Les ``count`` plus gros dossiers (ou fichiers) sous ``index``, hors regroupements."""
+        if index == 0 and not self.extra_children:
+            nodes = range(1, len(self))
+        else:
+            nodes = self.descendants(index)
+        flags = self.flags
+        wanted = FLAG_DIR if dirs else 0
+        skip = FLAG_DIR | FLAG_AGGREGATE | FLAG_REMOVED
+        return heapq.nlargest(count, (n for n in nodes if flags[n] & skip == wanted),
+                              key=self.size.__getitem__)
+
+    def descendants(self, index):
+        """Tous les nœuds sous ``index`` (parcours en profondeur, sans les supprimés)."""
+        stack = [index]
+        while stack:
+            for child in self.children(stack.pop()):
+                yield child
+                if self.flags[child] & FLAG_DIR:
+                    stack.append(child)
+
+    def find_child(self, index, name):
+        target = os.fsencode(name)
+        names = self.names
+        name_end = self.name_end
+        for child in self.children(index):
+            if names[name_end[child - 1]:name_end[child]] == target:
+                return child
+        return -1
+
+    def find(self, path):
+        """Retourne l'indice du nœud correspondant à ``path``, ou -1."""
+        root = self.root_path
+        if path == root:
+            return 0
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        if not path.startswith(prefix):
+            return -1
+        index = 0
+        for part in path[len(prefix):].split(os.sep):
+            if not part:
+                continue
+            index = self.find_child(index, part)
+            if index < 0:
+                return -1
+        return index
+
+    def count_files(self, index=0):
+        """Nombre de fichiers (hors dossiers) sous ``index``."""
+        if index == 0 and not self.extra_children:
+            return bytes(self.flags).count(0)
+        count = 0
+        stack = [index]
+        while stack:
+            for child in self.children(stack.pop()):
+                if self.flags[child] & FLAG_DIR:
+                    stack.append(child)
+                else:
+                    count += 1
+        return count
+
+    # --- Construction progressive (scan) ---
+
+    def add_running_total(self, index, delta):
+        """Ajoute ``delta`` à ``index`` et ses ancêtres : totaux provisoires pendant le scan."""
+        size = self.size
+        parent = self.parent
+        while index >= 0:
+            size[index] += delta
+            index = parent[index]
+
+    def finish_directory(self, index):
+        """Dossier terminé : taille exacte, fin du marquage en cours, index trié."""
+        self.size[index] = self.children_size(index)
+        self.flags[index] &= ~FLAG_PENDING & 0xFF
+        self.sort_children(index)
+
+    # --- Mises à jour (surveillance) ---
+
+    def can_grow(self):
+        """Faux pour un snapshot projeté en mémoire : voir ``compacted()``."""
+        return isinstance(self.size, array)
+
+    def _add_to_ancestors(self, index, delta, touched):
+        while index >= 0:
+            self.size[index] += delta
+            touched.append(index)
+            index = self.parent[index]
+            # La taille d'un enfant a changé : l'ordre de ses frères est à refaire
+            if index >= 0:
+                self.unsorted.add(index)
+
+    def set_size(self, index, size, mtime=None):
+        """Change la taille d'un fichier et reporte l'écart sur ses ancêtres (O(profondeur)).
+
+        Retourne les nœuds modifiés.
+        """
+        touched = [index]
+        delta = size - self.size[index]
+        self.size[index] = size
+        self.unsorted.add(self.parent[index])
+        if mtime is not None:
+            self.mtime[index] = mtime
+        if delta:
+            self._add_to_ancestors(self.parent[index], delta, touched)
+        return touched
+
+    def add_child(self, parent, entry):
+        """Ajoute une entrée apparue après le scan ; retourne (indice, nœuds modifiés)."""
+        name, size, is_dir, mtime, ino, atime = entry
+        index = len(self.size)
+        self._append(parent, name, size, FLAG_DIR if is_dir else 0, mtime, ino, atime)
+        self.extra_children.setdefault(parent, []).append(index)
+        touched = [index]
+        self._add_to_ancestors(parent, size, touched)
+        return index, touched
+
+    def graft(self, parent, name, subtree):
+        """Ajoute le dossier ``name`` sous ``parent`` à partir d'un ``NodeStore`` déjà scanné."""
+        index, touched = self.add_child(
+            parent, (name, 0, True, subtree.mtime[0], subtree.ino[0], 0))
+        stack = [(0, index)]
+        while stack:
+            old, new = stack.pop()
+            first = self.add_children(new, subtree.entries(old))
+            for offset, child in enumerate(subtree.children(old)):
+                if subtree.is_dir(child):
+                    stack.append((child, first + offset))
+            self.sort_children(new)
+        self._add_to_ancestors(index, subtree.size[0], touched)
+        return index, touched
+
+    def merge(self, index, subtree):
+        """Ajoute d'un bloc, sous le dossier ``index`` encore vide, le ``NodeStore`` ``subtree`` scanné ailleurs.
+
+        Le nœud 0 de ``subtree`` devient ``index`` et ses descendants sont
+        recopiés colonne par colonne, indices décalés, sans repasser par des
+        tuples d'entrées (résultats d'un worker de ``core.sharding``). La
+        taille est reportée sur les ancêtres (totaux provisoires).
+        """
+        if subtree.extra_children:
+            subtree = subtree.compacted()
+        delta = len(self) - 1  # nœud i >= 1 de subtree -> i + delta
+        shift = delta.__add__
+        parent = array('i', map(shift, subtree.parent[1:]))
+        root_first, root_count = subtree.first_child[0], subtree.child_count[0]
+        if root_count:
+            # Enfants directs : plage contiguë, rattachée à index
+            parent[root_first - 1:root_first - 1 + root_count] = array('i', [index]) * root_count
+        self.parent += parent
+        self.first_child += array('I', map(shift, subtree.first_child[1:]))
+        self.child_count.frombytes(_tail(subtree.child_count))
+        self.size.frombytes(_tail(subtree.size))
+        self.flags.frombytes(_tail(subtree.flags))
+        self.mtime.frombytes(_tail(subtree.mtime))
+        self.atime.frombytes(_tail(subtree.atime))
+        self.ino.frombytes(_tail(subtree.ino))
+        start = subtree.name_end[0]
+        self.name_end += array('Q', map((len(self.names) - start).__add__, subtree.name_end[1:]))
+        self.names += subtree.names[start:]
+        self.order += array('I', map(shift, subtree.order[1:]))
+        table = []
+        for extension in subtree.extensions:
+            ext_id = self.extension_ids.get(extension)
+            if ext_id is None:
+                ext_id = self.extension_ids[extension] = len(self.extensions)
+                self.extensions.append(extension)
+            table.append(ext_id)
+        self.ext += array('I', map(table.__getitem__, subtree.ext[1:]))
+        self.first_child[index] = root_first + delta if root_count else 0
+        self.child_count[index] = root_count
+        self.flags[index] = subtree.flags[0] | FLAG_DIR
+        self.mtime[index] = subtree.mtime[0]
+        self.ino[index] = subtree.ino[0]
+        self.unsorted.update(index if old == 0 else old + delta for old in subtree.unsorted)
+        self.add_running_total(index, subtree.size[0] - self.size[index])
+
+    def expand(self, index, subtree):
+        """Remplace le contenu (replié) du dossier ``index`` par ``subtree``, scan de ce dossier.
+
+        ``index`` ne doit plus avoir d'enfants (voir ``truncate``). Retourne
+        les nœuds modifiés.
+        """
+        stack = [(0, index)]
+        while stack:
+            old, new = stack.pop()
+            first = self.add_children(new, subtree.entries(old))
+            for offset, child in enumerate(subtree.children(old)):
+                # Les drapeaux de repli et de regroupement suivent le nœud
+                self.flags[first + offset] = subtree.flags[child] & ~FLAG_PENDING & 0xFF
+                if subtree.is_dir(child):
+                    stack.append((child, first + offset))
+            self.sort_children(new)
+        self.flags[index] = FLAG_DIR | (subtree.flags[0] & FLAG_COLLAPSED)
+        self.mtime[index] = subtree.mtime[0]
+        self.ino[index] = subtree.ino[0]
+        touched = []
+        self._add_to_ancestors(index, subtree.size[0] - self.size[index], touched)
+        return touched
+
+    def truncate(self, index):
+        """Oublie les descendants du dossier terminé ``index``, qui doivent être en fin de tableaux.
+
+        C'est le cas pendant un parcours séquentiel en profondeur, quand
+        ``index`` vient d'être terminé. Le dossier garde sa taille et passe
+        ``FLAG_COLLAPSED`` ; la mémoire des colonnes est rendue.
+        """
+        if self.child_count[index]:
+            first = self.first_child[index]
+            start = self.name_end[first - 1]
+            for column in (self.parent, self.first_child, self.child_count, self.size, self.flags,
+                           self.mtime, self.atime, self.ino, self.name_end, self.order, self.ext):
+                del column[first:]
+            del self.names[start:]
+        self.first_child[index] = 0
+        self.child_count[index] = 0
+        self.flags[index] |= FLAG_COLLAPSED
+
+    def remove(self, index):
+        """Marque une entrée comme supprimée et retire sa taille des ancêtres."""
+        parent = self.parent[index]
+        self.flags[index] |= FLAG_REMOVED
+        # Un dossier présent dans extra_children voit ses enfants filtrés
+        self.extra_children.setdefault(parent, [])
+        touched = [index]
+        self._add_to_ancestors(parent, -self.size[index], touched)
+        return touched
+
+    def copy(self):
+        """Copie indépendante, colonne par colonne (recopies en C, sans parcours de l'arbre)."""
+        store = NodeStore.__new__(NodeStore)
+        store.root_path = self.root_path
+        for attr in ('parent', 'first_child', 'child_count', 'size', 'flags', 'mtime', 'atime',
+                     'ino', 'name_end', 'order', 'ext'):
+            column = getattr(self, attr)
+            if isinstance(column, array):
+                setattr(store, attr, column[:])
+            else:  # colonne projetée (snapshot) : memoryview recopiée en array
+                copied = array(column.format)
+                copied.frombytes(column.cast('B'))
+                setattr(store, attr, copied)
+        store.names = bytearray(self.names)
+        store.extensions = list(self.extensions)
+        store.extension_ids = dict(self.extension_ids)
+        store.extra_children = {index: list(children) for index, children in self.extra_children.items()}
+        store.unsorted = set(self.unsorted)
+        store.generation = self.generation
+        return store
+
+    def compacted(self):
+        """Copie contiguë et modifiable (arrays) de l'arbre, sans entrées supprimées."""
+        store = NodeStore(self.root_path)
+        store.size[0] = self.size[0]
+        store.mtime[0] = self.mtime[0]
+        store.ino[0] = self.ino[0]
+        stack = [(0, 0)]
+        while stack:
+            old, new = stack.pop()
+            children = self.children(old)
+            first = store.add_children(new, self.entries(old))
+            for offset, child in enumerate(children):
+                store.flags[first + offset] = self.flags[child]
+                if self.is_dir(child):
+                    stack.append((child, first + offset))
+            store.sort_children(new)
+        store.flags[0] = self.flags[0]
+        return store
+
+    # --- Mémoire ---
+
+    def nbytes(self):
+        columns = (self.parent, self.first_child, self.child_count, self.size, self.flags,
+                   self.mtime, self.atime, self.ino, self.name_end, self.order, self.ext)
+        return sum(col.itemsize * len(col) for col in columns) + len(self.names)
+
+    def bytes_per_node(self):
+        return self.nbytes() / len(self) if len(self) else 0.0
+
+    # --- Compatibilité avec l'ancien format {dossier: [enfants]} ---
+
+    def to_children_dict(self):
+        result = {}
+        stack = [(0, self.root_path)]
+        while stack:
+            index, path = stack.pop()
+            children = []
+            for child in self.children(index):
+                child_path = os.path.join(path, self.name(child))
+                is_dir = self.is_dir(child)
+                children.append({
+                    'name': self.name(child),
+                    'path': child_path,
+                    'size': self.size[child],
+                    'is_dir': is_dir
+                })
+                if is_dir:
+                    stack.append((child, child_path))
+            result[path] = children
+        return result
+
+    @classmethod
+    def from_children_dict(cls, children_dict):
+        root = next(iter(children_dict))
+        store = cls(root)
+        stack = [(0, root)]
+        while stack:
+            index, path = stack.pop()
+            children = children_dict.get(path, [])
+            first = store.add_children(
+                index, [(c['name'], c['size'], c['is_dir'], 0, 0, 0) for c in children])
+            for offset, child in enumerate(children):
+                if child['is_dir']:
+                    stack.append((first + offset, child['path']))
+        store.size[0] = store.children_size(0)
+        store.sort_all()
+        return store
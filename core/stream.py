@@ -0,0 +1,34 @@
+import threading
+import time
+
+
+class ScanStream:
+    """Regroupe les résultats partiels d'un scan et les publie à débit borné.
+
+    Les moteurs de scan signalent chaque dossier terminé (``dir_done``) et
+    chaque avancée (``tick``). ``publish(dossiers_terminés)`` est appelé au
+    plus une fois par ``interval`` secondes, même sans dossier terminé, pour
+    que les totaux provisoires progressent à l'écran.
+    """
+
+    def __init__(self, publish, interval=0.25):
+        self.publish = publish
+        self.interval = interval
+        self._completed = []
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def dir_done(self, index):
+        with self._lock:
+            self._completed.append(index)
+        self.tick()
+
+    def tick(self, *_):
+        if time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            completed, self._completed = self._completed, []
+            self._last = time.monotonic()
+        self.publish(completed)
@@ -0,0 +1,198 @@
+import cProfile
+import errno
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_LOG = os.path.join("logs", "app.log")
+
+logger = logging.getLogger("fvv.scan")
+# Sans setup_logging, les événements sont ignorés (pas de sortie sur stderr)
+logging.getLogger("fvv").addHandler(logging.NullHandler())
+
+
+class JsonFormatter(logging.Formatter):
+    """Une ligne JSON par événement : date, niveau, événement et ses champs."""
+
+    def format(self, record):
+        data = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(path=DEFAULT_LOG, level=logging.INFO, max_bytes=5 * 1024 * 1024, backups=3):
+    """Journal structuré tournant (``path``, puis ``path.1`` ... ``path.<backups>``)."""
+    root = logging.getLogger("fvv")
+    path = os.path.abspath(path)
+    for handler in root.handlers:
+        if getattr(handler, "baseFilename", None) == path:
+            return root  # déjà configuré
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
+    return root
+
+
+def log_event(level, event, **fields):
+    logger.log(level, event, extra={"fields": fields})
+
+
+def error_kind(exc):
+    if isinstance(exc, PermissionError):
+        return "permission"
+    if isinstance(exc, FileNotFoundError):
+        return "not_found"  # supprimé pendant le scan
+    if getattr(exc, "errno", None) in (errno.ESTALE, errno.EIO, errno.ETIMEDOUT):
+        return "io"  # montage réseau instable, disque défaillant
+    return "other"
+
+
+class ScanTelemetry:
+    """Compteurs d'un scan : appels système, latence par dossier, erreurs.
+
+    Les moteurs de scan appellent ``directory`` une fois par dossier listé
+    (un ``scandir`` et ``stat_calls`` appels ``stat``), ``add_stats`` pour
+    les autres ``stat`` et ``error`` pour chaque ``OSError``. Les
+    ``top_k`` dossiers les plus lents sont conservés (tas borné) ; ceux qui
+    dépassent ``slow_threshold`` secondes sont aussi journalisés.
+    ``pruned`` compte les entrées écartées par chaque règle d'exclusion.
+    Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(self, top_k=20, slow_threshold=1.0):
+        self.top_k = top_k
+        self.slow_threshold = slow_threshold
+        self.scandir_calls = 0
+        self.stat_calls = 0
+        self.directories = 0
+        self.entries = 0
+        self.directory_seconds = 0.0
+        self.errors = {}
+        self.pruned_by_rule = {}  # règle -> [entrées, octets]
+        self.start = time.monotonic()
+        self.end = None
+        self._slowest = []  # tas min de (secondes, chemin, entrées)
+        self._lock = threading.Lock()
+
+    def directory(self, path, seconds, entries, stat_calls):
+        with self._lock:
+            self.scandir_calls += 1
+            self.stat_calls += stat_calls
+            self.directories += 1
+            self.entries += entries
+            self.directory_seconds += seconds
+            item = (seconds, path, entries)
+            if len(self._slowest) < self.top_k:
+                heapq.heappush(self._slowest, item)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+        if seconds >= self.slow_threshold:
+            log_event(logging.WARNING, "slow_directory", path=path, seconds=round(seconds, 3),
+                      entries=entries)
+
+    def add_stats(self, count=1):
+        with self._lock:
+            self.stat_calls += count
+
+    def error(self, path, exc, operation):
+        kind = error_kind(exc)
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+        # Les refus d'accès sont attendus (dossiers système) : niveau DEBUG
+        log_event(logging.DEBUG if kind == "permission" else logging.WARNING, "scan_error",
+                  path=path, operation=operation, kind=kind, error=str(exc))
+
+    def pruned(self, rule, size):
+        """Entrée exclue par ``rule`` (``core.exclusions.Rule``) ; ``size`` : 0 pour un dossier."""
+        with self._lock:
+            counts = self.pruned_by_rule.setdefault(rule.label, [0, 0])
+            counts[0] += 1
+            counts[1] += size
+
+    def merge(self, other):
+        """Ajoute les compteurs de ``other`` (scan d'un autre processus, voir ``core.sharding``)."""
+        with self._lock:
+            self.scandir_calls += other.scandir_calls
+            self.stat_calls += other.stat_calls
+            self.directories += other.directories
+            self.entries += other.entries
+            self.directory_seconds += other.directory_seconds
+            for kind, count in other.errors.items():
+                self.errors[kind] = self.errors.get(kind, 0) + count
+            for label, (entries, size) in other.pruned_by_rule.items():
+                counts = self.pruned_by_rule.setdefault(label, [0, 0])
+                counts[0] += entries
+                counts[1] += size
+            self._slowest = heapq.nlargest(self.top_k, self._slowest + other._slowest)
+            heapq.heapify(self._slowest)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def slowest(self):
+        """Dossiers les plus lents, du plus lent au moins lent : ``(secondes, chemin, entrées)``."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def finish(self):
+        self.end = time.monotonic()
+
+    def summary(self):
+        elapsed = (self.end or time.monotonic()) - self.start
+        return {
+            "seconds": round(elapsed, 3),
+            "directories": self.directories,
+            "entries": self.entries,
+            "scandir_calls": self.scandir_calls,
+            "stat_calls": self.stat_calls,
+            "errors": dict(self.errors),
+            "pruned": {label: {"entries": entries, "bytes": size}
+                       for label, (entries, size) in sorted(self.pruned_by_rule.items())},
+            "mean_directory_ms": round(1000 * self.directory_seconds / self.directories, 3)
+            if self.directories else 0.0,
+            "slowest": [{"path": path, "seconds": round(seconds, 4), "entries": entries}
+                        for seconds, path, entries in self.slowest()],
+        }
+
+    def log_summary(self, root):
+        log_event(logging.INFO, "scan_summary", root=root, **self.summary())
+
+
+@contextmanager
+def profiled(path=None):
+    """Profile le bloc avec ``cProfile`` et écrit les statistiques dans ``path``.
+
+    Sans ``path``, ne fait rien. Seul le thread appelant est profilé : avec le
+    scan parallèle, les workers n'apparaissent pas (utiliser un seul thread).
+    """
+    if not path:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        log_event(logging.INFO, "profile_written", path=path)
@@ -0,0 +1,141 @@
+import math
+
+from core.store import FLAG_DIR
+
+REST = -1  # région regroupant les enfants trop petits pour être dessinés
+
+
+def _worst(row_sum, row_min, row_max, side):
+    """Pire rapport d'aspect d'une rangée de surfaces ``row_*`` posée le long de ``side``."""
+    side2 = side * side
+    row2 = row_sum * row_sum
+    return max(side2 * row_max / row2, row2 / (side2 * row_min))
+
+
+def squarify(sizes, x, y, w, h):
+    """Algorithme « squarified » (Bruls et al.) : un rectangle par surface.
+
+    ``sizes`` doit être trié par ordre décroissant et sa somme égale à
+    ``w * h``. Retourne une liste de ``(x, y, w, h)`` dans le même ordre.
+    """
+    rects = []
+    count = len(sizes)
+    i = 0
+    while i < count:
+        side = min(w, h)
+        if side <= 0:
+            rects.extend((x, y, 0.0, 0.0) for _ in range(count - i))
+            break
+        row_sum = row_max = row_min = sizes[i]
+        worst = _worst(row_sum, row_min, row_max, side)
+        j = i + 1
+        # On allonge la rangée tant que le pire aspect s'améliore
+        while j < count:
+            size = sizes[j]
+            if size <= 0:
+                break
+            candidate = _worst(row_sum + size, min(row_min, size), max(row_max, size), side)
+            if candidate > worst:
+                break
+            row_sum += size
+            row_min = min(row_min, size)
+            row_max = max(row_max, size)
+            worst = candidate
+            j += 1
+        if w >= h:
+            # Colonne à gauche, pleine hauteur
+            width = row_sum / h
+            top = y
+            for k in range(i, j):
+                height = sizes[k] / width
+                rects.append((x, top, width, height))
+                top += height
+            x += width
+            w -= width
+        else:
+            # Rangée en haut, pleine largeur
+            height = row_sum / w
+            left = x
+            for k in range(i, j):
+                width = sizes[k] / height
+                rects.append((left, y, width, height))
+                left += width
+            y += height
+            h -= height
+        i = j
+    return rects
+
+
+class TreemapLayout:
+    """Dispositions squarifiées des dossiers d'un ``NodeStore``, calculées une fois.
+
+    ``children(dossier, aspect)`` rend les rectangles des enfants en
+    coordonnées relatives au dossier (carré unité ``0..1``), donc valables
+    quelle que soit la taille à l'écran : un redimensionnement ou un zoom
+    sur un sous-dossier réutilise le cache sans rien recalculer. ``aspect``
+    (largeur / hauteur) ne sert qu'au premier calcul.
+
+    Les enfants pesant moins d'une fraction donnée du dossier ne sont pas
+    disposés un par un : ils forment une seule région ``REST`` (trouvée par
+    dichotomie dans l'index trié du store, sans parcourir ces enfants). Cette
+    fraction dépend de la surface à l'écran (niveau de détail) ; elle est
+    arrondie à une puissance de 4 inférieure pour qu'un léger agrandissement
+    réutilise encore le cache, et ne descend pas sous ``min_fraction``.
+    """
+
+    def __init__(self, store, min_fraction=1e-4):
+        self.store = store
+        self.min_fraction = min_fraction
+        self._cache = {}  # dossier -> (fraction, disposition)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def children(self, index, aspect=1.0, detail=None):
+        """Liste de ``(nœud, x, y, w, h)`` ; ``nœud`` vaut ``REST`` pour les petits éléments.
+
+        ``detail`` : plus petite fraction de surface utile à l'affichage
+        (par exemple 9 pixels² / surface du dossier en pixels²).
+        """
+        fraction = self.min_fraction
+        if detail is not None and detail > fraction:
+            fraction = max(fraction, 4.0 ** math.floor(math.log(detail, 4)))
+        cached = self._cache.get(index)
+        if cached is not None and cached[0] <= fraction:
+            return cached[1]
+        layout = self._compute(index, aspect, fraction)
+        self._cache[index] = (fraction, layout)
+        return layout
+
+    def rest(self, index):
+        """``(nombre, octets)`` des enfants regroupés dans la région ``REST`` de ``index``."""
+        store = self.store
+        cached = self._cache.get(index)
+        fraction = cached[0] if cached is not None else self.min_fraction
+        total = store.children_size(index)
+        shown = store.count_at_least(index, max(1, total * fraction))
+        size = store.size
+        shown_size = sum(size[node] for node in store.children_by_size(index)[:shown])
+        return len(store.children(index)) - shown, total - shown_size
+
+    def _compute(self, index, aspect, fraction):
+        store = self.store
+        total = store.children_size(index)
+        if total <= 0 or aspect <= 0:
+            return []
+        cutoff = store.count_at_least(index, max(1, total * fraction))
+        nodes = list(store.children_by_size(index)[:cutoff])
+        size = store.size
+        areas = [size[node] for node in nodes]
+        rest = total - sum(areas)
+        if rest > 0:
+            nodes.append(REST)
+            areas.append(rest)
+        # Disposition dans un rectangle de même aspect que la zone d'affichage
+        scale = aspect / total
+        rects = squarify([area * scale for area in areas], 0.0, 0.0, aspect, 1.0)
+        return [(node, x / aspect, y, w / aspect, h)
+                for node, (x, y, w, h) in zip(nodes, rects)]
+
+    def is_dir(self, node):
+        return node != REST and bool(self.store.flags[node] & FLAG_DIR)
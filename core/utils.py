@@ -10,3 +10,16 @@ def format_size(size_bytes):
         i += 1
 
     return f"{size_bytes:.1f} {units[i]}"
+
+def format_duration(seconds):
+    """Formate une durée en secondes (ex. « 1 h 05 min », « 42 s »)."""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} min {seconds:02d} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min"
@@ -0,0 +1,353 @@
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.scanner import executor, lock, DEFAULT_WORKERS
+from core.exclusions import default_exclusions
+from core.store import NodeStore, FLAG_PENDING, FLAG_AGGREGATE, FLAG_COLLAPSED, atime_seconds
+from core.control import ScanCancelled
+
+
+def list_directory(path, exclusions, skip_hidden=True, telemetry=None):
+    """Liste un dossier une seule fois ; retourne les entrées
+    ``(nom, taille, est_dossier, mtime_ns, inode, atime)``.
+
+    Les fichiers portent déjà leur taille et leurs dates (le ``stat`` de la
+    taille les donne aussi) ; les dossiers sont à 0 et seront
+    complétés par l'agrégation en post-ordre (leur mtime est relevé quand ils
+    sont parcourus). ``exclusions`` (``core.exclusions.ExclusionRules``) est
+    consulté avant tout ``stat``. ``telemetry``
+    (``core.telemetry.ScanTelemetry``) reçoit la durée, le nombre de
+    ``stat``, les erreurs et les entrées exclues (un fichier exclu coûte
+    alors un ``stat`` pour compter ses octets).
+    """
+    entries = []
+    stat_calls = 0
+    start = time.perf_counter() if telemetry is not None else 0.0
+    excluded = exclusions.match if exclusions else None
+    prefix = os.path.join(path, "")
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                name = entry.name
+                if skip_hidden and name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if excluded is not None:
+                        rule = excluded(prefix + name, name)
+                        if rule is not None:
+                            if telemetry is not None:
+                                if not is_dir:
+                                    stat_calls += 1
+                                telemetry.pruned(rule, 0 if is_dir else entry.stat(follow_symlinks=False).st_size)
+                            continue
+                    if is_dir:
+                        size = mtime = atime = 0
+                    else:
+                        stat_calls += 1
+                        st = entry.stat(follow_symlinks=False)
+                        size = st.st_size
+                        mtime = st.st_mtime_ns
+                        atime = atime_seconds(st)
+                    ino = entry.inode()
+                except OSError as e:
+                    if telemetry is not None:
+                        telemetry.error(prefix + name, e, "stat")
+                    continue
+                entries.append((name, size, is_dir, mtime, ino, atime))
+    except OSError as e:
+        if telemetry is not None:
+            telemetry.error(path, e, "scandir")
+    if telemetry is not None:
+        telemetry.directory(path, time.perf_counter() - start, len(entries), stat_calls)
+    return entries
+
+
+def read_directory(path, exclusions, skip_hidden=True, previous=None, prev_index=-1,
+                   telemetry=None, device=None):
+    """Entrées d'un dossier, réutilisées depuis ``previous`` s'il n'a pas changé.
+
+    Un dossier dont le mtime et l'inode sont identiques à ceux du scan
+    précédent n'est pas relisté : ses entrées sont recopiées du ``NodeStore``
+    précédent (sauf si son contenu y était replié). Retourne ``(entrées,
+    stat du dossier, indices précédents, réutilisé)`` ; les indices précédents
+    associent à chaque entrée son nœud dans ``previous`` (-1 si inconnu) et
+    valent ``None`` sans scan précédent. Avec ``device``, un dossier d'un
+    autre système de fichiers (point de montage) est vu vide.
+    """
+    if telemetry is not None:
+        telemetry.add_stats()
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError as e:
+        st = None
+        if telemetry is not None:
+            telemetry.error(path, e, "stat")
+    if device is not None and st is not None and st.st_dev != device:
+        return [], st, None, False
+    if previous is None or prev_index < 0:
+        return list_directory(path, exclusions, skip_hidden, telemetry), st, None, False
+    if (st is not None and previous.mtime[prev_index] == st.st_mtime_ns
+            and previous.ino[prev_index] == st.st_ino
+            and not previous.flags[prev_index] & FLAG_COLLAPSED):
+        return previous.entries(prev_index), st, list(previous.children(prev_index)), True
+    entries = list_directory(path, exclusions, skip_hidden, telemetry)
+    known = {previous.name(c): c for c in previous.children(prev_index)}
+    return entries, st, [known.get(entry[0], -1) for entry in entries], False
+
+
+def _add_directory(store, index, path, entries, st, prev_indices, collapse=None):
+    """Ajoute les entrées au store ; retourne les sous-dossiers à parcourir.
+
+    Les sous-dossiers partent de 0 et sont marqués en cours ; la taille des
+    fichiers est reportée tout de suite sur les ancêtres (totaux provisoires).
+    Avec ``collapse`` (``core.collapse.CollapsePolicy``), les petits fichiers
+    sont regroupés en un nœud ajouté en fin de plage.
+    """
+    entries = [(name, 0, True, mtime, ino, atime) if is_dir else (name, size, False, mtime, ino, atime)
+               for name, size, is_dir, mtime, ino, atime in entries]
+    aggregate = None
+    if collapse is not None:
+        entries, prev_indices, aggregate = collapse.fold(entries, prev_indices)
+        if aggregate is not None:
+            entries.append(aggregate)
+    first = store.add_children(index, entries, pending=True)
+    if aggregate is not None:
+        store.flags[first + len(entries) - 1] = FLAG_AGGREGATE
+        store.flags[index] |= FLAG_COLLAPSED
+    if st is not None:
+        store.mtime[index] = st.st_mtime_ns
+        store.ino[index] = st.st_ino
+    store.add_running_total(index, sum(entry[1] for entry in entries))
+    return [(first + offset, os.path.join(path, entry[0]),
+             prev_indices[offset] if prev_indices is not None else -1)
+            for offset, entry in enumerate(entries) if entry[2]]
+
+
+class TreeWalker:
+    """Parcours unique d'une arborescence avec agrégation des tailles en post-ordre.
+
+    Chaque dossier est listé une seule fois avec ``os.scandir`` et ses enfants
+    sont ajoutés au ``NodeStore`` ; la taille d'un dossier est la somme de ses
+    enfants, calculée quand tous ses sous-dossiers sont terminés.
+
+    Avec ``previous`` (scan ou snapshot précédent de la même racine), seuls
+    les dossiers dont le mtime ou l'inode a changé sont relistés ; les autres
+    coûtent un seul ``stat``. Les fichiers modifiés sur place dans un dossier
+    inchangé gardent donc leur ancienne taille.
+
+    Le ``store`` peut être fourni par l'appelant pour être parcouru pendant le
+    scan : les dossiers non terminés y sont marqués en cours et portent un
+    total provisoire. ``on_complete(indice)`` est appelé à chaque dossier
+    terminé.
+
+    ``run`` consulte ``stop_token`` (``core.control.StopToken``) avant chaque
+    dossier ; après une annulation, le store garde les résultats partiels et
+    les dossiers inachevés restent marqués en cours. ``telemetry`` : voir
+    ``list_directory``.
+
+    ``collapse`` (``core.collapse.CollapsePolicy``) active le mode mémoire
+    bornée : les descendants d'un petit dossier sont oubliés dès qu'il est
+    terminé, ce qui suppose que personne ne consulte le store pendant le
+    scan (pas de diffusion progressive).
+
+    ``one_filesystem`` : le parcours ne traverse pas les points de montage
+    (comme ``du -x``) ; ils apparaissent comme des dossiers vides.
+    ``exclusions`` (``core.exclusions.ExclusionRules``, par défaut
+    ``default_exclusions()``) : entrées écartées sans être parcourues.
+    ``previous_index`` : nœud de ``base_path`` dans ``previous`` quand
+    celui-ci a une autre racine (un sous-arbre, voir ``core.sharding``).
+    """
+
+    def __init__(self, base_path, skip_hidden=True, previous=None, store=None, on_complete=None,
+                 stop_token=None, telemetry=None, collapse=None, one_filesystem=False,
+                 exclusions=None, previous_index=0):
+        # Les règles ``path`` et les montages exclus sont comparés à des chemins absolus
+        base_path = os.path.abspath(base_path)
+        self.base_path = base_path
+        self.skip_hidden = skip_hidden
+        self.exclusions = exclusions if exclusions is not None else default_exclusions()
+        self.previous = previous
+        self.store = store if store is not None else NodeStore(base_path)
+        self.store.flags[0] |= FLAG_PENDING
+        self.on_complete = on_complete
+        self.stop_token = stop_token
+        self.telemetry = telemetry
+        self.collapse = collapse
+        self.device = root_device(base_path) if one_filesystem else None
+        self.cancelled = False
+        self.total_scanned = 0
+        self.relisted = 0  # dossiers réellement relus avec scandir
+        # Pile de cadres : [indice du dossier, sous-dossiers restants]
+        self._stack = []
+        self._push(0, base_path, previous_index if previous is not None else -1)
+
+    def _push(self, index, path, prev_index):
+        entries, st, prev_indices, reused = read_directory(
+            path, self.exclusions, self.skip_hidden, self.previous, prev_index, self.telemetry,
+            self.device)
+        if not reused:
+            self.relisted += 1
+        subdirs = _add_directory(self.store, index, path, entries, st, prev_indices, self.collapse)
+        self.total_scanned += len(entries)
+        subdirs.reverse()
+        self._stack.append([index, subdirs])
+
+    def step(self):
+        """Liste un dossier (et termine ceux qui sont complets). Retourne False à la fin."""
+        while self._stack:
+            frame = self._stack[-1]
+            if frame[1]:
+                self._push(*frame[1].pop())
+                return True
+            # Post-ordre : tous les sous-dossiers sont terminés
+            self._stack.pop()
+            self.store.finish_directory(frame[0])
+            if self.collapse is not None:
+                self.collapse.collapse_finished(self.store, frame[0])
+            if self.on_complete:
+                self.on_complete(frame[0])
+        return False
+
+    @property
+    def done(self):
+        return not self._stack
+
+    def run(self, progress_callback=None):
+        try:
+            while True:
+                if self.stop_token is not None:
+                    self.stop_token.check()
+                if not self.step():
+                    break
+                if progress_callback:
+                    progress_callback(self.total_scanned)
+        except ScanCancelled:
+            self.cancelled = True
+            self._stack.clear()
+        return self.store
+
+
+def root_device(path):
+    """``st_dev`` de ``path`` (``None`` s'il est illisible : pas de limite)."""
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+def scan_tree(path, progress_callback=None, previous=None, store=None, on_complete=None,
+              stop_token=None, telemetry=None, collapse=None, one_filesystem=False, exclusions=None):
+    """Scan complet de ``path`` en un seul passage ; retourne un ``NodeStore``.
+
+    ``previous`` active le rafraîchissement incrémental, ``store`` et
+    ``on_complete`` la diffusion progressive, ``stop_token`` l'annulation et
+    la pause, ``telemetry`` les compteurs, ``collapse`` le mode mémoire
+    bornée, ``one_filesystem`` l'arrêt aux points de montage, ``exclusions``
+    les règles d'exclusion (voir ``TreeWalker``).
+    """
+    walker = TreeWalker(path, previous=previous, store=store, on_complete=on_complete,
+                        stop_token=stop_token, telemetry=telemetry, collapse=collapse,
+                        one_filesystem=one_filesystem, exclusions=exclusions)
+    return walker.run(progress_callback)
+
+
+def scan_tree_parallel(path, max_workers=None, progress_callback=None, skip_hidden=True,
+                       previous=None, store=None, on_complete=None, stop_token=None,
+                       telemetry=None, collapse=None, one_filesystem=False, exclusions=None):
+    """Scan multi-thread de ``path`` ; même résultat que ``scan_tree``.
+
+    Les workers tirent les dossiers d'une file partagée. Quand le dernier
+    sous-dossier d'un dossier est terminé, sa taille est remontée au parent
+    (sous ``lock``), de proche en proche jusqu'à la racine.
+    Sans ``max_workers``, utilise l'``executor`` partagé du module ``core.scanner``.
+    ``previous``, ``store``, ``on_complete``, ``stop_token`` et ``telemetry`` :
+    voir ``TreeWalker``.
+    Après une annulation, les dossiers encore en file sont abandonnés sans
+    être listés. Avec ``collapse``, seuls les petits fichiers sont regroupés :
+    les dossiers se terminant dans le désordre, leurs descendants ne peuvent
+    pas être retirés en fin de tableaux. ``one_filesystem`` et ``exclusions`` :
+    voir ``TreeWalker``.
+    """
+    if exclusions is None:
+        exclusions = default_exclusions()
+    path = os.path.abspath(path)  # voir TreeWalker
+    device = root_device(path) if one_filesystem else None
+    if store is None:
+        store = NodeStore(path)
+    store.flags[0] |= FLAG_PENDING
+    pending = {}  # dossier -> nombre de sous-dossiers pas encore terminés
+    work = queue.Queue()
+    state = {'outstanding': 1, 'scanned': 0, 'failed': False}
+    workers = max_workers or DEFAULT_WORKERS
+
+    def finish(index):
+        # Remonte les tailles tant que les parents deviennent complets
+        completed = []
+        with lock:
+            while True:
+                store.finish_directory(index)
+                completed.append(index)
+                del pending[index]
+                if index == 0:
+                    break
+                index = store.parent[index]
+                pending[index] -= 1
+                if pending[index]:
+                    break
+        if on_complete:
+            for index in completed:
+                on_complete(index)
+
+    def worker():
+        while True:
+            task = work.get()
+            if task is None or state['failed']:
+                return
+            index, dir_path, prev_index = task
+            try:
+                if stop_token is not None:
+                    stop_token.check()
+                entries, st, prev_indices, _ = read_directory(
+                    dir_path, exclusions, skip_hidden, previous, prev_index, telemetry, device)
+                with lock:
+                    subdirs = _add_directory(store, index, dir_path, entries, st, prev_indices, collapse)
+                    if collapse is not None:
+                        collapse.check_budget(store)
+                    pending[index] = len(subdirs)
+                    state['outstanding'] += len(subdirs)
+                    state['scanned'] += len(entries)
+                    scanned = state['scanned']
+                for sub in subdirs:
+                    work.put(sub)
+                if not subdirs:
+                    finish(index)
+                if progress_callback:
+                    progress_callback(scanned)
+            except ScanCancelled:
+                pass
+            except BaseException:
+                # Erreur inattendue : tous les workers s'arrêtent et l'appelant la reçoit
+                state['failed'] = True
+                for _ in range(workers):
+                    work.put(None)
+                raise
+            finally:
+                with lock:
+                    state['outstanding'] -= 1
+                    done = state['outstanding'] == 0
+                if done:
+                    for _ in range(workers):
+                        work.put(None)
+
+    work.put((0, path, 0 if previous is not None else -1))
+    if max_workers is None:
+        futures = [executor.submit(worker) for _ in range(workers)]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(worker) for _ in range(workers)]
+    for future in futures:
+        future.result()
+    return store
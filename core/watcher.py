@@ -0,0 +1,280 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from core.control import StopToken
+from core.exclusions import default_exclusions
+from core.store import FLAG_DIR, FLAG_REMOVED, atime_seconds
+from core.walker import scan_tree
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW)
+EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Inotify:
+    """Accès minimal à inotify via ctypes (Linux uniquement)."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify n'est disponible que sous Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self, timeout):
+        """Événements disponibles ``(wd, masque, nom)`` ; attend au plus ``timeout`` secondes."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class TreeWatcher:
+    """Garde un ``NodeStore`` à jour pendant que le système de fichiers change.
+
+    Un thread collecte les changements — avec inotify sous Linux, sinon par
+    scrutation (``stat`` d'un nombre borné d'entrées par passe) — sous forme
+    de couples ``(dossier, nom)`` dédoublonnés. Ils sont transmis par lots à
+    ``on_batch`` au plus une fois par ``interval`` secondes, ce qui évite
+    d'inonder l'interface quand un dossier est très actif. ``apply`` (à
+    appeler depuis le thread qui lit le store) met ensuite à jour l'entrée
+    et les totaux de ses ancêtres en O(profondeur).
+
+    Un dossier apparu (déplacé sous la racine, par exemple) est scanné dans
+    le thread de collecte, avec les mêmes ``exclusions`` que le scan
+    d'origine : le lot porte le sous-arbre terminé et ``apply`` n'a plus
+    qu'à le greffer.
+    """
+
+    def __init__(self, store, on_batch, interval=0.5, poll_interval=2.0,
+                 poll_budget=5000, use_inotify=True, exclusions=None):
+        if not store.can_grow():
+            raise ValueError("Le store doit être modifiable (voir NodeStore.compacted)")
+        self.store = store
+        self.on_batch = on_batch
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self.poll_budget = poll_budget
+        self.exclusions = exclusions if exclusions is not None else default_exclusions()
+        self.overflowed = False  # des événements ont été perdus : un rafraîchissement s'impose
+        self._stop = threading.Event()
+        self._stop_token = StopToken()  # interrompt le scan d'un dossier apparu
+        self._lock = threading.Lock()
+        self._watches = {}  # wd -> indice du dossier
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+            except OSError:
+                self._inotify = None
+        self._thread = None
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify is not None else "polling"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._stop_token.cancel()
+        if self._thread is not None:
+            self._thread.join()
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    # --- Collecte ---
+
+    def _watch_subtree(self, index):
+        """Ajoute une surveillance inotify sur chaque dossier du sous-arbre."""
+        store = self.store
+        stack = [(index, store.path(index))]
+        while stack:
+            dir_index, path = stack.pop()
+            try:
+                wd = self._inotify.add_watch(path)
+            except OSError as e:
+                if e.errno == 28:  # ENOSPC : limite max_user_watches atteinte
+                    return False
+                continue
+            with self._lock:
+                self._watches[wd] = dir_index
+            for child in store.children(dir_index):
+                if store.flags[child] & FLAG_DIR:
+                    stack.append((child, os.path.join(path, store.name(child))))
+        return True
+
+    def _run(self):
+        if self._inotify is not None and not self._watch_subtree(0):
+            # Trop de dossiers pour inotify : on bascule en scrutation
+            self._inotify.close()
+            self._inotify = None
+        pending = set()
+        first_pending = None
+        cursor = 0
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                for wd, mask, name in self._inotify.read(self.interval):
+                    if mask & IN_Q_OVERFLOW:
+                        self.overflowed = True
+                        continue
+                    with self._lock:
+                        if mask & IN_IGNORED:
+                            self._watches.pop(wd, None)
+                            continue
+                        dir_index = self._watches.get(wd)
+                    if dir_index is not None and name:
+                        pending.add((dir_index, name))
+            else:
+                cursor = self._poll(cursor, pending)
+                self._stop.wait(self.poll_interval)
+            if pending and first_pending is None:
+                first_pending = time.monotonic()
+            if pending and time.monotonic() - first_pending >= self.interval:
+                batch = self._prepare(pending)
+                if self._stop.is_set():
+                    break  # scan d'un nouveau dossier interrompu
+                self.on_batch(batch)
+                pending = set()
+                first_pending = None
+
+    def _prepare(self, pending):
+        """Lot ``(dossier, nom, sous-arbre)`` : les dossiers apparus sont scannés ici, hors de ``apply``."""
+        store = self.store
+        batch = []
+        for dir_index, name in pending:
+            subtree = None
+            path = os.path.join(store.path(dir_index), name)
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                st = None
+            if (st is not None and os.path.isdir(path) and not os.path.islink(path)
+                    and not name.startswith('.') and not self.exclusions.match(path, name)):
+                child = store.find_child(dir_index, name)
+                if child < 0 or store.ino[child] != st.st_ino:
+                    subtree = scan_tree(path, stop_token=self._stop_token, exclusions=self.exclusions)
+            batch.append((dir_index, name, subtree))
+        return batch
+
+    def _poll(self, cursor, pending):
+        """Scrute au plus ``poll_budget`` entrées à partir de ``cursor`` ; retourne le curseur suivant."""
+        store = self.store
+        total = len(store)
+        for _ in range(min(self.poll_budget, total)):
+            index = cursor
+            cursor = (cursor + 1) % total
+            if index == 0 or store.flags[index] & FLAG_REMOVED:
+                continue
+            parent = store.parent[index]
+            try:
+                st = os.stat(store.path(index), follow_symlinks=False)
+            except OSError:
+                pending.add((parent, store.name(index)))
+                continue
+            if not store.flags[index] & FLAG_DIR:
+                if st.st_size != store.size[index] or st.st_mtime_ns != store.mtime[index]:
+                    pending.add((parent, store.name(index)))
+            elif st.st_mtime_ns != store.mtime[index]:
+                # Dossier modifié : noms apparus ou disparus
+                known = {store.name(c) for c in store.children(index)}
+                try:
+                    current = {name for name in os.listdir(store.path(index))
+                               if not name.startswith('.')}
+                except OSError:
+                    continue
+                for name in known ^ current:
+                    pending.add((index, name))
+                store.mtime[index] = st.st_mtime_ns
+        return cursor
+
+    # --- Application ---
+
+    def apply(self, batch):
+        """Applique un lot de changements ; retourne ``(nœuds modifiés, dossiers restructurés)``."""
+        store = self.store
+        touched = set()
+        restructured = set()
+        for dir_index, name, subtree in batch:
+            if store.flags[dir_index] & FLAG_REMOVED:
+                continue
+            path = os.path.join(store.path(dir_index), name)
+            child = store.find_child(dir_index, name)
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                st = None
+            if child >= 0 and st is not None and st.st_ino != store.ino[child]:
+                # Remplacé (ex. renommage par-dessus) : suppression puis ajout
+                touched.update(store.remove(child))
+                child = -1
+            if st is None:
+                if child >= 0:
+                    touched.update(store.remove(child))
+                    restructured.add(dir_index)
+            elif child < 0:
+                if name.startswith('.') or self.exclusions.match(path, name):
+                    continue
+                if os.path.isdir(path) and not os.path.islink(path):
+                    if subtree is None:
+                        # Rare : apparu entre la collecte et l'application du lot
+                        subtree = scan_tree(path, exclusions=self.exclusions)
+                    new, changed = store.graft(dir_index, name, subtree)
+                    if self._inotify is not None:
+                        self._watch_subtree(new)
+                else:
+                    new, changed = store.add_child(
+                        dir_index, (name, st.st_size, False, st.st_mtime_ns, st.st_ino, atime_seconds(st)))
+                touched.update(changed)
+                restructured.add(dir_index)
+            elif not store.flags[child] & FLAG_DIR:
+                touched.update(store.set_size(child, st.st_size, st.st_mtime_ns))
+        if touched or restructured:
+            store.generation += 1  # résultats de recherche en cache périmés
+        return touched, restructured
@@ -0,0 +1,134 @@
+"""Service de scan en arrière-plan et requêtes en ligne de commande, sans Qt.
+
+    python -m daemon serve /home /srv --state ~/.cache/fvv --socket /run/fvv.sock
+    python -m daemon serve / --port 8765 --workers 16 --refresh 1800
+    python -m daemon total /home/alice
+    python -m daemon children /home --sort size --min-size 1048576 --limit 20
+    python -m daemon top /srv -n 20 --dirs
+    python -m daemon status --address unix:/run/fvv.sock
+
+Le service garde l'index de chaque racine en mémoire (snapshot d'état puis
+surveillance et rafraîchissements incrémentaux) ; les requêtes répondent en
+quelques millisecondes sans reparcourir le disque. Les mêmes points d'accès
+sont servis en JSON (voir ``core.daemon.RequestHandler``).
+"""
+import argparse
+import re
+import signal
+import sys
+import threading
+
+from scanner import Output
+
+
+def serve(args):
+    from core.daemon import ScanIndex, ScanService, make_server
+    from core.exclusions import build_exclusions
+    from core.telemetry import setup_logging
+
+    if args.log:
+        setup_logging(args.log)
+    try:
+        exclusions = build_exclusions(args.exclude, not args.no_default_excludes)
+    except (ValueError, re.error) as e:
+        print(f"--exclude : {e}", file=sys.stderr)
+        return 2
+    service = ScanService(ScanIndex(root, args.state, args.workers, exclusions, args.refresh,
+                                    watch=not args.no_watch)
+                          for root in args.roots)
+    server = make_server(service, args.port, args.socket, int(args.socket_mode, 8))
+    service.start()
+    where = f"unix:{args.socket}" if args.socket else f"http://127.0.0.1:{args.port}"
+    print(f"Service à l'écoute sur {where} ({len(service.indexes)} racines)", file=sys.stderr)
+    # SIGTERM (systemd) : même arrêt propre que Ctrl+C, snapshots enregistrés
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+def query(args, out):
+    from core.daemon import DaemonClient, DaemonError
+
+    client = DaemonClient(args.address)
+    try:
+        if args.command == "status":
+            for root in client.status():
+                out.emit(dict(root, type="root"))
+        elif args.command == "refresh":
+            client.refresh()
+        elif args.command == "total":
+            out.emit(dict(client.total(args.path), type="subtree"))
+        elif args.command == "children":
+            data = client.children(args.path, args.sort, args.min_size, args.limit)
+            for row in data["children"]:
+                out.emit(dict(row, type="child", path=row["name"] + ("/" if row["is_dir"] else "")))
+        elif args.command == "top":
+            kind = "top_dir" if args.dirs else "top_file"
+            for rank, row in enumerate(client.top(args.path, args.n, args.dirs), 1):
+                out.emit(dict(row, type=kind, rank=rank))
+    except DaemonError as e:
+        print(f"Erreur {e.status} : {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Service injoignable ({args.address}) : {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    from core.daemon import DEFAULT_PORT
+    parser = argparse.ArgumentParser(prog="python -m daemon",
+                                     description="Service de scan partagé et requêtes sur son index.")
+    client = argparse.ArgumentParser(add_help=False)
+    client.add_argument("--address", default=f"http://127.0.0.1:{DEFAULT_PORT}",
+                        help="service à interroger : http://hôte:port ou unix:/chemin/du/socket")
+    client.add_argument("--format", choices=("text", "jsonl"), default="text", help="format de sortie")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    server = commands.add_parser("serve", help="lance le service")
+    server.add_argument("roots", nargs="+", help="racines indexées")
+    server.add_argument("--port", type=int, default=DEFAULT_PORT, help="port sur 127.0.0.1")
+    server.add_argument("--socket", metavar="CHEMIN", help="socket Unix à la place du port")
+    server.add_argument("--socket-mode", default="600", metavar="OCTAL",
+                        help="droits du socket (défaut : 600, propriétaire seul)")
+    server.add_argument("--state", metavar="DOSSIER", help="snapshots d'état, rouverts au redémarrage")
+    server.add_argument("--workers", type=int, default=1, help="threads de scan")
+    server.add_argument("--refresh", type=int, default=3600, metavar="SECONDES",
+                        help="intervalle des rafraîchissements incrémentaux (défaut : 3600)")
+    server.add_argument("--no-watch", action="store_true", help="sans surveillance entre deux rafraîchissements")
+    server.add_argument("--exclude", action="append", default=[], metavar="RÈGLE",
+                        help="règle d'exclusion (voir python -m scanner --help)")
+    server.add_argument("--no-default-excludes", action="store_true")
+    server.add_argument("--log", metavar="FICHIER", help="journal structuré tournant (JSON)")
+
+    commands.add_parser("status", parents=[client], help="racines servies et état de leur index")
+    commands.add_parser("refresh", parents=[client], help="demande un rafraîchissement immédiat")
+    total = commands.add_parser("total", parents=[client], help="taille et nombre de fichiers d'un sous-arbre")
+    total.add_argument("path")
+    children = commands.add_parser("children", parents=[client], help="contenu d'un dossier")
+    children.add_argument("path")
+    children.add_argument("--sort", choices=("size", "name"), default="size")
+    children.add_argument("--min-size", type=int, default=0, metavar="OCTETS")
+    children.add_argument("--limit", type=int, default=100)
+    top = commands.add_parser("top", parents=[client], help="plus gros fichiers (ou dossiers) d'un sous-arbre")
+    top.add_argument("path")
+    top.add_argument("-n", type=int, default=10)
+    top.add_argument("--dirs", action="store_true", help="dossiers plutôt que fichiers")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+    return query(args, Output(args.format))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
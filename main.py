@@ -1,12 +1,37 @@
 import sys
+import argparse
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
+from core.telemetry import setup_logging
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="DiskSpace Analyzer")
+    parser.add_argument("--open-snapshot", metavar="FICHIER",
+                        help="ouvre un snapshot de scan au démarrage")
+    parser.add_argument("--save-snapshot", metavar="FICHIER",
+                        help="enregistre un snapshot à la fin de chaque scan")
+    parser.add_argument("--profile", metavar="FICHIER",
+                        help="profil cProfile de chaque scan (à lire avec pstats ou snakeviz)")
+    parser.add_argument("--service", metavar="ADRESSE",
+                        help="ouvre l'index d'un service de scan (python -m daemon serve) au démarrage")
+    parser.add_argument("--log", metavar="FICHIER", default="logs/app.log",
+                        help="journal structuré (JSON, une ligne par événement)")
+    # Les arguments restants sont laissés à Qt
+    return parser.parse_known_args(argv[1:])
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    setup_logging(args.log)
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setApplicationName("DiskSpace Analyzer")
 
     window = MainWindow()
+    window.snapshot_save_path = args.save_snapshot
+    window.profile_path = args.profile
+    if args.open_snapshot:
+        window.load_snapshot_file(args.open_snapshot)
+    elif args.service:
+        window.open_service(args.service)
     window.show()
 
     sys.exit(app.exec())
@@ -1,4 +1,26 @@
+"""Scanner en ligne de commande, sans Qt.
+
+    python -m scanner /var /home --top 20
+    python -m scanner / --format jsonl --workers 16 > scan.jsonl
+    python -m scanner /data --processes 16 --load hier.fvv       # un processus par cœur
+    python -m scanner / --load hier.fvv --save aujourdhui.fvv   # rafraîchissement
+    python -m scanner /data --duplicates --dup-min-size 1048576
+    python -m scanner /home --types
+    python -m scanner /srv --ages atime                           # octets par ancienneté
+    python -m scanner /home --diff hier.fvv                       # croissance depuis hier
+    python -m scanner / --collapse-below 1048576 --memory-budget 512   # mémoire bornée
+    python -m scanner / /home /mnt/nas --by-device --device-workers hdd=1,network=2
+    python -m scanner /mnt/nfs --telemetry --log scan.log --profile scan.prof
+
+Pendant le scan, chaque sous-dossier de la racine est affiché dès qu'il est
+terminé ; à la fin viennent les plus gros dossiers et fichiers de l'arbre.
+"""
+import argparse
+import json
 import os
+import sys
+import time
+
 
 def get_folder_size(path):
     total_size = 0
@@ -10,3 +32,371 @@ def get_folder_size(path):
             except Exception:
                 continue
     return total_size
+
+
+class Output:
+    """Écrit les résultats en texte lisible ou en JSON Lines, ligne par ligne."""
+
+    def __init__(self, fmt, stream=sys.stdout):
+        self.fmt = fmt
+        self.stream = stream
+
+    def emit(self, record):
+        if self.fmt == "jsonl":
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            self.stream.write(self._text(record) + "\n")
+        self.stream.flush()
+
+    def _text(self, record):
+        from core.utils import format_size
+        kind = record["type"]
+        if kind == "total":
+            return (f"== {record['root']} : {format_size(record['size'])}, "
+                    f"{record['entries']} entrées en {record['seconds']:.1f} s")
+        if kind in ("top_dir", "top_file"):
+            return f"{record['rank']:>4}. {format_size(record['size']):>10}  {record['path']}"
+        if kind == "header":
+            return f"-- {record['title']}"
+        if kind in ("extension", "size_bucket"):
+            return f"{format_size(record['size']):>10}  {record['count']:>9} fichiers  {record['name']}"
+        if kind == "telemetry":
+            errors = ", ".join(f"{k} {v}" for k, v in record["errors"].items()) or "aucune"
+            lines = [f"== Télémétrie : {record['scandir_calls']} scandir, {record['stat_calls']} stat, "
+                     f"{record['mean_directory_ms']:.2f} ms/dossier, erreurs : {errors}"]
+            lines += [f"{row['seconds'] * 1000:>9.1f} ms  {row['entries']:>8}  {row['path']}"
+                      for row in record["slowest"]]
+            lines += [f"   exclu : {counts['entries']:>8} entrées  {format_size(counts['bytes']):>10}  {rule}"
+                      for rule, counts in record["pruned"].items()]
+            return "\n".join(lines)
+        if kind == "duplicates":
+            lines = [f"{format_size(record['wasted']):>10}  {len(record['paths'])} × {format_size(record['size'])}"]
+            lines += [f"            {path}" for path in record["paths"]]
+            return "\n".join(lines)
+        if kind == "duplicates_total":
+            return (f"== Doublons : {record['groups']} groupes, {format_size(record['wasted'])} récupérables "
+                    f"({format_size(record['bytes_read'])} lus)")
+        if kind == "collapse":
+            return (f"== Mémoire bornée : {record['folded']} fichiers regroupés, "
+                    f"{record['collapsed']} dossiers repliés (seuil final {format_size(record['min_size'])}, "
+                    f"store {format_size(record['store_bytes'])})")
+        if kind == "volume":
+            return (f"{format_size(record['size']):>10}  {record['entries']:>10} entrées  "
+                    f"{record['seconds']:>7.1f} s  {record['kind']:<7} ×{record['workers']:<3} {record['root']}")
+        if kind == "subtree":
+            return f"== {record['path']} : {format_size(record['size'])}, {record['files']} fichiers"
+        if kind == "root":
+            return (f"{format_size(record['size']):>10}  {record['entries']:>10} entrées  "
+                    f"{record['state']:<10} {record['root']}"
+                    + (f"  ({record['error']})" if record.get("error") else ""))
+        if kind in ("age", "age_total"):
+            cells = "".join(f"{format_size(size):>10}" for size in record["buckets"].values())
+            if kind == "age_total":
+                labels = "".join(f"{label:>10}" for label in record["buckets"])
+                return "\n".join([f"== Âge ({record['clock']}) de {record['path']}",
+                                  f"{'Taille':>10}{labels}", f"{format_size(record['size']):>10}{cells}"])
+            return f"{format_size(record['size']):>10}{cells}  {record['path']}"
+        if kind == "diff":
+            return f"{signed_size(record['delta']):>11}  {record['change']:<7}  {record['path']}"
+        if kind == "diff_total":
+            return (f"== Évolution de {record['root']} : {signed_size(record['delta'])} "
+                    f"({record['added']} ajouts, {record['removed']} suppressions, "
+                    f"{record['changed']} modifications)")
+        return f"{format_size(record['size']):>10}  {record['path']}"
+
+
+def signed_size(delta):
+    from core.utils import format_size
+    return ("+" if delta >= 0 else "-") + format_size(abs(delta))
+
+
+def largest(store, count, dirs):
+    """Les ``count`` plus gros dossiers (ou fichiers) de tout l'arbre, hors racine et regroupements."""
+    return store.largest_descendants(0, count, dirs)
+
+
+def report(store, out, top, elapsed):
+    out.emit({"type": "total", "root": store.root_path, "size": store.size[0],
+              "entries": len(store) - 1, "seconds": elapsed})
+    for kind, dirs, title in (("top_dir", True, "Plus gros dossiers"),
+                              ("top_file", False, "Plus gros fichiers")):
+        if out.fmt != "jsonl":
+            out.emit({"type": "header", "title": title})
+        for rank, index in enumerate(largest(store, top, dirs), 1):
+            out.emit({"type": kind, "rank": rank, "path": store.path(index),
+                      "size": store.size[index]})
+
+
+def report_types(store, out, top):
+    from core import rollups
+    for kind, title, rows in (("extension", "Par extension", rollups.by_extension(store)[:top]),
+                              ("size_bucket", "Par tranche de taille", rollups.by_size_bucket(store))):
+        if out.fmt != "jsonl":
+            out.emit({"type": "header", "title": title})
+        for row in rows:
+            out.emit({"type": kind, "name": row.name, "count": row.count, "size": row.size})
+
+
+def report_ages(store, out, args):
+    """Octets par tranche d'âge de la racine, puis de ses ``--top`` plus gros enfants."""
+    from core.ages import AgeHistogram, AGE_BUCKETS, UNKNOWN
+    ages = AgeHistogram(store, args.ages)
+    labels = [label for label, _ in AGE_BUCKETS] + [UNKNOWN]
+    unknown = ages.histogram(0)[-1] > 0  # colonne « Date inconnue » seulement si utile
+    if not unknown:
+        labels.pop()
+
+    def record(kind, index):
+        buckets = dict(zip(labels, ages.histogram(index)))
+        return {"type": kind, "clock": args.ages, "path": store.path(index),
+                "size": store.size[index], "buckets": buckets}
+
+    out.emit(record("age_total", 0))
+    for index in store.children_by_size(0)[:args.top]:
+        out.emit(record("age", index))
+
+
+def report_duplicates(store, out, args):
+    from core.duplicates import DuplicateFinder
+    finder = DuplicateFinder(store, args.dup_min_size, max(args.workers, 1))
+    groups = finder.run()
+    if out.fmt != "jsonl":
+        out.emit({"type": "header", "title": "Fichiers en double"})
+    for group in groups:
+        out.emit({"type": "duplicates", "size": group.size, "wasted": group.wasted,
+                  "digest": group.digest.hex(), "paths": group.paths})
+    out.emit({"type": "duplicates_total", "root": store.root_path, "groups": len(groups),
+              "wasted": sum(group.wasted for group in groups), "bytes_read": finder.bytes_read})
+
+
+def report_diff(store, out, args):
+    from core.diff import diff_stores, ADDED, REMOVED, CHANGED
+    from core.snapshot import load_snapshot
+    old = load_snapshot(args.diff)
+    if old.root_path != store.root_path:
+        print(f"--diff ignoré pour {store.root_path} : le snapshot porte sur {old.root_path}",
+              file=sys.stderr)
+        return
+    diff = diff_stores(old, store)
+    counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+    for entry in diff.entries:
+        counts[entry.kind] += 1
+    for title, entries in (("Plus fortes croissances", diff.growth(args.top)),
+                           ("Plus fortes diminutions", diff.shrinkage(args.top))):
+        if out.fmt != "jsonl":
+            out.emit({"type": "header", "title": title})
+        for entry in entries:
+            out.emit({"type": "diff", "change": entry.kind, "path": entry.path,
+                      "dir": entry.is_dir, "old": entry.old_size, "new": entry.new_size,
+                      "delta": entry.delta})
+    out.emit({"type": "diff_total", "root": store.root_path, "delta": diff.total_delta,
+              "added": counts[ADDED], "removed": counts[REMOVED], "changed": counts[CHANGED]})
+
+
+def collapse_policy(args):
+    from core.collapse import CollapsePolicy
+    policy = CollapsePolicy(args.collapse_below, args.max_entries, args.memory_budget * 1024 * 1024)
+    return policy if policy.active else None
+
+
+def parse_device_workers(text):
+    """« ssd=16,hdd=2 » -> {"ssd": 16, "hdd": 2}."""
+    from core.devices import DEFAULT_CONCURRENCY
+    result = {}
+    for item in filter(None, text.split(",")):
+        kind, _, count = item.partition("=")
+        if kind not in DEFAULT_CONCURRENCY or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"attendu type=nombre avec type parmi {', '.join(DEFAULT_CONCURRENCY)}")
+        result[kind] = int(count)
+    return result
+
+
+def scan_by_device(args, out):
+    """Toutes les racines en un seul travail, un ordonnanceur par périphérique."""
+    from core.devices import DeviceScheduler
+    from core.telemetry import log_event
+    import logging
+    # Racines absolues : chemins des rapports et des snapshots valables depuis n'importe où
+    roots = [os.path.abspath(root) for root in args.roots]
+    scheduler = DeviceScheduler(roots, args.device_workers, exclusions=args.exclusions)
+    for root, error in scheduler.errors.items():
+        print(f"{root} : {error}", file=sys.stderr)
+    start = time.monotonic()
+    results = scheduler.run()
+    log_event(logging.INFO, "devices_scanned", roots=len(results), devices=len(scheduler.groups),
+              seconds=round(time.monotonic() - start, 3))
+    for result in results:
+        report_all(result.store, args, out, result.telemetry, result.seconds)
+    # Volumes côte à côte
+    if out.fmt != "jsonl":
+        out.emit({"type": "header", "title": f"Volumes ({time.monotonic() - start:.1f} s au total)"})
+    for result in results:
+        out.emit({"type": "volume", "root": result.root, "device": result.device, "kind": result.kind,
+                  "workers": result.workers, "size": result.store.size[0],
+                  "entries": len(result.store) - 1, "seconds": result.seconds})
+
+
+def scan_root(root, args, out, previous=None, telemetry=None, collapse=None, previous_path=None):
+    from core.store import NodeStore
+    from core.walker import scan_tree, scan_tree_parallel
+
+    store = NodeStore(root)
+
+    def on_complete(index):
+        # Les sous-dossiers directs de la racine sont affichés dès qu'ils sont terminés
+        if store.parent[index] == 0:
+            out.emit({"type": "dir", "root": root, "path": store.path(index),
+                      "size": store.size[index]})
+
+    if args.processes > 1:
+        from core.sharding import scan_tree_processes
+        return scan_tree_processes(root, args.processes, previous=previous, previous_path=previous_path,
+                                   store=store, on_complete=on_complete, telemetry=telemetry,
+                                   one_filesystem=args.one_file_system, exclusions=args.exclusions)
+    if args.workers > 1:
+        return scan_tree_parallel(root, args.workers, previous=previous, store=store,
+                                  on_complete=on_complete, telemetry=telemetry, collapse=collapse,
+                                  one_filesystem=args.one_file_system, exclusions=args.exclusions)
+    return scan_tree(root, previous=previous, store=store, on_complete=on_complete,
+                     telemetry=telemetry, collapse=collapse, one_filesystem=args.one_file_system,
+                     exclusions=args.exclusions)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scanner",
+                                     description="Analyse l'occupation disque sans interface graphique.")
+    parser.add_argument("roots", nargs="*", help="dossiers ou disques à scanner")
+    parser.add_argument("--top", type=int, default=10, help="nombre de plus gros dossiers/fichiers (défaut : 10)")
+    parser.add_argument("--format", choices=("text", "jsonl"), default="text", help="format de sortie")
+    parser.add_argument("--workers", type=int, default=1, help="threads de scan (1 = séquentiel)")
+    parser.add_argument("--processes", type=int, default=1, metavar="N",
+                        help="processus de scan : sous-arbres de la racine répartis entre N processus, "
+                             "au-delà de ce que permettent les threads (1 = désactivé)")
+    parser.add_argument("--load", metavar="FICHIER",
+                        help="snapshot existant : rapport sans scan, ou base d'un rafraîchissement incrémental")
+    parser.add_argument("--save", metavar="FICHIER", help="enregistre le résultat en snapshot (une seule racine)")
+    parser.add_argument("--types", action="store_true",
+                        help="répartition par extension et par tranche de taille")
+    parser.add_argument("--ages", nargs="?", const="mtime", choices=("mtime", "atime"),
+                        help="octets par tranche d'âge (< 7 j, < 30 j, < 1 an, plus ancien), selon la "
+                             "date de modification (défaut) ou de dernier accès")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="appels système, erreurs et dossiers les plus lents")
+    parser.add_argument("--log", metavar="FICHIER", help="journal structuré tournant (JSON)")
+    parser.add_argument("--profile", metavar="FICHIER",
+                        help="profil cProfile du scan (complet avec --workers 1)")
+    parser.add_argument("--duplicates", action="store_true", help="recherche aussi les fichiers en double")
+    parser.add_argument("--dup-min-size", type=int, default=1, metavar="OCTETS",
+                        help="taille minimale des doublons recherchés (défaut : 1)")
+    parser.add_argument("--diff", metavar="FICHIER",
+                        help="compare le résultat à un snapshot plus ancien de la même racine")
+    parser.add_argument("--collapse-below", type=int, default=0, metavar="OCTETS",
+                        help="regroupe les fichiers (et, avec --workers 1, les dossiers) plus petits")
+    parser.add_argument("--max-entries", type=int, default=0, metavar="N",
+                        help="garde au plus N fichiers par dossier, les plus gros ; les autres sont regroupés")
+    parser.add_argument("--memory-budget", type=int, default=0, metavar="MO",
+                        help="budget mémoire du store : le seuil de regroupement est relevé au besoin")
+    parser.add_argument("-x", "--one-file-system", action="store_true",
+                        help="ne traverse pas les points de montage (comme du -x)")
+    parser.add_argument("--by-device", action="store_true",
+                        help="scanne les racines en parallèle, regroupées par périphérique (implique -x)")
+    parser.add_argument("--device-workers", type=parse_device_workers, default={}, metavar="TYPE=N,...",
+                        help="threads par type de périphérique : ssd, hdd, network, unknown (défaut : 16, 2, 4, 4)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="RÈGLE",
+                        help="exclut des entrées (répétable) : glob:*.tmp, regex:MOTIF, path:/chemin, "
+                             "fstype:nfs ; sans préfixe, chemin absolu ou glob sur le nom")
+    parser.add_argument("--no-default-excludes", action="store_true",
+                        help="parcourt aussi /proc, /sys, /dev et les systèmes de fichiers virtuels")
+    args = parser.parse_args(argv)
+    from core.exclusions import build_exclusions
+    import re
+    try:
+        args.exclusions = build_exclusions(args.exclude, not args.no_default_excludes)
+    except (ValueError, re.error) as e:
+        parser.error(f"--exclude : {e}")
+    if not args.roots and not args.load:
+        parser.error("indiquez au moins une racine ou --load")
+    if args.save and len(args.roots) > 1:
+        parser.error("--save n'accepte qu'une seule racine")
+    if args.by_device and (args.load or args.collapse_below or args.max_entries or args.memory_budget):
+        parser.error("--by-device ne se combine pas avec --load ni le mode mémoire bornée")
+    if args.processes > 1 and (args.by_device or args.collapse_below or args.max_entries or args.memory_budget):
+        parser.error("--processes ne se combine pas avec --by-device ni le mode mémoire bornée")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    out = Output(args.format)
+    if args.log:
+        from core.telemetry import setup_logging
+        setup_logging(args.log)
+    previous = None
+    if args.load:
+        from core.snapshot import load_snapshot
+        previous = load_snapshot(args.load)
+        if not args.roots:
+            report(previous, out, args.top, 0.0)
+            if args.types:
+                report_types(previous, out, args.top)
+            if args.ages:
+                report_ages(previous, out, args)
+            if args.duplicates:
+                report_duplicates(previous, out, args)
+            if args.diff:
+                report_diff(previous, out, args)
+            return 0
+
+    from core.telemetry import ScanTelemetry, profiled
+    with profiled(args.profile):
+        if args.by_device:
+            scan_by_device(args, out)
+            return 0
+        for root in args.roots:
+            scan_and_report(root, args, out, previous, ScanTelemetry(top_k=args.top))
+    return 0
+
+
+def scan_and_report(root, args, out, previous, telemetry):
+    root = os.path.abspath(root)  # voir scan_by_device ; « dossier/ » compare égal à « dossier »
+    start = time.monotonic()
+    reference = previous if previous is not None and previous.root_path == root else None
+    collapse = collapse_policy(args)
+    store = scan_root(root, args, out, reference, telemetry, collapse,
+                      args.load if reference is not None else None)
+    telemetry.finish()
+    telemetry.log_summary(root)
+    report_all(store, args, out, telemetry, time.monotonic() - start, collapse)
+
+
+def report_all(store, args, out, telemetry, elapsed, collapse=None):
+    root = store.root_path
+    report(store, out, args.top, elapsed)
+    if collapse is not None:
+        out.emit({"type": "collapse", "root": root, "folded": collapse.folded,
+                  "collapsed": collapse.collapsed, "min_size": collapse.min_size,
+                  "store_bytes": store.nbytes()})
+    if args.telemetry:
+        out.emit(dict(telemetry.summary(), type="telemetry", root=root))
+    if args.types:
+        report_types(store, out, args.top)
+    if args.ages:
+        report_ages(store, out, args)
+    if args.duplicates:
+        report_duplicates(store, out, args)
+    if args.diff:
+        report_diff(store, out, args)
+    if args.save:
+        from core.snapshot import save_snapshot
+        save_snapshot(store, args.save)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except BrokenPipeError:
+        # Sortie coupée (ex. « | head ») : on s'arrête sans trace
+        sys.stderr.close()
+        sys.exit(1)
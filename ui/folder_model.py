@@ -0,0 +1,198 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor, QFont
+from core.utils import format_size
+from core.collapse import is_collapsed
+from core.ages import AGE_BUCKETS, UNKNOWN
+
+GROWTH_COLOR = (209, 73, 91)
+SHRINK_COLOR = (76, 159, 112)
+
+
+class FolderModel(QAbstractTableModel):
+    """Contenu d'un dossier du ``NodeStore`` pour la vue ``file_list``.
+
+    Le modèle ne garde que la liste ordonnée des indices de nœuds : les
+    lignes (nom, taille, icône) sont calculées à la demande par ``data()``,
+    donc uniquement pour la zone visible. Le tri par taille décroissante
+    (par défaut) reprend l'index trié du store ; les autres tris se font ici.
+    Avec ``set_deltas`` (comparaison à un snapshot), une colonne « Évolution »
+    s'ajoute et les lignes sont teintées selon leur croissance. Avec
+    ``set_ages`` (``AgeHistogram``), une colonne par tranche d'âge donne les
+    octets de chaque ligne dans cette tranche.
+    """
+
+    HEADERS = {"name": "Nom", "size": "Taille", "delta": "Évolution"}
+
+    def __init__(self, folder_icon, file_icon, parent=None):
+        super().__init__(parent)
+        self.folder_icon = folder_icon
+        self.file_icon = file_icon
+        self.store = None
+        self.folder = -1
+        self.nodes = []
+        self.min_size = 0
+        self.sort_column = 1
+        self.sort_order = Qt.SortOrder.DescendingOrder
+        self.deltas = None  # nœud -> écart d'octets (TreeDiff.deltas)
+        self._max_delta = 0
+        self.ages = None  # AgeHistogram
+        self.columns = ["name", "size"]
+        self._rows = None  # nœud -> ligne, construit à la demande
+
+    def set_folder(self, store, folder, min_size=0):
+        self.beginResetModel()
+        self.store = store
+        self.folder = folder
+        self.min_size = min_size
+        self._load_nodes()
+        self.endResetModel()
+
+    def set_deltas(self, deltas):
+        """Écarts par nœud à afficher, ou ``None`` pour retirer la comparaison."""
+        self.beginResetModel()
+        self.deltas = deltas
+        self._set_columns()
+        self.endResetModel()
+
+    def set_ages(self, ages):
+        """Histogramme d'âges à afficher en colonnes, ou ``None`` pour les retirer."""
+        self.beginResetModel()
+        self.ages = ages
+        self._set_columns()
+        self.endResetModel()
+
+    def _set_columns(self):
+        sort_key = self.columns[self.sort_column] if self.sort_column < len(self.columns) else "size"
+        columns = ["name", "size"]
+        if self.ages is not None:
+            columns += [("age", bucket) for bucket in range(len(AGE_BUCKETS))]
+            if self.ages.histogram(0)[-1]:  # dates absentes (atime d'un ancien snapshot)
+                columns.append(("age", len(AGE_BUCKETS)))
+        if self.deltas is not None:
+            columns.append("delta")
+        self.columns = columns
+        self.sort_column = columns.index(sort_key) if sort_key in columns else 1
+        if self.store is not None:
+            self._load_nodes()
+
+    def column_title(self, column):
+        key = self.columns[column]
+        if key[0] == "age":
+            return AGE_BUCKETS[key[1]][0] if key[1] < len(AGE_BUCKETS) else UNKNOWN
+        return self.HEADERS[key]
+
+    def clear(self):
+        self.beginResetModel()
+        self.store = None
+        self.folder = -1
+        self.nodes = []
+        self._rows = None
+        self.endResetModel()
+
+    def _load_nodes(self):
+        store = self.store
+        # Filtre = coupure dans l'index trié (recherche dichotomique)
+        cutoff = store.count_at_least(self.folder, self.min_size)
+        nodes = store.children_by_size(self.folder)[:cutoff]
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        key = self.columns[self.sort_column]
+        if key == "name":
+            nodes = sorted(nodes, key=store.name, reverse=descending)
+        elif key == "delta":
+            nodes = sorted(nodes, key=lambda n: self.deltas.get(n, 0), reverse=descending)
+        elif key[0] == "age":
+            nodes = sorted(nodes, key=lambda n: self.ages.histogram(n)[key[1]], reverse=descending)
+        elif not descending:
+            nodes = nodes[::-1]
+        self.nodes = nodes
+        self._rows = None
+        if self.deltas is not None:
+            # Teinte relative au plus fort écart du dossier affiché
+            self._max_delta = max((abs(self.deltas.get(n, 0)) for n in nodes), default=0)
+
+    def reload(self):
+        """Relit le dossier courant (scan en cours) en conservant la sélection."""
+        if self.store is None:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._load_nodes()
+        self.layoutChanged.emit()
+
+    def node(self, row):
+        return self.nodes[row]
+
+    def row_of(self, node):
+        """Ligne du nœud ``node`` dans la vue, ou -1 (filtré ou absent)."""
+        if self._rows is None:
+            self._rows = {node: row for row, node in enumerate(self.nodes)}
+        return self._rows.get(node, -1)
+
+    def refresh_nodes(self, nodes):
+        """Signale à la vue que ces nœuds ont changé (seules leurs lignes sont redessinées)."""
+        for node in nodes:
+            row = self.row_of(node)
+            if row >= 0:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    # --- API QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.nodes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = self.nodes[index.row()]
+        column = index.column()
+        key = self.columns[column]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if key == "name":
+                return self.store.name(node)
+            if key[0] == "age":
+                size = self.ages.histogram(node)[key[1]]
+                return format_size(size) if size else ""
+            if key == "delta":
+                delta = self.deltas.get(node, 0)
+                if not delta:
+                    return ""
+                return ("+" if delta > 0 else "-") + format_size(abs(delta))
+            if self.store.is_pending(node):
+                return format_size(self.store.size[node]) + " …"  # total provisoire
+            return format_size(self.store.size[node])
+        if role == Qt.ItemDataRole.DecorationRole and column == 0:
+            return self.folder_icon if self.store.is_dir(node) else self.file_icon
+        if role in (Qt.ItemDataRole.FontRole, Qt.ItemDataRole.ToolTipRole) and column == 0:
+            # Mode mémoire bornée : détail absent, disponible au double-clic
+            if not is_collapsed(self.store, node) or self.store.child_count[node]:
+                return None
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return "Contenu regroupé : double-clic pour le détailler"
+            font = QFont()
+            font.setItalic(True)
+            return font
+        if role == Qt.ItemDataRole.BackgroundRole and self.deltas is not None:
+            delta = self.deltas.get(node, 0)
+            if not delta or not self._max_delta:
+                return None
+            red, green, blue = GROWTH_COLOR if delta > 0 else SHRINK_COLOR
+            return QColor(red, green, blue, 40 + int(140 * abs(delta) / self._max_delta))
+        if role == Qt.ItemDataRole.UserRole:
+            return node
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.column_title(section)
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        if self.store is None:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._load_nodes()
+        self.layoutChanged.emit()
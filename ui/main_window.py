@@ -1,28 +1,59 @@
 import os
 import sys
 import shutil
+import re
+import tempfile
 import threading
+import logging
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout, QComboBox, QSizePolicy,
     QPushButton, QProgressBar, QListWidget, QListWidgetItem,
     QFileIconProvider, QTreeWidget, QTreeWidgetItem, QSizePolicy, QSplitter, QCheckBox, QGroupBox, QRadioButton, QButtonGroup,
-    QSpacerItem, QFileDialog, QLineEdit
+    QSpacerItem, QFileDialog, QLineEdit, QSpinBox, QMenuBar, QTableView, QHeaderView, QAbstractItemView,
+    QTabWidget, QDoubleSpinBox, QTableWidget, QTableWidgetItem, QInputDialog
 )
-from PyQt6.QtGui import QIcon
+from PyQt6.QtGui import QIcon, QAction
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from core.scanner import scan_directory, get_size
-from core.utils import format_size
-from core.scanner import DirectoryScanner
+from core.utils import format_size, format_duration
+from core.qt_scanner import DirectoryScanner
+from core.walker import scan_tree, scan_tree_parallel
+from core.snapshot import save_snapshot, load_snapshot
+from core.watcher import TreeWatcher
+from core.store import NodeStore
+from core.stream import ScanStream
+from core.progress import ProgressTracker, estimate_work
+from core.control import StopToken
+from core.duplicates import DuplicateFinder
+from core.diff import diff_stores
+from core.search import NameIndex
+from core.ages import AgeHistogram, CLOCKS
+from core.collapse import CollapsePolicy, expand_node, rescan_subtree, is_collapsed
+from core.devices import DeviceScheduler, volumes
+from core.exclusions import build_exclusions
+from core.daemon import DaemonClient, DaemonError, DEFAULT_PORT
+from core import rollups
+from core.telemetry import ScanTelemetry, profiled, log_event
+from ui.folder_model import FolderModel
+from ui.treemap_widget import TreemapWidget
 
 
 class MainWindow(QWidget):
-    scan_finished = pyqtSignal(dict)
-    progress_changed = pyqtSignal(int)
+    scan_finished = pyqtSignal(object)
+    progress_changed = pyqtSignal(object)
+    watch_batch = pyqtSignal(object)
+    service_loaded = pyqtSignal(object)
+    scan_started = pyqtSignal(object)
+    scan_partial = pyqtSignal(object)
+    duplicates_progress = pyqtSignal(object)
+    duplicates_finished = pyqtSignal(object)
+    expand_finished = pyqtSignal(object)
+    volumes_finished = pyqtSignal(object)
 
     def __init__(self):
 
         super().__init__()
         self.selected_path = None
+        self.selected_paths = []  # disques cochés (plusieurs : scan par périphérique)
         self.selected_type = None
         self.dark_mode = True  # ⬅️ change ça pour tester
         self.apply_theme()
@@ -33,6 +64,30 @@ class MainWindow(QWidget):
         self.main_layout = QHBoxLayout(self)
         self.setLayout(self.main_layout)
 
+        # 📁 Menu Fichier (snapshots)
+        self.menu_bar = QMenuBar(self)
+        self.file_menu = self.menu_bar.addMenu("Fichier")
+        self.open_snapshot_action = QAction("Ouvrir un snapshot...", self)
+        self.open_snapshot_action.triggered.connect(self.open_snapshot_dialog)
+        self.file_menu.addAction(self.open_snapshot_action)
+        self.save_snapshot_action = QAction("Enregistrer le snapshot...", self)
+        self.save_snapshot_action.triggered.connect(self.save_snapshot_dialog)
+        self.file_menu.addAction(self.save_snapshot_action)
+        self.open_service_action = QAction("Ouvrir l'index du service...", self)
+        self.open_service_action.triggered.connect(self.open_service_dialog)
+        self.file_menu.addAction(self.open_service_action)
+        self.service_address = f"http://127.0.0.1:{DEFAULT_PORT}"
+        self.service_loaded.connect(self.on_service_loaded)
+        self.file_menu.addSeparator()
+        self.compare_snapshot_action = QAction("Comparer à un snapshot...", self)
+        self.compare_snapshot_action.triggered.connect(self.compare_snapshot_dialog)
+        self.file_menu.addAction(self.compare_snapshot_action)
+        self.clear_diff_action = QAction("Retirer la comparaison", self)
+        self.clear_diff_action.setEnabled(False)
+        self.clear_diff_action.triggered.connect(self.clear_diff)
+        self.file_menu.addAction(self.clear_diff_action)
+        self.main_layout.setMenuBar(self.menu_bar)
+
         # 🟩 Layout intérieur pour les cards (sidebar)
         self.sidebar_layout = QVBoxLayout()
         self.theme_button = QPushButton("🌙")  # ou "☀️" selon ton style
@@ -49,7 +104,7 @@ class MainWindow(QWidget):
         self.disk_layout.setContentsMargins(6, 18, 6, 6)  # ← top augmenté
         self.disk_radiobuttons = []
         self.disk_buttongroup = QButtonGroup(self)
-        self.disk_buttongroup.setExclusive(True)
+        self.disk_buttongroup.setExclusive(False)  # plusieurs volumes à la fois
         self.populate_disks()
         self.disk_group.setLayout(self.disk_layout)
         self.disk_group.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
@@ -69,9 +124,74 @@ class MainWindow(QWidget):
         self.scan_button.clicked.connect(self.start_scan)
         self.progress_layout.addWidget(self.scan_button)  # <-- Ajout du bouton ici
 
+        # Pause / annulation du scan en cours
+        self.scan_control_layout = QHBoxLayout()
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setEnabled(False)
+        self.scan_control_layout.addWidget(self.pause_button)
+        self.cancel_button = QPushButton("Annuler")
+        self.cancel_button.clicked.connect(self.cancel_scan)
+        self.cancel_button.setEnabled(False)
+        self.scan_control_layout.addWidget(self.cancel_button)
+        self.progress_layout.addLayout(self.scan_control_layout)
+
+        # Rafraîchissement incrémental du dernier scan (ou snapshot)
+        self.refresh_button = QPushButton("Rafraîchir")
+        self.refresh_button.clicked.connect(self.refresh_scan)
+        self.progress_layout.addWidget(self.refresh_button)
+
+        # Surveillance en direct (inotify ou scrutation)
+        self.watch_checkbox = QCheckBox("Surveiller les changements")
+        self.watch_checkbox.toggled.connect(self.toggle_watch)
+        self.progress_layout.addWidget(self.watch_checkbox)
+
+        # Nombre de threads de scan (1 = scan séquentiel)
+        self.workers_layout = QHBoxLayout()
+        self.workers_layout.addWidget(QLabel("Threads :"))
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, 64)
+        self.workers_spinbox.setValue(16)
+        self.workers_layout.addWidget(self.workers_spinbox)
+        self.progress_layout.addLayout(self.workers_layout)
+
+        # Mémoire bornée : petits éléments regroupés (0 = tout garder)
+        self.collapse_layout = QHBoxLayout()
+        self.collapse_layout.addWidget(QLabel("Regrouper <"))
+        self.collapse_spinbox = QDoubleSpinBox()
+        self.collapse_spinbox.setRange(0, 1024 * 1024)
+        self.collapse_spinbox.setDecimals(1)
+        self.collapse_spinbox.setSuffix(" Mo")
+        self.collapse_spinbox.setToolTip("Fichiers et dossiers plus petits regroupés ; double-clic pour les détailler")
+        self.collapse_layout.addWidget(self.collapse_spinbox)
+        self.budget_spinbox = QSpinBox()
+        self.budget_spinbox.setRange(0, 1024 * 1024)
+        self.budget_spinbox.setSuffix(" Mo")
+        self.budget_spinbox.setSpecialValueText("∞")
+        self.budget_spinbox.setToolTip("Budget mémoire du scan (seuil de regroupement relevé au besoin)")
+        self.collapse_layout.addWidget(self.budget_spinbox)
+        self.progress_layout.addLayout(self.collapse_layout)
+
+        # Règles d'exclusion en plus des systèmes de fichiers virtuels (séparées par des virgules)
+        self.exclude_input = QLineEdit()
+        self.exclude_input.setPlaceholderText("Exclure : *.tmp, node_modules, path:/mnt/sauvegarde")
+        self.exclude_input.setToolTip("Règles glob:, regex:, path: ou fstype: ; sans préfixe, "
+                                      "chemin absolu ou motif sur le nom")
+        self.progress_layout.addWidget(self.exclude_input)
+        self.exclusions = None
+
         self.scan_status_label = QLabel("")
         self.progress_layout.addWidget(self.scan_status_label)
 
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 1000)
+        self.progress.setValue(0)
+        self.progress.setTextVisible(False)
+        self.progress_layout.addWidget(self.progress)
+
+        self.progress_label = QLabel("")
+        self.progress_layout.addWidget(self.progress_label)
+
         self.progress_group.setLayout(self.progress_layout)
         self.progress_group.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
         self.sidebar_layout.addWidget(self.progress_group)
@@ -93,7 +213,9 @@ class MainWindow(QWidget):
         self.filters_layout = QVBoxLayout()
         self.filters_layout.setContentsMargins(6, 18, 6, 6)
 
-        self.filters_label = QLabel("🔧 Filtres à venir...")
+        # Familles de fichiers les plus lourdes du scan (détail dans l'onglet Types)
+        self.filters_label = QLabel("Types : aucun scan")
+        self.filters_label.setWordWrap(True)
         self.filters_layout.addWidget(self.filters_label)
 
         self.filter_size_input = QLineEdit()
@@ -108,6 +230,42 @@ class MainWindow(QWidget):
         self.filters_group.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
         self.sidebar_layout.addWidget(self.filters_group)
 
+        # === 5️⃣ Recherche par nom (sous-chaîne ou motif glob), résultats par taille
+        self.search_group = QGroupBox("Recherche")
+        self.search_layout = QVBoxLayout()
+        self.search_layout.setContentsMargins(6, 18, 6, 6)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Nom ou motif (ex. *.iso)")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
+        self.search_input.returnPressed.connect(self.run_search)
+        self.search_layout.addWidget(self.search_input)
+
+        # Recherche lancée après une courte pause de frappe
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.run_search)
+
+        self.search_results = QListWidget()
+        self.search_results.setFixedHeight(180)
+        self.search_results.itemClicked.connect(self.on_search_result_clicked)
+        self.search_layout.addWidget(self.search_results)
+
+        self.search_more_layout = QHBoxLayout()
+        self.search_count_label = QLabel("")
+        self.search_more_layout.addWidget(self.search_count_label)
+        self.search_more_button = QPushButton("Suivants")
+        self.search_more_button.setEnabled(False)
+        self.search_more_button.clicked.connect(self.search_next_page)
+        self.search_more_layout.addWidget(self.search_more_button)
+        self.search_layout.addLayout(self.search_more_layout)
+
+        self.search_group.setLayout(self.search_layout)
+        self.search_group.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Maximum)
+        self.sidebar_layout.addWidget(self.search_group)
+
         # 📦 Conteneur de la sidebar (cartes alignées en haut uniquement)
         self.sidebar_container = QWidget()
         self.sidebar_container.setLayout(self.sidebar_layout)
@@ -137,35 +295,163 @@ class MainWindow(QWidget):
         self.central_widget = QWidget()
         self.central_widget.setLayout(self.central_layout)
 
-        self.file_list = QTreeWidget()
-        self.file_list.setHeaderLabels(["Nom", "Taille"])
-        self.file_list.itemDoubleClicked.connect(self.on_item_double_clicked)
+        # Vue virtualisée : seules les lignes visibles sont calculées par le modèle
+        self.folder_icon = QIcon(self.resource_path("resources/folder.png"))
+        self.file_icon = QIcon(self.resource_path("resources/file.png"))
+        self.folder_model = FolderModel(self.folder_icon, self.file_icon, self)
+        # (QTableView plutôt que QTreeView : pas de mise en page de toutes les lignes)
+        self.file_list = QTableView()
+        self.file_list.setModel(self.folder_model)
+        self.file_list.setShowGrid(False)
+        self.file_list.setWordWrap(False)
+        self.file_list.verticalHeader().setVisible(False)
+        self.file_list.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.file_list.verticalHeader().setDefaultSectionSize(22)
+        self.file_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.file_list.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.file_list.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.file_list.setSortingEnabled(True)
+        self.file_list.sortByColumn(1, Qt.SortOrder.DescendingOrder)
+        self.file_list.doubleClicked.connect(self.on_item_double_clicked)
+
+        # 🗺️ Treemap du dossier affiché, à côté de la liste
+        self.treemap = TreemapWidget()
+        self.treemap.folder_activated.connect(self.show_folder)
+        self.content_splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.content_splitter.addWidget(self.file_list)
+        self.content_splitter.addWidget(self.treemap)
+        self.content_splitter.setSizes([450, 550])
+
+        # ⏳ Colonnes d'âge de file_list (octets par ancienneté)
+        self.age_controls = QHBoxLayout()
+        self.age_mode = QComboBox()
+        self.age_mode.addItems(["Âge : masqué", "Âge : dernière modification", "Âge : dernier accès"])
+        self.age_mode.currentIndexChanged.connect(self.update_ages)
+        self.age_controls.addWidget(self.age_mode)
+        self.age_controls.addStretch(1)
 
         self.central_layout.addWidget(self.breadcrumb_widget)  # Breadcrumb en haut
-        self.central_layout.addWidget(self.file_list)          # Liste en dessous
+        self.central_layout.addLayout(self.age_controls)
+        self.central_layout.addWidget(self.content_splitter)   # Liste + treemap en dessous
+
+        # 🧬 Onglet des doublons
+        self.duplicates_widget = QWidget()
+        self.duplicates_layout = QVBoxLayout(self.duplicates_widget)
+        self.duplicates_controls = QHBoxLayout()
+        self.duplicates_controls.addWidget(QLabel("Taille minimale (Mo) :"))
+        self.duplicates_min_size = QDoubleSpinBox()
+        self.duplicates_min_size.setRange(0, 1024 * 1024)
+        self.duplicates_min_size.setValue(1)
+        self.duplicates_controls.addWidget(self.duplicates_min_size)
+        self.duplicates_button = QPushButton("Rechercher les doublons")
+        self.duplicates_button.clicked.connect(self.start_duplicates)
+        self.duplicates_controls.addWidget(self.duplicates_button)
+        self.duplicates_cancel_button = QPushButton("Annuler")
+        self.duplicates_cancel_button.clicked.connect(self.cancel_duplicates)
+        self.duplicates_cancel_button.setEnabled(False)
+        self.duplicates_controls.addWidget(self.duplicates_cancel_button)
+        self.duplicates_controls.addStretch(1)
+        self.duplicates_layout.addLayout(self.duplicates_controls)
+        self.duplicates_label = QLabel("")
+        self.duplicates_layout.addWidget(self.duplicates_label)
+        # Un groupe par contenu identique, ses copies en dessous
+        self.duplicates_tree = QTreeWidget()
+        self.duplicates_tree.setHeaderLabels(["Fichiers", "Récupérable"])
+        self.duplicates_tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.duplicates_tree.itemDoubleClicked.connect(self.on_duplicate_double_clicked)
+        self.duplicates_layout.addWidget(self.duplicates_tree)
+
+        # 🧩 Onglet des types de fichiers (regroupements calculés depuis le store)
+        self.types_widget = QWidget()
+        self.types_layout = QVBoxLayout(self.types_widget)
+        self.types_controls = QHBoxLayout()
+        self.types_mode = QComboBox()
+        self.types_mode.addItems(["Par extension", "Par catégorie", "Par tranche de taille"])
+        self.types_mode.currentIndexChanged.connect(self.update_types)
+        self.types_controls.addWidget(self.types_mode)
+        self.types_subtree_checkbox = QCheckBox("Dossier courant uniquement")
+        self.types_subtree_checkbox.toggled.connect(self.update_types)
+        self.types_controls.addWidget(self.types_subtree_checkbox)
+        self.types_controls.addStretch(1)
+        self.types_layout.addLayout(self.types_controls)
+        self.types_table = QTableWidget(0, 4)
+        self.types_table.setHorizontalHeaderLabels(["Type", "Fichiers", "Taille", "Part"])
+        self.types_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.types_table.verticalHeader().setVisible(False)
+        self.types_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.types_table.setShowGrid(False)
+        self.types_layout.addWidget(self.types_table)
+
+        # ⏱️ Onglet de télémétrie du dernier scan (appels système, dossiers lents)
+        self.telemetry_widget = QWidget()
+        self.telemetry_layout = QVBoxLayout(self.telemetry_widget)
+        self.telemetry_label = QLabel("Aucun scan")
+        self.telemetry_label.setWordWrap(True)
+        self.telemetry_layout.addWidget(self.telemetry_label)
+        self.slowest_table = QTableWidget(0, 3)
+        self.slowest_table.setHorizontalHeaderLabels(["Dossier le plus lent", "Durée", "Entrées"])
+        self.slowest_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.slowest_table.verticalHeader().setVisible(False)
+        self.slowest_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.slowest_table.setShowGrid(False)
+        self.slowest_table.cellDoubleClicked.connect(self.on_slowest_double_clicked)
+        self.telemetry_layout.addWidget(self.slowest_table)
+
+        # 💽 Onglet des volumes (scan de plusieurs disques, un ordonnanceur par périphérique)
+        self.volumes_widget = QWidget()
+        self.volumes_layout = QVBoxLayout(self.volumes_widget)
+        self.volumes_label = QLabel("Cochez plusieurs disques pour les scanner en parallèle")
+        self.volumes_layout.addWidget(self.volumes_label)
+        self.volumes_table = QTableWidget(0, 6)
+        self.volumes_table.setHorizontalHeaderLabels(["Volume", "Type", "Threads", "Taille", "Entrées", "Durée"])
+        self.volumes_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.volumes_table.verticalHeader().setVisible(False)
+        self.volumes_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.volumes_table.setShowGrid(False)
+        self.volumes_table.cellDoubleClicked.connect(self.on_volume_double_clicked)
+        self.volumes_layout.addWidget(self.volumes_table)
+        self.volume_results = []
+        self.volumes_finished.connect(self.on_volumes_finished)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.central_widget, "Dossiers")
+        self.tabs.addTab(self.types_widget, "Types")
+        self.tabs.addTab(self.duplicates_widget, "Doublons")
+        self.tabs.addTab(self.telemetry_widget, "Télémétrie")
+        self.tabs.addTab(self.volumes_widget, "Volumes")
+        self.tabs.currentChanged.connect(self.update_types)
 
         self.main_layout.addWidget(self.sidebar_widget)         # Sidebar à gauche
-        self.main_layout.addWidget(self.central_widget)         # Partie centrale à droite
+        self.main_layout.addWidget(self.tabs)                   # Partie centrale à droite
 
-        # 🟦 Arborescence centrale
-        # self.tree = QTreeWidget()
-        # self.tree.setHeaderLabels(["Nom", "Taille"])
-        # self.tree.itemExpanded.connect(self.load_sub_items)
-        # self.main_layout.addWidget(self.tree)
         self.scan_finished.connect(self.on_scan_finished)
+        self.watch_batch.connect(self.on_watch_batch)
+        self.scan_started.connect(self.on_scan_started)
+        self.progress_changed.connect(self.update_progress)
+        self.scan_partial.connect(self.on_scan_partial)
+        self.duplicates_progress.connect(self.update_duplicates_progress)
+        self.duplicates_finished.connect(self.on_duplicates_finished)
+        self.expand_finished.connect(self.on_expand_finished)
 
         self.current_path = None
+        self.scanned_data = None
+        self.watcher = None
+        self.stop_token = None
+        self.duplicates_token = None
+        self.rollup_cache = {}  # (mode, dossier) -> lignes, pour le store courant
+        self.telemetry = None
+        self.profile_path = None  # profil cProfile de chaque scan (option --profile)
+        self.snapshot_save_path = None  # Enregistrement automatique après chaque scan
+        self.diff = None  # TreeDiff entre un snapshot et le store courant
+        self.search_index = None  # NameIndex du store courant (scan terminé)
+        self.collapse_policy = None  # CollapsePolicy du dernier scan (mode mémoire bornée)
+        self.search_page = None
         self.scan_type = None  # "disk" ou "folder"
         # self.breadcrumb_layout = QHBoxLayout()
         # self.breadcrumb_widget = QWidget()
         # self.breadcrumb_widget.setLayout(self.breadcrumb_layout)
         # self.main_layout.addWidget(self.breadcrumb_widget)  # Ajoute la breadcrumb au-dessus de la liste
 
-        # self.file_list = QTreeWidget()
-        # self.file_list.setHeaderLabels(["Nom", "Taille"])
-        # self.file_list.itemDoubleClicked.connect(self.on_item_double_clicked)
-        # self.main_layout.addWidget(self.file_list)
-
         self.scan_running = False  # ← Ajoute cette ligne
 
 
@@ -187,10 +473,11 @@ class MainWindow(QWidget):
                     index += 1
                 bitmask >>= 1
         else:
-            radio = QRadioButton("/")
-            self.disk_radiobuttons.append(radio)
-            self.disk_buttongroup.addButton(radio, 0)
-            self.disk_layout.addWidget(radio)
+            for index, path in enumerate(volumes() or ["/"]):
+                radio = QRadioButton(path)
+                self.disk_radiobuttons.append(radio)
+                self.disk_buttongroup.addButton(radio, index)
+                self.disk_layout.addWidget(radio)
 
         # Retire la sélection automatique du premier disque
         # if self.disk_radiobuttons:
@@ -200,18 +487,24 @@ class MainWindow(QWidget):
             radio.toggled.connect(self.on_disk_selected)
 
     def on_disk_selected(self, checked):
+        self.selected_paths = [radio.text() for radio in self.disk_radiobuttons if radio.isChecked()]
         if checked:
-            self.selected_path = self.disk_buttongroup.checkedButton().text()
+            self.selected_path = self.selected_paths[0]
             self.selected_type = "disk"
-            self.scan_status_label.setText(f"Disque sélectionné : {self.selected_path}")
+            if len(self.selected_paths) > 1:
+                self.scan_status_label.setText(f"{len(self.selected_paths)} disques sélectionnés")
+            else:
+                self.scan_status_label.setText(f"Disque sélectionné : {self.selected_path}")
         else:
             # Ne rien faire si un dossier est sélectionné
             if self.selected_type == "folder":
                 return
             # Si aucun disque n'est sélectionné, on efface le chemin
-            if not any(radio.isChecked() for radio in self.disk_radiobuttons):
+            if not self.selected_paths:
                 self.selected_path = None
                 self.selected_type = None
+            else:
+                self.selected_path = self.selected_paths[0]
 
     def resource_path(self, relative_path):
         """Retourne le chemin absolu vers un fichier de ressource, compatible PyInstaller."""
@@ -225,93 +518,615 @@ class MainWindow(QWidget):
             return
         if not self.selected_path or not self.selected_type:
             self.scan_status_label.setText("Veuillez sélectionner un disque ou un dossier avant de lancer le scan.")
-            self.file_list.clear()
+            self.folder_model.clear()
             self.breadcrumb_widget.setDisabled(True)
             self.scan_button.setEnabled(True)
             self.folder_button.setEnabled(True)
             self.scan_running = False
             return
 
-        self.file_list.clear()
-        self.file_list.setDisabled(True)
-        self.breadcrumb_widget.setDisabled(True)  # Désactive le fil d'ariane
+        if self.selected_type == "disk" and len(self.selected_paths) > 1:
+            self.launch_volumes_scan(self.selected_paths)
+            return
+        self.launch_scan(self.selected_path, self.selected_type)
+
+    def refresh_scan(self):
+        """Rescan incrémental : seuls les dossiers modifiés depuis le dernier scan sont relistés."""
+        if self.scan_running:
+            self.scan_status_label.setText("Un scan est déjà en cours.")
+            return
+        if self.scanned_data is None:
+            self.scan_status_label.setText("Aucun scan à rafraîchir.")
+            return
+        self.launch_scan(self.scanned_data.root_path, self.scan_type, previous=self.scanned_data)
+
+    def read_exclusions(self):
+        """Compile les règles saisies ; ``False`` (et message) si l'une est invalide."""
+        specs = [spec.strip() for spec in self.exclude_input.text().split(",") if spec.strip()]
+        try:
+            self.exclusions = build_exclusions(specs)
+        except (ValueError, re.error) as e:
+            self.scan_status_label.setText(f"Règle d'exclusion invalide : {e}")
+            return False
+        return True
+
+    def launch_scan(self, path, scan_type, previous=None):
+        if not self.read_exclusions():
+            return
+        self.watch_checkbox.setChecked(False)
+        self.folder_model.clear()
         self.scan_button.setEnabled(False)
+        self.refresh_button.setEnabled(False)
         self.folder_button.setEnabled(False)
         self.scan_running = True
-        if self.selected_type == "disk":
-            self.scan_status_label.setText(f"Scan du disque {self.selected_path} en cours...")
+        self.stop_token = StopToken()
+        self.pause_button.setText("Pause")
+        self.pause_button.setEnabled(True)
+        self.cancel_button.setEnabled(True)
+        if previous is not None:
+            self.scan_status_label.setText(f"Rafraîchissement de {path} en cours...")
+        elif scan_type == "disk":
+            self.scan_status_label.setText(f"Scan du disque {path} en cours...")
         else:
-            self.scan_status_label.setText(f"Scan du dossier {self.selected_path} en cours...")
-        self.scan_type = self.selected_type
-        threading.Thread(target=self.scan_thread, args=(self.selected_path,), daemon=True).start()
+            self.scan_status_label.setText(f"Scan du dossier {path} en cours...")
+        self.scan_type = scan_type
+        workers = self.workers_spinbox.value()
+        policy = CollapsePolicy(int(self.collapse_spinbox.value() * 1024 * 1024),
+                                memory_budget=self.budget_spinbox.value() * 1024 * 1024)
+        self.collapse_policy = policy if policy.active else None
+        # Un scan précédent de la même racine sert à estimer le travail restant
+        reference = previous
+        if reference is None and self.scanned_data is not None and self.scanned_data.root_path == path:
+            reference = self.scanned_data
+        self.progress.setValue(0)
+        self.progress_label.setText("")
+        threading.Thread(target=self.scan_thread,
+                         args=(path, workers, previous, reference, self.stop_token, self.collapse_policy,
+                               self.exclusions),
+                         daemon=True).start()
+
+    def launch_volumes_scan(self, paths):
+        """Scan de plusieurs volumes à la fois, chaque périphérique à son rythme."""
+        if not self.read_exclusions():
+            return
+        self.watch_checkbox.setChecked(False)
+        self.folder_model.clear()
+        self.scan_button.setEnabled(False)
+        self.refresh_button.setEnabled(False)
+        self.folder_button.setEnabled(False)
+        self.scan_running = True
+        self.stop_token = StopToken()
+        self.pause_button.setText("Pause")
+        self.pause_button.setEnabled(True)
+        self.cancel_button.setEnabled(True)
+        self.scan_type = "disk"
+        self.collapse_policy = None
+        self.volume_results = []
+        self.volumes_table.setRowCount(0)
+        self.scan_status_label.setText(f"Scan de {len(paths)} volumes en cours...")
+        self.progress.setRange(0, 0)
+        self.progress_label.setText("")
+        threading.Thread(target=self.volumes_thread, args=(list(paths), self.stop_token, self.exclusions),
+                         daemon=True).start()
+
+    def volumes_thread(self, paths, stop_token, exclusions=None):
+        # Avancement global : volumes distincts, leurs estimations s'additionnent
+        tracker = ProgressTracker(paths[0])
+        estimates = [estimate_work(path) for path in paths]
+        tracker.total_bytes = sum(estimate[0] or 0 for estimate in estimates) or None
+        tracker.total_entries = sum(estimate[1] or 0 for estimate in estimates) or None
+        scanned = {}  # racine -> (octets, entrées)
+
+        def progress(root, bytes_done, entries):
+            scanned[root] = (bytes_done, entries)
+            info = tracker.update(sum(volume[0] for volume in scanned.values()),
+                                  sum(volume[1] for volume in scanned.values()))
+            if info is not None:
+                self.progress_changed.emit(info)
+
+        done = []
+        scheduler = DeviceScheduler(paths, stop_token=stop_token, progress_callback=progress,
+                                    on_root_done=done.append, exclusions=exclusions)
+        log_event(logging.INFO, "scan_start", roots=len(paths), devices=len(scheduler.groups))
+        try:
+            with profiled(self.profile_path):
+                results = scheduler.run()
+        except Exception:
+            logging.getLogger("fvv.scan").exception("scan_failed", extra={"fields": {"roots": len(paths)}})
+            results = done
+        if not stop_token.cancelled:
+            self.progress_changed.emit(tracker.finish(sum(result.store.size[0] for result in results),
+                                                      sum(len(result.store) - 1 for result in results)))
+        self.volumes_finished.emit((results, scheduler))
+
+    def on_volumes_finished(self, payload):
+        results, scheduler = payload
+        self.volume_results = results
+        table = self.volumes_table
+        table.setRowCount(len(results))
+        for row_number, result in enumerate(results):
+            values = (result.root, result.kind, str(result.workers), format_size(result.store.size[0]),
+                      str(len(result.store) - 1), format_duration(result.seconds))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column > 1:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                table.setItem(row_number, column, item)
+        errors = "".join(f"\n{root} : {error.strerror}" for root, error in scheduler.errors.items())
+        self.volumes_label.setText(
+            f"{len(results)} volumes sur {len(scheduler.groups)} périphériques · "
+            f"{format_size(sum(result.store.size[0] for result in results))}{errors}")
+        self.progress.setRange(0, 1000)
+        self.progress.setValue(1000)
+        if not results:
+            self.on_scan_finished(NodeStore(self.selected_path))
+            return
+        self.telemetry = results[0].telemetry
+        self.on_scan_finished(results[0].store)
+        self.tabs.setCurrentWidget(self.volumes_widget)
+
+    def on_volume_double_clicked(self, row, column):
+        # Charge le volume choisi comme arbre courant
+        if self.scan_running or row >= len(self.volume_results):
+            return
+        result = self.volume_results[row]
+        self.telemetry = result.telemetry
+        self.on_scan_finished(result.store)
+        self.tabs.setCurrentWidget(self.central_widget)
 
-    def on_scan_finished(self, children_dict):
-        self.scanned_data = children_dict
-        self.base_disk_path = next(iter(children_dict))
+    def toggle_pause(self):
+        if self.stop_token is None:
+            return
+        if self.stop_token.paused:
+            self.stop_token.resume()
+            self.pause_button.setText("Pause")
+            self.scan_status_label.setText("Scan repris...")
+        else:
+            self.stop_token.pause()
+            self.pause_button.setText("Reprendre")
+            self.scan_status_label.setText("Scan en pause")
+
+    def cancel_scan(self):
+        if self.stop_token is not None and self.scan_running:
+            self.stop_token.cancel()
+            self.scan_status_label.setText("Annulation du scan...")
+
+    def on_scan_started(self, store):
+        # Le store se remplit en arrière-plan : on peut déjà naviguer dedans
+        self.clear_diff()
+        self.scanned_data = store
+        self.search_index = None
+        self.clear_search_results()
+        self.rollup_cache = {}
+        self.base_disk_path = store.root_path
+        self.update_ages()  # store en croissance : colonnes d'âge masquées jusqu'à la fin
         self.show_folder(self.base_disk_path)
-        self.scan_status_label.setText("Scan terminé")
+        self.file_list.setDisabled(False)
+        self.breadcrumb_widget.setDisabled(False)
+
+    def on_scan_partial(self, completed):
+        if not self.scan_running or self.current_path is None:
+            return
+        # Nouveaux totaux provisoires et dossiers terminés : on retrie la vue en place
+        self.folder_model.reload()
+        self.treemap.refresh()
+
+    def on_scan_finished(self, store):
+        # Après un scan diffusé, on reste dans le dossier en cours de consultation
+        streamed = store is self.scanned_data and self.current_path is not None
+        if store is not self.scanned_data:
+            self.clear_diff()  # écarts indexés sur les nœuds de l'ancien store
+        self.scanned_data = store
+        self.search_index = NameIndex(store)
+        self.clear_search_results()
+        self.rollup_cache = {}
+        self.base_disk_path = store.root_path
+        self.show_folder(self.current_path if streamed else self.base_disk_path)
+        if self.stop_token is not None and self.stop_token.cancelled:
+            self.scan_status_label.setText("Scan annulé (résultats partiels)")
+        elif self.collapse_policy is not None and self.scan_running:
+            self.scan_status_label.setText(f"Scan terminé ({self.collapse_policy.summary()})")
+        else:
+            self.scan_status_label.setText("Scan terminé")
+        self.pause_button.setEnabled(False)
+        self.cancel_button.setEnabled(False)
         self.scan_button.setEnabled(True)
+        self.refresh_button.setEnabled(True)
         self.folder_button.setEnabled(True)
         self.file_list.setDisabled(False)
         self.breadcrumb_widget.setDisabled(False)  # Réactive le fil d'ariane
         self.scan_running = False
-
-
-    def scan_thread(self, path):
-        def update_callback(progress):
-            self.progress_changed.emit(progress)
-
-        # Scan complet (lent mais précis)
-        data = scan_directory(path, update_callback)
-        # On veut un dict: dossier -> liste enfants
-        children_dict = {path: data}
-        # Pour chaque sous-dossier, ajoute ses enfants récursivement
-        for item in data:
-            if os.path.isdir(item['path']):
-                children_dict.update(self.scan_subfolders(item['path'], update_callback))
-
-        self.scanned_data = children_dict
+        self.update_ages()
+        self.update_types_summary()
+        self.update_types()
+        self.update_telemetry()
+
+
+    def scan_thread(self, path, workers=1, previous=None, reference=None, stop_token=None, collapse=None,
+                    exclusions=None):
+        # Résultats partiels diffusés au plus toutes les 250 ms
+        stream = ScanStream(self.scan_partial.emit)
+        tracker = ProgressTracker(path, reference)
+
+        def update_callback(scanned):
+            # store.size[0] : total provisoire des octets déjà vus
+            info = tracker.update(store.size[0], scanned)
+            if info is not None:
+                self.progress_changed.emit(info)
+            stream.tick()
+
+        store = NodeStore(path)
+        telemetry = ScanTelemetry()
+        self.telemetry = telemetry
+        if collapse is None:
+            self.scan_started.emit(store)
+        # Sinon, pas de navigation pendant le scan : les petits dossiers
+        # terminés perdent leurs descendants (indices réutilisés ensuite)
+        log_event(logging.INFO, "scan_start", root=path, workers=workers,
+                  incremental=previous is not None, bounded=collapse is not None)
+
+        # Scan complet en un seul passage : arbre compact (NodeStore)
+        try:
+            with profiled(self.profile_path):
+                if collapse is not None:
+                    store = scan_tree(path, update_callback, previous=previous, store=store,
+                                      stop_token=stop_token, telemetry=telemetry, collapse=collapse,
+                                      exclusions=exclusions)
+                elif workers > 1:
+                    store = scan_tree_parallel(path, workers, update_callback, previous=previous,
+                                               store=store, on_complete=stream.dir_done,
+                                               stop_token=stop_token, telemetry=telemetry,
+                                               exclusions=exclusions)
+                else:
+                    store = scan_tree(path, update_callback, previous=previous,
+                                      store=store, on_complete=stream.dir_done,
+                                      stop_token=stop_token, telemetry=telemetry, exclusions=exclusions)
+        except Exception:
+            # Résultats partiels conservés ; la cause va dans le journal
+            logging.getLogger("fvv.scan").exception("scan_failed", extra={"fields": {"root": path}})
+        cancelled = stop_token is not None and stop_token.cancelled
+        telemetry.finish()
+        telemetry.log_summary(path)
+
+        if not cancelled:
+            self.progress_changed.emit(tracker.finish(store.size[0], len(store) - 1))
+        if self.snapshot_save_path and not cancelled:
+            try:
+                save_snapshot(store, self.snapshot_save_path)
+            except OSError:
+                pass
 
         # Signale la fin du scan au thread principal (via signal Qt)
-        self.scan_finished.emit(children_dict)
-
-
-    def build_tree(self, base_path, data):
-        self.tree.clear()
-        for item in sorted(data, key=lambda x: x['size'], reverse=True):
-            node = QTreeWidgetItem([item['name'], format_size(item['size'])])
-            node.setData(0, Qt.ItemDataRole.UserRole, item['path'])
-
-            icon = QIcon(self.resource_path("resources/folder.png")) if os.path.isdir(item['path']) else QIcon(self.resource_path("resources/file.png"))
-            node.setIcon(0, icon)
-
-            if os.path.isdir(item['path']):
-                node.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+        self.scan_finished.emit(store)
 
-            self.tree.addTopLevelItem(node)
 
-
-
-    def load_sub_items(self, item):
+    def start_duplicates(self):
+        if self.scanned_data is None or self.scan_running:
+            self.duplicates_label.setText("Lancez d'abord un scan complet.")
+            return
+        if self.duplicates_token is not None:
+            return  # recherche déjà en cours
+        self.duplicates_tree.clear()
+        self.duplicates_token = StopToken()
+        self.duplicates_button.setEnabled(False)
+        self.duplicates_cancel_button.setEnabled(True)
+        self.duplicates_label.setText("Regroupement par taille...")
+        min_size = int(self.duplicates_min_size.value() * 1024 * 1024)
+        finder = DuplicateFinder(self.scanned_data, min_size, self.workers_spinbox.value(),
+                                 self.duplicates_token, self.on_duplicates_progress)
+        threading.Thread(target=self.duplicates_thread, args=(finder,), daemon=True).start()
+
+    def duplicates_thread(self, finder):
+        groups = finder.run()
+        self.duplicates_finished.emit((finder, groups))
+
+    def on_duplicates_progress(self, stage, done, total):
+        # Thread de recherche : on ne publie que de temps en temps
+        if done == total or done % 50 == 0:
+            self.duplicates_progress.emit((stage, done, total))
+
+    def update_duplicates_progress(self, info):
+        stage, done, total = info
+        label = "Empreintes partielles" if stage == "partial" else "Empreintes complètes"
+        self.duplicates_label.setText(f"{label} : {done} / {total} fichiers")
+
+    def cancel_duplicates(self):
+        if self.duplicates_token is not None:
+            self.duplicates_token.cancel()
+            self.duplicates_label.setText("Annulation...")
+
+    def on_duplicates_finished(self, result):
+        finder, groups = result
+        self.duplicates_token = None
+        self.duplicates_button.setEnabled(True)
+        self.duplicates_cancel_button.setEnabled(False)
+        self.duplicates_tree.clear()
+        items = []
+        for group in groups[:1000]:  # les plus coûteux suffisent à l'écran
+            item = QTreeWidgetItem([f"{len(group.paths)} × {format_size(group.size)}", format_size(group.wasted)])
+            for path in group.paths:
+                child = QTreeWidgetItem([path, ""])
+                child.setData(0, Qt.ItemDataRole.UserRole, path)
+                child.setIcon(0, self.file_icon)
+                item.addChild(child)
+            items.append(item)
+        self.duplicates_tree.addTopLevelItems(items)
+        wasted = sum(group.wasted for group in groups)
+        status = "Recherche annulée : " if finder.cancelled else ""
+        self.duplicates_label.setText(
+            f"{status}{len(groups)} groupes, {format_size(wasted)} récupérables "
+            f"({format_size(finder.bytes_read)} lus sur {format_size(self.scanned_data.size[0])})"
+        )
+
+    def on_duplicate_double_clicked(self, item, column):
         path = item.data(0, Qt.ItemDataRole.UserRole)
-        if not path or path not in self.scanned_data:
+        if path is None:
             return
+        # Ouvre le dossier contenant la copie dans l'onglet principal
+        self.tabs.setCurrentWidget(self.central_widget)
+        self.show_folder(os.path.dirname(path))
 
-        item.takeChildren()  # nettoie les enfants si déjà chargés
+    def open_snapshot_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Ouvrir un snapshot", "", "Snapshots (*.fvv);;Tous les fichiers (*)")
+        if path:
+            self.load_snapshot_file(path)
+
+    def load_snapshot_file(self, path):
+        """Charge un snapshot (mmap) comme source de ``scanned_data``."""
+        if self.scan_running:
+            self.scan_status_label.setText("Un scan est déjà en cours.")
+            return
+        try:
+            store = load_snapshot(path)
+        except (OSError, ValueError) as e:
+            self.scan_status_label.setText(f"Impossible d'ouvrir le snapshot : {e}")
+            return
+        self.watch_checkbox.setChecked(False)
+        root = store.root_path
+        self.scan_type = "disk" if os.path.dirname(root) == root else "folder"
+        self.on_scan_finished(store)
+        self.scan_status_label.setText(f"Snapshot chargé : {os.path.basename(path)}")
+
+    def open_service_dialog(self):
+        address, ok = QInputDialog.getText(self, "Service de scan", "Adresse (http://hôte:port ou unix:/socket) :",
+                                           text=self.service_address)
+        if ok and address.strip():
+            self.open_service(address.strip())
+
+    def open_service(self, address, root=None):
+        """Charge l'index d'une racine du service (``python -m daemon serve``) sans scanner."""
+        if self.scan_running:
+            self.scan_status_label.setText("Un scan est déjà en cours.")
+            return
+        self.service_address = address
+        client = DaemonClient(address, timeout=5.0)
+        try:
+            roots = [status for status in client.status() if status["state"] != "scanning"]
+        except (OSError, DaemonError) as e:
+            self.scan_status_label.setText(f"Service injoignable : {e}")
+            return
+        if not roots:
+            self.scan_status_label.setText("Aucun index prêt sur ce service.")
+            return
+        if root is None:
+            root = roots[0]["root"]
+            if len(roots) > 1:
+                root, ok = QInputDialog.getItem(self, "Service de scan", "Racine :",
+                                                [status["root"] for status in roots], 0, False)
+                if not ok:
+                    return
+        self.scan_status_label.setText(f"Téléchargement de l'index de {root}...")
+        threading.Thread(target=self.service_thread, args=(client, root), daemon=True).start()
+
+    def service_thread(self, client, root):
+        # L'index arrive sous forme de snapshot, projeté ensuite en mémoire comme un fichier local
+        handle, path = tempfile.mkstemp(prefix="fvv-", suffix=".fvv")
+        os.close(handle)
+        try:
+            client.fetch_snapshot(root, path)
+        except (OSError, DaemonError) as e:
+            os.unlink(path)
+            self.service_loaded.emit((root, None, e))
+            return
+        self.service_loaded.emit((root, path, None))
 
-        for child in sorted(self.scanned_data[path], key=lambda x: x['size'], reverse=True):
-            size = child['size']
-            sub_item = QTreeWidgetItem([child['name'], format_size(size)])
-            sub_item.setData(0, Qt.ItemDataRole.UserRole, child['path'])
+    def on_service_loaded(self, result):
+        root, path, error = result
+        if error is not None:
+            self.scan_status_label.setText(f"Index de {root} indisponible : {error}")
+            return
+        self.load_snapshot_file(path)
+        if os.name != "nt":
+            os.unlink(path)  # le mmap garde le contenu accessible
+        if self.scanned_data is not None and self.scanned_data.root_path == root:
+            self.scan_status_label.setText(f"Index du service : {root}")
+
+    def compare_snapshot_dialog(self):
+        if self.scanned_data is None or self.scan_running:
+            self.scan_status_label.setText("Aucun scan terminé à comparer.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Comparer à un snapshot", "",
+                                              "Snapshots (*.fvv);;Tous les fichiers (*)")
+        if path:
+            self.compare_snapshot_file(path)
 
-            if child['is_dir']:
-                sub_item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+    def compare_snapshot_file(self, path):
+        """Colore ``file_list`` selon l'évolution depuis le snapshot ``path``."""
+        try:
+            diff = diff_stores(load_snapshot(path), self.scanned_data)
+        except (OSError, ValueError) as e:
+            self.scan_status_label.setText(f"Comparaison impossible : {e}")
+            return
+        self.diff = diff
+        self.folder_model.set_deltas(diff.deltas)
+        self.clear_diff_action.setEnabled(True)
+        delta = diff.total_delta
+        sign = "+" if delta >= 0 else "-"
+        self.scan_status_label.setText(
+            f"Évolution depuis {os.path.basename(path)} : {sign}{format_size(abs(delta))} "
+            f"({len(diff.entries)} chemins modifiés)")
+
+    def clear_diff(self):
+        if self.diff is None:
+            return
+        self.diff = None
+        self.folder_model.set_deltas(None)
+        self.clear_diff_action.setEnabled(False)
+
+    def run_search(self, page=0):
+        self.search_timer.stop()
+        query = self.search_input.text().strip()
+        if not query:
+            self.clear_search_results()
+            return
+        if self.search_index is None:
+            self.search_count_label.setText("Scan en cours..." if self.scan_running else "Aucun scan")
+            return
+        store = self.scanned_data
+        result = self.search_index.search(query, page)
+        self.search_page = result
+        self.search_results.clear()
+        for node in result.nodes:
+            item = QListWidgetItem(f"{store.name(node)}  ({format_size(store.size[node])})")
+            item.setIcon(self.folder_icon if store.is_dir(node) else self.file_icon)
+            item.setToolTip(store.path(node))
+            item.setData(Qt.ItemDataRole.UserRole, node)
+            self.search_results.addItem(item)
+        first = result.page * result.page_size
+        if result.total:
+            self.search_count_label.setText(f"{first + 1}–{first + len(result.nodes)} sur {result.total}")
+        else:
+            self.search_count_label.setText("Aucun résultat")
+        self.search_more_button.setText("Suivants" if first + len(result.nodes) < result.total else "Début")
+        self.search_more_button.setEnabled(result.total > result.page_size)
 
-            icon = QIcon(self.resource_path("resources/folder.png")) if child['is_dir'] else QIcon(self.resource_path("resources/file.png"))
-            sub_item.setIcon(0, icon)
+    def search_next_page(self):
+        page = self.search_page
+        if page is None:
+            return
+        last = (page.page + 1) * page.page_size >= page.total
+        self.run_search(0 if last else page.page + 1)
+
+    def clear_search_results(self):
+        self.search_page = None
+        self.search_results.clear()
+        self.search_count_label.setText("")
+        self.search_more_button.setEnabled(False)
+
+    def on_search_result_clicked(self, item):
+        node = item.data(Qt.ItemDataRole.UserRole)
+        store = self.scanned_data
+        if store is None or node is None or node >= len(store):
+            return
+        # Ouvre le dossier parent et y sélectionne l'élément
+        self.tabs.setCurrentWidget(self.central_widget)
+        self.show_folder(store.path(store.parent[node]))
+        row = self.folder_model.row_of(node)
+        if row >= 0:
+            self.file_list.selectRow(row)
+            self.file_list.scrollTo(self.folder_model.index(row, 0))
+
+    def expand_collapsed(self, index):
+        """Rescanne un nœud replié : regroupement tout de suite, dossier en arrière-plan."""
+        if self.scan_running:
+            return
+        store = self.scanned_data
+        if not store.can_grow():
+            # Snapshot projeté en mémoire : copie modifiable (nœuds renumérotés)
+            path = store.path(index)
+            self.clear_diff()
+            store = self.scanned_data = store.compacted()
+            self.search_index = NameIndex(store)
+            index = store.find(path)
+            if index < 0:
+                return
+        if not store.is_dir(index):
+            expand_node(store, index, exclusions=self.exclusions)
+            self.on_expand_finished((store, index, None))
+            return
+        self.scan_status_label.setText(f"Détail de {store.name(index)} en cours...")
+        policy = self.collapse_policy
+        exclusions = self.exclusions
+        threading.Thread(target=lambda: self.expand_finished.emit(
+            (store, index, rescan_subtree(store, index, policy, exclusions=exclusions))), daemon=True).start()
+
+    def on_expand_finished(self, result):
+        store, index, subtree = result
+        if store is not self.scanned_data:
+            return  # nouveau scan entre-temps
+        if subtree is not None:
+            if not is_collapsed(store, index) or store.child_count[index]:
+                return  # déjà détaillé
+            expand_node(store, index, subtree=subtree)
+            self.scan_status_label.setText(f"{store.name(index)} détaillé")
+        self.rollup_cache = {}
+        self.update_ages()
+        self.treemap.refresh()
+        if self.current_path is not None:
+            self.show_folder(self.current_path)
+        if subtree is not None:
+            self.show_folder(store.path(index))
+
+    def toggle_watch(self, checked):
+        if checked:
+            self.start_watch()
+        else:
+            self.stop_watch()
 
-            item.addChild(sub_item)
+    def start_watch(self):
+        if self.scanned_data is None or self.scan_running:
+            self.scan_status_label.setText("Aucun scan à surveiller.")
+            self.watch_checkbox.setChecked(False)
+            return
+        if not self.scanned_data.can_grow():
+            # Snapshot projeté en mémoire : copie modifiable (nœuds renumérotés)
+            self.clear_diff()
+            self.scanned_data = self.scanned_data.compacted()
+            self.search_index = NameIndex(self.scanned_data)
+            self.clear_search_results()
+            self.update_ages()
+        watcher = TreeWatcher(self.scanned_data, lambda batch: self.watch_batch.emit((watcher, batch)),
+                              exclusions=self.exclusions)
+        self.watcher = watcher
+        watcher.start()
+        self.scan_status_label.setText(f"Surveillance active ({watcher.backend})")
+
+    def stop_watch(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.scan_status_label.setText("Surveillance arrêtée")
+
+    def on_watch_batch(self, payload):
+        watcher, batch = payload
+        if watcher is not self.watcher:
+            return  # lot d'une surveillance arrêtée
+        touched, restructured = watcher.apply(batch)
+        self.rollup_cache = {}
+        if self.folder_model.ages is not None:
+            self.folder_model.ages.update(touched)  # nœuds du lot et leurs ancêtres seulement
+        if self.current_path is None:
+            return
+        if self.scanned_data.find(self.current_path) in restructured:
+            self.show_folder(self.current_path)
+            return
+        # Seules les lignes concernées sont mises à jour
+        self.folder_model.refresh_nodes(touched)
+        self.treemap.refresh()
 
+    def save_snapshot_dialog(self):
+        if self.scanned_data is None:
+            self.scan_status_label.setText("Aucun scan à enregistrer.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Enregistrer le snapshot", "scan.fvv", "Snapshots (*.fvv)")
+        if not path:
+            return
+        try:
+            save_snapshot(self.scanned_data, path)
+        except OSError as e:
+            self.scan_status_label.setText(f"Échec de l'enregistrement : {e}")
+            return
+        self.scan_status_label.setText(f"Snapshot enregistré : {os.path.basename(path)}")
 
     def toggle_theme(self):
         self.dark_mode = not self.dark_mode
@@ -320,9 +1135,20 @@ class MainWindow(QWidget):
         # Mise à jour du symbole du bouton
         self.theme_button.setText("🌙" if not self.dark_mode else "☀️")
 
-    def update_progress(self, value):
-        self.progress.setValue(value)
-        self.progress_label.setText(f"{value}%")
+    def update_progress(self, info):
+        if info.fraction is None:
+            # Total inconnu (dossier sans scan précédent) : barre indéterminée
+            self.progress.setRange(0, 0)
+            percent = ""
+        else:
+            self.progress.setRange(0, 1000)
+            self.progress.setValue(int(info.fraction * 1000))
+            percent = f"{info.fraction * 100:.0f}% · "
+        eta = f" · reste {format_duration(info.eta)}" if info.eta is not None and info.fraction < 1 else ""
+        self.progress_label.setText(
+            f"{percent}{format_size(info.bytes_done)} · {info.entries_done} entrées\n"
+            f"{format_size(info.bytes_per_s)}/s · {info.entries_per_s:.0f} entrées/s{eta}"
+        )
 
     def update_stats(self):
         path = self.base_disk_path
@@ -344,28 +1170,104 @@ class MainWindow(QWidget):
                 f"Taille totale : {format_size(total_disk)}\n"
                 f"Utilisé : {format_size(used_disk)}\n"
                 f"Libre : {format_size(free_disk)}\n"
-                f"Fichiers scannés : {file_count}"
+                f"Fichiers scannés : {file_count}\n"
+                f"Mémoire : {self.scanned_data.bytes_per_node():.1f} o/nœud"
             )
         else:
-            folder_size = get_size(path)
+            folder_size = self.scanned_data.size[0]
             self.stats_label.setText(
                 f"Type : Dossier\n"
                 f"Taille totale : {format_size(folder_size)}\n"
-                f"Fichiers scannés : {file_count}"
+                f"Fichiers scannés : {file_count}\n"
+                f"Mémoire : {self.scanned_data.bytes_per_node():.1f} o/nœud"
             )
 
 
+    def rollup(self, mode, index):
+        """Regroupement ``mode`` du sous-arbre ``index``, mis en cache hors scan en cours."""
+        key = (mode, index)
+        rows = self.rollup_cache.get(key)
+        if rows is None:
+            if mode == 0:
+                rows = rollups.by_extension(self.scanned_data, index)
+            elif mode == 1:
+                rows = rollups.by_category(self.scanned_data, index, self.rollup(0, index))
+            else:
+                rows = rollups.by_size_bucket(self.scanned_data, index)
+            if not self.scan_running:
+                self.rollup_cache[key] = rows
+        return rows
+
+    def update_ages(self, *_):
+        """(Re)calcule l'histogramme d'âges de ``scanned_data`` selon ``age_mode``."""
+        mode = self.age_mode.currentIndex()
+        ages = None
+        if mode and self.scanned_data is not None and not self.scan_running:
+            ages = AgeHistogram(self.scanned_data, CLOCKS[mode - 1])
+        self.folder_model.set_ages(ages)
+
+    def update_types_summary(self):
+        if self.scanned_data is None:
+            return
+        top = self.rollup(1, 0)[:3]
+        total = self.scanned_data.size[0] or 1
+        self.filters_label.setText("Types : " + " · ".join(
+            f"{row.name} {row.size * 100 / total:.0f}%" for row in top))
+
+    def update_types(self, *_):
+        if self.tabs.currentWidget() is not self.types_widget or self.scanned_data is None:
+            return
+        index = 0
+        if self.types_subtree_checkbox.isChecked() and self.current_path is not None:
+            index = max(self.scanned_data.find(self.current_path), 0)
+        rows = self.rollup(self.types_mode.currentIndex(), index)
+        total = sum(row.size for row in rows) or 1
+        table = self.types_table
+        table.setRowCount(len(rows))
+        for row_number, row in enumerate(rows):
+            values = (row.name, str(row.count), format_size(row.size), f"{row.size * 100 / total:.1f}%")
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                table.setItem(row_number, column, item)
+
+    def update_telemetry(self):
+        if self.telemetry is None:
+            return
+        summary = self.telemetry.summary()
+        errors = ", ".join(f"{kind} : {count}" for kind, count in summary["errors"].items()) or "aucune"
+        pruned = ", ".join(f"{rule} : {counts['entries']} ({format_size(counts['bytes'])})"
+                           for rule, counts in summary["pruned"].items()) or "aucune"
+        self.telemetry_label.setText(
+            f"Durée : {format_duration(summary['seconds'])} · {summary['directories']} dossiers · "
+            f"{summary['entries']} entrées\n"
+            f"Appels système : {summary['scandir_calls']} scandir, {summary['stat_calls']} stat · "
+            f"{summary['mean_directory_ms']:.2f} ms par dossier en moyenne\n"
+            f"Erreurs : {errors}\n"
+            f"Exclusions : {pruned}"
+        )
+        rows = summary["slowest"]
+        self.slowest_table.setRowCount(len(rows))
+        for row_number, row in enumerate(rows):
+            values = (row["path"], f"{row['seconds'] * 1000:.1f} ms", str(row["entries"]))
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.slowest_table.setItem(row_number, column, item)
+
+    def on_slowest_double_clicked(self, row, column):
+        path = self.slowest_table.item(row, 0).text()
+        if self.scanned_data is not None and self.scanned_data.find(path) >= 0:
+            self.tabs.setCurrentWidget(self.central_widget)
+            self.show_folder(path)
+
     def count_files_recursively(self, path):
-        count = 0
-        if path not in self.scanned_data:
+        index = self.scanned_data.find(path)
+        if index < 0:
             return 0
-
-        for item in self.scanned_data[path]:
-            if item['is_dir']:
-                count += self.count_files_recursively(item['path'])
-            else:
-                count += 1
-        return count
+        return self.scanned_data.count_files(index)
 
 
 
@@ -449,7 +1351,7 @@ class MainWindow(QWidget):
                 border-radius: 4px;
             }}
 
-            QTreeWidget {{
+            QTreeView, QTableView {{
                 background-color: {base_bg};
                 color: {text_color};
                 border: none;
@@ -474,16 +1376,6 @@ class MainWindow(QWidget):
             }}
         """)
 
-    def scan_subfolders(self, folder_path, progress_callback):
-        """Scan récursivement tous les sous-dossiers et retourne un dict."""# <-- Ajout du log
-        result = {}
-        children = scan_directory(folder_path, progress_callback)
-        result[folder_path] = children
-        for item in children:
-            if os.path.isdir(item['path']):
-                result.update(self.scan_subfolders(item['path'], progress_callback))
-        return result
-
     def update_breadcrumb(self, path):
         # Nettoie la barre
         for i in reversed(range(self.breadcrumb_layout.count())):
@@ -558,30 +1450,35 @@ class MainWindow(QWidget):
                 min_size_bytes = 0
         self.current_path = path
         self.update_breadcrumb(path)
-        self.file_list.clear()
-        if path not in self.scanned_data:
-            return
-        for item in sorted(self.scanned_data[path], key=lambda x: x['size'], reverse=True):
-            if item['size'] >= min_size_bytes:
-                node = QTreeWidgetItem([item['name'], format_size(item['size'])])
-                node.setData(0, Qt.ItemDataRole.UserRole, item['path'])
-                icon = QIcon(self.resource_path("resources/folder.png")) if item['is_dir'] else QIcon(self.resource_path("resources/file.png"))
-                node.setIcon(0, icon)
-                self.file_list.addTopLevelItem(node)
+        store = self.scanned_data
+        index = store.find(path)
+        if index < 0:
+            self.folder_model.clear()
+            self.treemap.clear()
+            return
+        self.folder_model.set_folder(store, index, min_size_bytes)
+        self.treemap.set_root(store, index)
         self.update_stats()
+        if self.types_subtree_checkbox.isChecked():
+            self.update_types()
 
-    def on_item_double_clicked(self, item, column):
-        path = item.data(0, Qt.ItemDataRole.UserRole)
+    def on_item_double_clicked(self, model_index):
+        index = model_index.data(Qt.ItemDataRole.UserRole)
+        if index is None:
+            return
+        store = self.scanned_data
+        # Dossier replié ou regroupement (mode mémoire bornée) : on le détaille
+        if is_collapsed(store, index) and not store.child_count[index]:
+            self.expand_collapsed(index)
+            return
         # Si c'est un dossier, on l'affiche
-        for child in self.scanned_data.get(self.current_path, []):
-            if child['path'] == path and child['is_dir']:
-                self.show_folder(path)
-                break
+        if store.is_dir(index):
+            self.show_folder(store.path(index))
 
     def go_back(self):
         if self.current_path:
             parent = os.path.dirname(self.current_path.rstrip(os.sep))
-            if parent and parent in self.scanned_data:
+            if parent and self.scanned_data.find(parent) >= 0:
                 self.show_folder(parent)
 
     def select_folder(self):
@@ -595,10 +1492,8 @@ class MainWindow(QWidget):
             if len(folder) > max_len:
                 display_path = "..." + folder[-(max_len-3):]
             self.scan_status_label.setText(f"Dossier sélectionné : {display_path}")
-            self.disk_buttongroup.setExclusive(False)
             for radio in self.disk_radiobuttons:
                 radio.setChecked(False)
-            self.disk_buttongroup.setExclusive(True)
 
     def apply_size_filter(self):
         try:
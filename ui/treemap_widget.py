@@ -0,0 +1,169 @@
+from PyQt6.QtWidgets import QWidget, QToolTip
+from PyQt6.QtGui import QPainter, QPixmap, QColor, QPen
+from PyQt6.QtCore import Qt, QTimer, QRectF, QEvent, pyqtSignal
+from core.utils import format_size
+from core.rollups import CATEGORY_OF
+from core.treemap import TreemapLayout, REST
+
+CATEGORY_COLORS = {
+    "Images": "#4c9f70",
+    "Vidéos": "#d1495b",
+    "Audio": "#edae49",
+    "Documents": "#4c7bf4",
+    "Archives": "#a45de4",
+    "Code": "#2ab7ca",
+    "Exécutables": "#e07a5f",
+    "Bases de données": "#8d6a9f",
+    "Disques virtuels": "#f28482",
+}
+OTHER_COLOR = "#7a8b99"
+REST_COLOR = "#555555"
+
+
+class TreemapWidget(QWidget):
+    """Treemap du dossier affiché, dessinée à partir d'un ``TreemapLayout``.
+
+    L'image est rendue une fois dans un ``QPixmap`` (les ``paintEvent`` se
+    contentent de la copier) ; seules les régions d'au moins ``min_pixels``
+    de côté sont dessinées, les plus petites restent fondues dans leur
+    dossier. Un redimensionnement met seulement les rectangles en cache à
+    l'échelle, après un court délai. Double-clic : ``folder_activated(chemin)``.
+    """
+
+    folder_activated = pyqtSignal(str)
+
+    def __init__(self, parent=None, min_pixels=3):
+        super().__init__(parent)
+        self.min_pixels = min_pixels
+        self.store = None
+        self.layout_cache = None
+        self.root = 0
+        self._pixmap = None
+        self._regions = []  # (x, y, w, h, nœud, dossier parent), dans l'ordre de dessin
+        self.setMinimumSize(200, 150)
+        self.setMouseTracking(False)
+        self._resize_timer = QTimer(self)
+        self._resize_timer.setSingleShot(True)
+        self._resize_timer.setInterval(80)
+        self._resize_timer.timeout.connect(self.redraw)
+
+    def set_root(self, store, index):
+        if store is not self.store:
+            self.store = store
+            self.layout_cache = TreemapLayout(store)
+        self.root = index
+        self.redraw()
+
+    def clear(self):
+        self.store = None
+        self.layout_cache = None
+        self._pixmap = None
+        self._regions = []
+        self.update()
+
+    def refresh(self):
+        """Tailles modifiées (scan en cours, surveillance) : dispositions à recalculer."""
+        if self.layout_cache is not None:
+            self.layout_cache.invalidate()
+            self.redraw()
+
+    def _color(self, node):
+        store = self.store
+        if node == REST:
+            return QColor(REST_COLOR)
+        if store.is_dir(node):
+            return QColor("#2d2d2d")
+        return QColor(CATEGORY_COLORS.get(CATEGORY_OF.get(store.extensions[store.ext[node]]), OTHER_COLOR))
+
+    def redraw(self):
+        width, height = self.width(), self.height()
+        if self.store is None or width <= 0 or height <= 0:
+            return
+        pixmap = QPixmap(width, height)
+        pixmap.fill(QColor("#1e1e1e"))
+        painter = QPainter(pixmap)
+        border_pen = QPen(QColor("#111111"), 1)
+        text_pen = QPen(QColor("#dddddd"))
+        painter.setPen(border_pen)
+        regions = []
+        min_pixels = self.min_pixels
+        min_area = min_pixels * min_pixels
+        layout = self.layout_cache
+        store = self.store
+        # Pile : (dossier, x, y, largeur, hauteur) en pixels
+        stack = [(self.root, 0.0, 0.0, float(width), float(height))]
+        while stack:
+            folder, fx, fy, fw, fh = stack.pop()
+            for node, x, y, w, h in layout.children(folder, fw / fh, min_area / (fw * fh)):
+                pw, ph = w * fw, h * fh
+                if pw < min_pixels or ph < min_pixels:
+                    continue  # niveau de détail : reste fondu dans le dossier
+                px, py = fx + x * fw, fy + y * fh
+                painter.fillRect(QRectF(px, py, pw, ph), self._color(node))
+                painter.drawRect(QRectF(px, py, pw, ph))
+                regions.append((px, py, pw, ph, node, folder))
+                if node == REST or not store.is_dir(node):
+                    continue
+                # Bandeau avec le nom quand il y a la place, puis le contenu en retrait
+                header = 0
+                if pw > 60 and ph > 40:
+                    header = 15
+                    painter.setPen(text_pen)
+                    painter.drawText(QRectF(px + 3, py + 1, pw - 6, 14),
+                                     Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                                     store.name(node))
+                    painter.setPen(border_pen)
+                inner_w, inner_h = pw - 4, ph - 4 - header
+                if inner_w >= 2 * min_pixels and inner_h >= 2 * min_pixels:
+                    stack.append((node, px + 2, py + 2 + header, inner_w, inner_h))
+        painter.end()
+        self._pixmap = pixmap
+        self._regions = regions
+        self.update()
+
+    def region_at(self, pos):
+        """Région la plus profonde sous ``pos`` : ``(nœud, dossier parent)`` ou ``None``."""
+        x, y = pos.x(), pos.y()
+        for rx, ry, rw, rh, node, folder in reversed(self._regions):
+            if rx <= x < rx + rw and ry <= y < ry + rh:
+                return node, folder
+        return None
+
+    # --- Événements Qt ---
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self._pixmap is not None:
+            # Pendant un redimensionnement, l'ancienne image est simplement étirée
+            painter.drawPixmap(self.rect(), self._pixmap)
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.store is not None:
+            self._resize_timer.start()
+
+    def event(self, event):
+        if event.type() == QEvent.Type.ToolTip and self.store is not None:
+            hit = self.region_at(event.pos())
+            if hit is None:
+                QToolTip.hideText()
+            else:
+                node, folder = hit
+                if node == REST:
+                    count, size = self.layout_cache.rest(folder)
+                    text = f"{count} petits éléments"
+                else:
+                    text = self.store.path(node)
+                    size = self.store.size[node]
+                QToolTip.showText(event.globalPos(), f"{text}\n{format_size(size)}", self)
+            return True
+        return super().event(event)
+
+    def mouseDoubleClickEvent(self, event):
+        hit = self.region_at(event.position())
+        if hit is None:
+            return
+        node, folder = hit
+        target = node if node != REST and self.store.is_dir(node) else folder
+        self.folder_activated.emit(self.store.path(target))